@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Write dashboard HTML with plotly.js inlined or as one shared, offline asset.
+
+In ``shared`` mode the bundled plotly.min.js is written once, under a
+versioned content-hashed name (``plotly-<version>.<hash>.min.js``), and every
+dashboard references it with a relative ``<script src>``. Nothing is fetched
+from a CDN. Optionally each written file gets pre-compressed ``.gz`` (stdlib)
+and/or ``.br`` (needs the ``brotli`` package) siblings for static servers.
+
+``compact`` output shrinks the embedded figure itself: numeric trace arrays
+become base64 typed arrays (which plotly.js decodes natively), properties
+repeated across annotations/shapes move into named template items, and the
+template's per-trace-type defaults are cut down to the types in use.
+"""
+
+import base64, gzip, hashlib, os
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+PLOTLYJS_MODES = ("inline", "shared")
+COMPRESSIONS = ("gz", "br")
+
+TYPED_ARRAY_MIN = 16        # shorter numeric lists stay plain JSON
+# plotly.js typed-array dtypes, smallest first; integers use the first that holds them
+INT_DTYPES = ("i1", "u1", "i2", "u2", "i4", "u4")
+FLOAT_DIGITS = 10           # significant digits kept of plain-JSON floats (drops 0.30000000000000004 noise)
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        raise ImportError("Brotli output needs the brotli package: pip install brotli") from None
+    return brotli
+
+
+def compress_file(path, formats):
+    """Write ``path.gz`` / ``path.br`` siblings next to ``path``."""
+    data = Path(path).read_bytes()
+    for fmt in formats:
+        if fmt == "gz":
+            # mtime=0 keeps the output byte-identical across runs
+            packed = gzip.compress(data, compresslevel=9, mtime=0)
+        elif fmt == "br":
+            packed = _brotli().compress(data, quality=11)
+        else:
+            raise ValueError(f"unknown compression {fmt!r}, expected one of {COMPRESSIONS}")
+        write_atomic(Path(f"{path}.{fmt}"), packed)
+
+
+def write_atomic(path, data):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")   # unique per writer process
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=1)
+def plotlyjs_bundle():
+    """The bundled plotly.min.js and its versioned, content-hashed file name."""
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    js = get_plotlyjs().encode()
+    digest = hashlib.sha256(js).hexdigest()[:12]
+    return f"plotly-{get_plotlyjs_version()}.{digest}.min.js", js
+
+
+def plotlyjs_asset(asset_dir, compress=()):
+    """
+    Make sure the shared plotly.js bundle exists in ``asset_dir`` and return its path.
+
+    The name carries the plotly.js version and a hash of the bundle, so an
+    existing file with that name never needs rewriting and upgrades never
+    collide with dashboards still pointing at the old bundle.
+    """
+    asset_dir = Path(asset_dir)
+    name, js = plotlyjs_bundle()
+    path = asset_dir / name
+    if not path.exists():
+        asset_dir.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, js)
+    missing = [fmt for fmt in compress if not Path(f"{path}.{fmt}").exists()]
+    if missing:
+        compress_file(path, missing)
+    return path
+
+
+def typed_array(values, min_length=TYPED_ARRAY_MIN):
+    """
+    A plotly.js typed-array spec (``{"dtype", "bdata"}``) for a list of
+    numbers, in the smallest dtype that holds them exactly; None for short
+    lists or lists of anything else (strings, None, bools).
+    """
+    import numpy as np
+
+    if len(values) < min_length or not all(type(v) in (int, float) for v in values):
+        return None
+    array = np.asarray(values)
+    if array.dtype.kind == "i":
+        lo, hi = array.min(), array.max()
+        dtype = next((d for d in INT_DTYPES if np.iinfo(d).min <= lo and hi <= np.iinfo(d).max), "f8")
+    else:
+        dtype = "f4" if np.array_equal(array.astype("f4"), array) else "f8"
+    return {"dtype": dtype, "bdata": base64.b64encode(array.astype(f"<{dtype}").tobytes()).decode("ascii")}
+
+
+def _compact_value(value, min_length):
+    # typed arrays for numeric lists, trimmed floats everywhere else
+    if isinstance(value, dict):
+        return {k: _compact_value(v, min_length) for k, v in value.items()}
+    if isinstance(value, list):
+        spec = typed_array(value, min_length) if min_length else None
+        return spec or [_compact_value(v, min_length) for v in value]
+    if isinstance(value, float):
+        return float(f"{value:.{FLOAT_DIGITS}g}")
+    return value
+
+
+def template_items(items, prefix):
+    """
+    Move properties shared by items with the same keys into named template
+    items, which each item then refers to by ``templateitemname``.
+
+    Returns the slimmed items and the template items (plotly.js only draws
+    a template item itself if nothing refers to it).
+    """
+    groups = defaultdict(list)
+    for i, item in enumerate(items):
+        if "templateitemname" not in item:
+            groups[tuple(sorted(item))].append(i)
+    items, templates = list(items), []
+    for keys, members in groups.items():
+        first = items[members[0]]
+        # a list in key order, so the output is the same from run to run
+        shared = [k for k in keys if k != "name" and all(items[m][k] == first[k] for m in members[1:])]
+        if len(members) < 2 or not shared:
+            continue
+        name = f"{prefix}{len(templates)}"
+        templates.append(dict({k: first[k] for k in shared}, name=name))
+        for m in members:
+            items[m] = dict({k: v for k, v in items[m].items() if k not in shared}, templateitemname=name)
+    return items, templates
+
+
+def compact_figure(fig, min_length=TYPED_ARRAY_MIN):
+    """
+    An equivalent figure dict that serializes much smaller (see the module
+    docstring). ``fig`` is a plain figure dict and is not modified.
+    """
+    layout = dict(fig.get("layout", {}))
+    template = dict(layout.get("template", {}))
+    template_layout = dict(template.get("layout", {}))
+    for key, prefix in (("annotations", "a"), ("shapes", "s")):
+        if layout.get(key):
+            layout[key], shared = template_items(layout[key], prefix)
+            if shared:
+                template_layout[key] = template_layout.get(key, []) + shared
+    if template:
+        types = {trace.get("type", "scatter") for trace in fig.get("data", [])}
+        template["data"] = {t: v for t, v in template.get("data", {}).items() if t in types}
+        template["layout"] = template_layout
+        layout["template"] = template
+    elif template_layout:
+        layout["template"] = {"layout": template_layout}
+    return dict(
+        fig,
+        data=[_compact_value(trace, min_length) for trace in fig.get("data", [])],
+        layout=_compact_value(layout, 0),     # layout arrays (ticks, domains) stay plain
+    )
+
+
+def write_html(fig, out_path, plotlyjs="inline", asset_dir=None, compress=(), post_script=None, compact=False):
+    """
+    Write a figure (object or dict) to ``out_path``.
+
+    ``plotlyjs="shared"`` references a shared bundle in ``asset_dir``
+    (default: the output's directory) instead of inlining several MB of
+    plotly.js. ``compress`` adds ``.gz``/``.br`` siblings of what was written,
+    ``post_script`` is JavaScript (a string or list of them) run after the
+    plot is drawn, and ``compact`` embeds ``compact_figure(fig)`` (``fig``
+    must then be a plain dict).
+    Returns the paths of every file the page needs, including the shared bundle.
+    """
+    import plotly.io as pio
+
+    out_path = Path(out_path)
+    written = [out_path] + [Path(f"{out_path}.{fmt}") for fmt in compress]
+    if plotlyjs == "shared":
+        asset = plotlyjs_asset(asset_dir or out_path.parent, compress)
+        include = Path(os.path.relpath(asset, out_path.parent)).as_posix()
+        written += [asset] + [Path(f"{asset}.{fmt}") for fmt in compress]
+    elif plotlyjs == "inline":
+        include = True
+    else:
+        raise ValueError(f"unknown plotlyjs mode {plotlyjs!r}, expected one of {PLOTLYJS_MODES}")
+
+    if compact:
+        fig = compact_figure(fig)
+    pio.write_html(fig, out_path, include_plotlyjs=include, validate=False, post_script=post_script)
+    if compress:
+        compress_file(out_path, compress)
+    return written
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Render many dashboards in parallel from a manifest of jobs.
+
+The manifest is a JSON list (or a CSV with the same columns) of jobs:
+
+    [
+      {"output": "district_01/2022.html", "data_dir": "district_01/data"},
+      {"output": "district_02/2022.html", "data_dir": "district_02/data", "format": "parquet"},
+      {"output": "state/campus_7.html", "events": "state/events.parquet",
+       "school_year": 2022, "campuses": ["Campus 7"]},
+      {"output": "state/all.html", "events": "state/events.parquet", "school_mode": "histogram"}
+    ]
+
+``data_dir`` jobs render pre-aggregated inputs; ``events`` jobs (one path, or
+several separated by ``;`` in a CSV) aggregate student events, optionally for
+one ``school_year`` and a subset of ``campuses``. ``school_mode`` /
+``school_k`` pick how the retention-by-school panel scales (see dashboard.py).
+Relative paths resolve against the manifest's directory.
+
+Jobs sharing an input source are split into at most one chunk per worker,
+and each chunk loads its source once. The static layout is frozen into a
+JSON template once, in the parent, and every worker only fills in data. A
+failed job is reported and the rest of the batch carries on.
+"""
+
+import argparse, csv, json, math, os, sys, time, traceback
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from assets import COMPRESSIONS, PLOTLYJS_MODES, plotlyjs_asset
+
+# Per-worker state: the frozen figure template and the most recently loaded source
+_TEMPLATE = None
+_LOADED = {}
+
+
+def read_manifest(path):
+    """Load jobs from a JSON or CSV manifest, resolving paths against its directory."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="") as f:
+            rows = [{k: v for k, v in row.items() if v not in (None, "")} for row in csv.DictReader(f)]
+    else:
+        rows = json.loads(path.read_text())
+
+    jobs = []
+    for row in rows:
+        job = {"output": str(path.parent / row["output"]), "format": row.get("format", "csv")}
+        if "events" in row:
+            events = row["events"]
+            events = events.split(";") if isinstance(events, str) else events
+            job["events"] = [str(path.parent / e) for e in events]
+        else:
+            job["data_dir"] = str(path.parent / row.get("data_dir", "data"))
+        if row.get("school_year") not in (None, ""):
+            job["school_year"] = int(row["school_year"])
+        campuses = row.get("campuses")
+        if campuses:
+            job["campuses"] = campuses.split(";") if isinstance(campuses, str) else list(campuses)
+        school = {}
+        if row.get("school_mode"):
+            school["mode"] = row["school_mode"]
+        if row.get("school_k") not in (None, ""):
+            school["k"] = int(row["school_k"])
+            if school["k"] < 1:
+                raise ValueError(f"{job['output']}: school_k must be at least 1, got {school['k']}")
+        if school:
+            job["options"] = {"school": school}
+        jobs.append(job)
+    return jobs
+
+
+def source_of(job):
+    """Jobs with the same source share one load."""
+    if "events" in job:
+        return ("events", tuple(job["events"]))
+    return ("inputs", job["data_dir"], job["format"])
+
+
+def _init_worker(template):
+    global _TEMPLATE
+    _TEMPLATE = template
+
+
+def load_source(source):
+    """Read a job source: raw student events, or a directory of pre-aggregated inputs."""
+    from events import read_events
+    import dashboard
+
+    if source[0] == "events":
+        return read_events([Path(p) for p in source[1]])
+    return dashboard.load_inputs(Path(source[1]), source[2])
+
+
+def job_data(job, loaded):
+    """The dashboard inputs of ``job`` from its loaded source."""
+    import dashboard
+
+    if "events" in job:
+        return dashboard.summarize_events(loaded, job.get("school_year"), job.get("campuses"))
+    return loaded
+
+
+def _load(source):
+    """Load a source, keeping only the latest one so a worker's memory stays bounded."""
+    if source not in _LOADED:
+        _LOADED.clear()
+        _LOADED[source] = load_source(source)
+    return _LOADED[source]
+
+
+def run_chunk(source, jobs, html_options):
+    """Render ``jobs`` that share ``source`` (runs in a worker process)."""
+    import dashboard
+
+    results = []
+    start = time.perf_counter()
+    try:
+        loaded = _load(source)
+        load_error = None
+    except Exception as exc:
+        load_error = f"{type(exc).__name__}: {exc}"
+    load_seconds = time.perf_counter() - start
+
+    for job in jobs:
+        result = {"output": job["output"], "load_seconds": round(load_seconds, 4)}
+        start = time.perf_counter()
+        try:
+            if load_error:
+                raise RuntimeError(f"loading inputs failed: {load_error}")
+            data = job_data(job, loaded)
+            out = Path(job["output"])
+            out.parent.mkdir(parents=True, exist_ok=True)
+            sizes = dashboard.render(data, out, _TEMPLATE, job.get("options"), **html_options)
+            result.update(ok=True, bytes=out.stat().st_size)
+            if sizes:
+                result["json_bytes"], result["compact_json_bytes"] = sizes
+        except Exception as exc:
+            result.update(ok=False, error=f"{type(exc).__name__}: {exc}", traceback=traceback.format_exc())
+        result["seconds"] = round(time.perf_counter() - start, 4)
+        results.append(result)
+    return results
+
+
+def plan(jobs, workers):
+    """Group jobs by source, then split each group into at most ``workers`` chunks."""
+    groups = defaultdict(list)
+    for job in jobs:
+        groups[source_of(job)].append(job)
+    chunks = []
+    for source, group in groups.items():
+        size = math.ceil(len(group) / workers)
+        chunks.extend((source, group[i:i + size]) for i in range(0, len(group), size))
+    return chunks
+
+
+def main(manifest, workers=None, report=None, **html_options):
+    import dashboard
+
+    jobs = read_manifest(manifest)
+    workers = workers or max(min(len(jobs), os.cpu_count() or 1), 1)
+
+    start = time.perf_counter()
+    template = dashboard.load_template(Path(manifest).parent / ".cache")
+    if html_options.get("plotlyjs") == "shared":
+        # one bundle for the whole batch, written before the workers start referencing it
+        html_options["asset_dir"] = html_options.get("asset_dir") or Path(manifest).parent
+        plotlyjs_asset(html_options["asset_dir"], html_options.get("compress", ()))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template,)) as pool:
+        futures = {pool.submit(run_chunk, source, chunk, html_options): chunk for source, chunk in plan(jobs, workers)}
+        for future in as_completed(futures):
+            try:
+                chunk_results = future.result()
+            except Exception as exc:     # e.g. a worker process died
+                chunk_results = [{"output": job["output"], "ok": False, "error": f"{type(exc).__name__}: {exc}"}
+                                 for job in futures[future]]
+            for r in chunk_results:
+                status = f"{r['seconds']:7.3f}s" if r["ok"] else f"FAILED  {r['error']}"
+                if "compact_json_bytes" in r:
+                    status += f"  compact JSON {dashboard.size_change(r['json_bytes'], r['compact_json_bytes'])}"
+                print(f"{r['output']}: {status}")
+            results.extend(chunk_results)
+
+    failed = [r for r in results if not r["ok"]]
+    # with --compact, each job's figure JSON size before and after compacting
+    compact = {key: sum(r[key] for r in results if key in r) for key in ("json_bytes", "compact_json_bytes")}
+    summary = {
+        "jobs": len(results),
+        "failed": len(failed),
+        "workers": workers,
+        "wall_seconds": round(time.perf_counter() - start, 4),
+        "bytes": sum(r.get("bytes", 0) for r in results),
+        **(compact if compact["json_bytes"] else {}),
+        "results": sorted(results, key=lambda r: r["output"]),
+    }
+    print(f"{len(results) - len(failed)}/{len(results)} dashboards rendered in "
+          f"{summary['wall_seconds']:.2f}s with {workers} workers ({summary['bytes'] / 2**20:.1f} MB)")
+    if "json_bytes" in summary:
+        print(f"Compact figure JSON: {dashboard.size_change(summary['json_bytes'], summary['compact_json_bytes'])}")
+    if report:
+        Path(report).write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("manifest", type=Path, help="JSON or CSV list of jobs")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--report", type=Path, help="write per-job timings and failures as JSON")
+    parser.add_argument("--plotlyjs", choices=PLOTLYJS_MODES, default="inline",
+                        help="inline plotly.js, or reference one shared content-hashed plotly.min.js")
+    parser.add_argument("--asset-dir", type=Path,
+                        help="where the shared plotly.min.js goes (default: the manifest's directory)")
+    parser.add_argument("--compress", nargs="+", choices=COMPRESSIONS, default=(),
+                        help="also write pre-compressed .gz/.br siblings")
+    parser.add_argument("--compact", action="store_true",
+                        help="embed compacted figure JSON (binary typed arrays, shared layout items; see assets.py)")
+    args = parser.parse_args()
+    summary = main(args.manifest, args.workers, args.report,
+                   plotlyjs=args.plotlyjs, asset_dir=args.asset_dir, compress=args.compress, compact=args.compact)
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Benchmark the dashboard build pipeline at several dataset scales.
+
+Each scale generates synthetic student events with data_gen.py (cached in the
+work directory), then times the load, aggregate, template, figure and
+write_html stages separately in a fresh worker process, so peak memory is per
+scale. Each scale runs twice, in two fresh workers: timed untraced, then under
+tracemalloc for each stage's peak memory, so the tracing overhead never shows
+in the timings (or in max RSS).
+Results are written as JSON; pass --compare with an earlier results file to
+see the ratio of every stage time against it.
+
+A separate cold-start section times whole ``viz.py`` processes on the demo
+data: interpreter startup, importing viz, an up-to-date rebuild (which should
+return without importing pandas or plotly) and a full uncached build.
+"""
+
+import argparse, json, platform, resource, subprocess, sys, time, tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+# name -> (events, campuses)
+SCALES = {
+    "1k":   (1_000,      8),
+    "100k": (100_000,    50),
+    "1m":   (1_000_000,  200),
+    "10m":  (10_000_000, 1_000),
+    "50m":  (50_000_000, 2_000),
+}
+DEFAULT_SCALES = ["1k", "100k", "1m"]
+YEARS = 1
+EVENTS_PER_STUDENT_YEAR = 1.1   # one enrollment plus ~10% withdrawals
+
+
+def parse_scale(text):
+    """A preset name from SCALES, or ``EVENTS:CAMPUSES`` (e.g. ``5000000:500``)."""
+    if text in SCALES:
+        return text, SCALES[text]
+    try:
+        events, campuses = (int(part) for part in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected one of {list(SCALES)} or EVENTS:CAMPUSES, got {text!r}")
+    return text, (events, campuses)
+
+
+@contextmanager
+def timed(results, name):
+    """Record the wall time of the enclosed block under ``name``."""
+    start = time.perf_counter()
+    yield
+    results[name] = round(time.perf_counter() - start, 4)
+
+
+@contextmanager
+def traced(results, name):
+    """Record the traced peak memory of the enclosed block under ``name`` (tracemalloc must be running)."""
+    tracemalloc.reset_peak()
+    yield
+    _, peak = tracemalloc.get_traced_memory()
+    results[name] = round(peak / 2**20, 2)
+
+
+def events_file(work_dir, events, campuses, seed, fmt):
+    """Generate (or reuse) an events file for one scale."""
+    from data_gen import generate_events
+    from store import EXTENSIONS
+
+    path = work_dir / (f"events_{events}_{campuses}_{seed}" + EXTENSIONS.get(fmt, ".csv"))
+    if not path.exists():
+        students = max(int(events / (EVENTS_PER_STUDENT_YEAR * YEARS)), 1)
+        generate_events(path, students, campuses=campuses, years=YEARS, seed=seed, fmt=fmt)
+    return path
+
+
+def pipeline(path, html, stage):
+    """Build one events file's dashboard into ``html``, each stage inside ``stage(name)``; returns the rows."""
+    from assets import write_html
+    from events import read_events
+    import dashboard
+
+    with stage("load"):
+        events = read_events([path])
+    with stage("aggregate"):
+        data = dashboard.summarize_events(events)
+    with stage("template"):
+        template = dashboard.build_template()
+    with stage("figure"):
+        fig = dashboard.assemble_figure(template, dashboard.build_panels(data, dashboard.PANELS, template))
+    with stage("write_html"):
+        write_html(fig, html)
+    return len(events)
+
+
+def run_scale(path, out_dir, memory=False):
+    """
+    Time each pipeline stage on one events file, or with ``memory`` measure
+    each stage's traced peak instead (runs in a worker process).
+    """
+    html = out_dir / f"{path.stem}.html"
+    stages = {}
+    if memory:
+        tracemalloc.start()
+        pipeline(path, html, partial(traced, stages))
+        tracemalloc.stop()
+        return stages
+    rows = pipeline(path, html, partial(timed, stages))
+    return {
+        "rows": rows,
+        "stages": stages,
+        "total_seconds": round(sum(stages.values()), 4),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "html_bytes": html.stat().st_size,
+    }
+
+
+def timed_run(args, repeat=3):
+    """Best wall time of ``repeat`` runs of a Python subprocess, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return round(best, 4)
+
+
+def cold_start(work_dir, repeat=3):
+    """Wall time of fresh ``viz.py`` processes, from interpreter start to exit."""
+    viz_path = Path(__file__).with_name("viz.py")
+    out = work_dir / "cold_start.html"
+    timings = {
+        "python": timed_run(["-c", "pass"], repeat),
+        "import_viz": timed_run(["-c", f"import sys; sys.path.insert(0, {str(viz_path.parent)!r}); import viz"], repeat),
+        "full_build": timed_run([viz_path, "--no-cache", "--out", out], repeat),
+    }
+    timed_run([viz_path, "--out", out], 1)           # prime the cache
+    timings["up_to_date"] = timed_run([viz_path, "--out", out], repeat)
+    return timings
+
+
+def compare(results, baseline_path):
+    """Print each stage's time relative to a previous results file."""
+    baseline = {r["scale"]: r for r in json.loads(Path(baseline_path).read_text())["results"]}
+    for r in results:
+        old = baseline.get(r["scale"])
+        if old is None:
+            continue
+        for name, s in r["stages"].items():
+            before = old["stages"].get(name, {}).get("seconds")
+            if before:
+                print(f"{r['scale']:>8} {name:<12} {before:9.3f}s -> {s['seconds']:9.3f}s  x{s['seconds'] / before:.2f}")
+
+
+def main(scales, work_dir, out, seed=42, baseline=None, fmt="parquet"):
+    import numpy, pandas, plotly
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    startup = cold_start(work_dir)
+    print("cold start: " + "  ".join(f"{name} {seconds:.3f}s" for name, seconds in startup.items()))
+
+    results = []
+    for name, (events, campuses) in scales:
+        path = events_file(work_dir, events, campuses, seed, fmt)
+        # a fresh process per run keeps max RSS and import state independent
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(run_scale, path, work_dir).result()
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            peaks = pool.submit(run_scale, path, work_dir, memory=True).result()
+        result["stages"] = {stage: {"seconds": seconds, "peak_mb": peaks[stage]}
+                            for stage, seconds in result["stages"].items()}
+        result = {"scale": name, "events": events, "campuses": campuses, **result}
+        results.append(result)
+        print(f"{name:>8}: {result['rows']:>11,} rows  {result['total_seconds']:8.3f}s  "
+              f"{result['max_rss_mb']:8.1f} MB RSS  {result['html_bytes'] / 2**20:6.2f} MB HTML")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "versions": {"numpy": numpy.__version__, "pandas": pandas.__version__, "plotly": plotly.__version__},
+        "seed": seed,
+        "format": fmt,
+        "cold_start": startup,
+        "results": results,
+    }
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out}")
+    if baseline:
+        compare(results, baseline)
+    return report
+
+
+if __name__ == "__main__":
+    project_root = Path(__file__).resolve().parents[1]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", type=parse_scale,
+                        default=[parse_scale(s) for s in DEFAULT_SCALES],
+                        help=f"presets {list(SCALES)} or EVENTS:CAMPUSES")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="parquet",
+                        help="storage format of the generated events")
+    parser.add_argument("--work-dir", type=Path, default=project_root / "outputs" / "bench")
+    parser.add_argument("--out", type=Path,
+                        default=project_root / "outputs" / "bench" / f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    parser.add_argument("--compare", type=Path, help="earlier results JSON to compare stage times against")
+    args = parser.parse_args()
+    main(args.scales, args.work_dir, args.out, args.seed, args.compare, args.format)
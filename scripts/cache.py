@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Content-hash manifest and on-disk cache for incremental dashboard rebuilds.
+
+The manifest records a SHA-256 per input file (re-hashed only when the file's
+size or mtime changes), and each cached entry's file holds the key it was
+built with next to its value. An entry's key covers the hashes of the files
+it was built from plus a salt for the build code, so unchanged panels are
+reused instead of recomputed. Keeping the key in the entry file itself means
+an entry written by a build that failed before saving the manifest can never
+be served under the key it replaced.
+"""
+
+import hashlib, json, os
+from pathlib import Path
+
+READ_CHUNK = 1 << 20
+
+
+def sha256_file(path):
+    """SHA-256 hex digest of a file, read in bounded-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """Manifest of input hashes plus one JSON file per cached entry under ``cache_dir``."""
+
+    def __init__(self, cache_dir, salt=""):
+        self.dir = Path(cache_dir)
+        self.entry_dir = self.dir / "entries"
+        self.entry_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.dir / "manifest.json"
+        self.salt = salt
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+        self.manifest.setdefault("inputs", {})
+
+    def file_hash(self, path):
+        """Content hash of ``path``, reusing the manifest's hash while size and mtime match."""
+        path = Path(path)
+        stat = path.stat()
+        name = str(path.resolve())
+        entry = self.manifest["inputs"].get(name)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        digest = sha256_file(path)
+        self.manifest["inputs"][name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def key(self, name, paths, extra=""):
+        """Key for entry ``name`` built from ``paths`` (plus any ``extra`` parameters)."""
+        digest = hashlib.sha256(f"{name}\0{self.salt}\0{extra}".encode())
+        for path in paths:
+            digest.update(self.file_hash(path).encode())
+        return digest.hexdigest()
+
+    def _entry(self, name):
+        # {"key", "value"} of entry ``name``, or {} if absent or unreadable
+        try:
+            entry = json.loads((self.entry_dir / f"{name}.json").read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return entry if isinstance(entry, dict) else {}
+
+    def get(self, name, key):
+        """The cached value of ``name`` if it was stored under ``key``, else None."""
+        entry = self._entry(name)
+        return entry.get("value") if entry.get("key") == key else None
+
+    def stored(self, name):
+        """The last value stored for ``name``, whatever key it was stored under (None if absent)."""
+        return self._entry(name).get("value")
+
+    def put(self, name, key, value):
+        """Store a JSON-serializable ``value`` for ``name`` under ``key``."""
+        (self.entry_dir / f"{name}.json").write_text(json.dumps({"key": key, "value": value}))
+
+    def save(self):
+        """Write the manifest atomically, so an interrupted build never leaves it half-written."""
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2))
+        os.replace(tmp, self.manifest_path)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Year-over-year cohort retention from student-level enrollment events.
+
+Every ENROLL event becomes a student-year record (StudentID, school year,
+campus, grade). The records are sorted once by StudentID then year, so each
+student's years sit next to each other: a record is *retained* when the next
+one is the same student in the following school year, and a student's
+*cohort* is the year of their first record. Both come from comparing the
+sorted keys with their neighbours (a merge join of every year against the
+next) instead of row-wise joins, and the counts per group from
+``np.bincount`` over combined integer codes.
+
+    python scripts/cohort.py data/student_events.parquet --by Campus Grade --out retention.csv
+"""
+
+import argparse, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from events import ENROLL, GRADES, _codes, _month_index, read_events, school_year_of
+
+DIMENSIONS = ("Campus", "Grade", "Cohort")
+
+
+def grade_levels(categories):
+    """Grade labels in school order (known GRADES first, anything else after)."""
+    categories = list(categories)
+    return [g for g in GRADES if g in categories] + [c for c in categories if c not in GRADES]
+
+
+def grade_codes(events):
+    """Grade labels in school order and every row's code into them (-1 if missing or no Grade column)."""
+    if "Grade" not in events:
+        return [], np.full(len(events), -1, dtype=np.int64)
+    categories = events["Grade"].cat.categories
+    grades = grade_levels(categories)
+    lut = np.append(np.asarray([grades.index(c) for c in categories], dtype=np.int64), -1)
+    return grades, lut[_codes(events["Grade"])]      # code -1 (missing) maps to -1
+
+
+def sort_order(student, year):
+    """Indices sorting records by StudentID then year, stable within equal keys."""
+    if not len(student):
+        return np.arange(0)
+    first, span = year.min(), int(year.max() - year.min()) + 1
+    low = student.min()
+    if int(student.max() - low) < np.iinfo(np.int64).max // span:
+        # one int64 key sorts much faster than a two-key lexsort
+        return np.argsort((student - low) * span + (year - first), kind="stable")
+    return np.lexsort((year, student))
+
+
+def student_years(events, years=None):
+    """
+    One record per student and school year with an enrollment, sorted by StudentID then year.
+
+    Returns a dict of equal-length arrays ``student``, ``year``, ``campus``
+    and ``grade`` (codes into ``campuses`` / ``grades``, from the student's
+    first enrollment that year; ``grade`` is -1 without a Grade column),
+    ``cohort`` (first year enrolled in the records) and ``retained``
+    (enrolled again the next year). ``years`` limits the records to those
+    school years and the ones right after them.
+    """
+    # 1. Enrollment rows and their school years
+    year = school_year_of(_month_index(events))
+    enroll = (events["Event"] == ENROLL).to_numpy()
+    if years is not None:
+        enroll = enroll & np.isin(year, np.concatenate([years, np.add(years, 1)]))
+    rows = np.flatnonzero(enroll)
+    student = events["StudentID"].to_numpy()[rows]
+    year = year[rows]
+
+    # 2. Sort by student then year and drop repeat enrollments within a year
+    #    (e.g. transfers), keeping the first
+    order = sort_order(student, year)
+    student, year, rows = student[order], year[order], rows[order]
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = (student[1:] != student[:-1]) | (year[1:] != year[:-1])
+    student, year, rows = student[keep], year[keep], rows[keep]
+
+    # 3. Cohort: the year of each student's first record
+    starts = np.ones(len(rows), dtype=bool)
+    starts[1:] = student[1:] != student[:-1]
+    first = np.flatnonzero(starts)
+    cohort = np.repeat(year[first], np.diff(np.append(first, len(rows))))
+
+    # 4. Retained: the next record is the same student, one year later
+    retained = np.zeros(len(rows), dtype=bool)
+    retained[:-1] = ~starts[1:] & (year[1:] == year[:-1] + 1)
+
+    # 5. Campus and grade codes of the kept enrollments
+    grades, grade = grade_codes(events)
+    return {
+        "student": student, "year": year, "cohort": cohort, "retained": retained,
+        "campus": _codes(events["Campus"])[rows], "grade": grade[rows],
+        "campuses": list(events["Campus"].cat.categories), "grades": grades,
+    }
+
+
+def base_mask(rec, years=None):
+    """
+    Records that count towards retention: their year is followed by another
+    year in the records (limited to ``years``), and the student is not in the
+    final grade, i.e. about to graduate.
+    """
+    year = rec["year"]
+    base = np.isin(year + 1, np.unique(year))
+    if years is not None:
+        base &= np.isin(year, years)
+    if rec["grades"] and rec["grades"][-1] == GRADES[-1]:
+        base &= rec["grade"] != len(rec["grades"]) - 1
+    return base
+
+
+def retention_table(events, by=("Campus",), years=None):
+    """
+    Year-over-year retention grouped by school year and any of DIMENSIONS.
+
+    Returns one row per non-empty group with ``Year``, the ``by`` columns,
+    ``Enrolled`` (students enrolled that year), ``Retained`` (of those,
+    enrolled again the next year) and ``Retention Rate`` (percent). Only years
+    followed by another year in the data are included, ``years`` narrows them
+    further, and students in the final grade are left out as graduates.
+    """
+    unknown = [d for d in by if d not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"unknown retention dimension(s) {unknown}, expected some of {DIMENSIONS}")
+    if "Grade" in by and "Grade" not in events:
+        raise ValueError("grouping by Grade needs a Grade column in the events")
+
+    rec = student_years(events, years)
+    year = rec["year"]
+    present = np.unique(year)
+
+    # 1. Base records: years with a following year (and not graduating)
+    base = base_mask(rec, years)
+
+    # 2. One combined group code per record: year, then each dimension
+    first_year = int(present[0]) if len(present) else 0
+    span = int(present[-1]) - first_year + 1 if len(present) else 1
+    codes = {
+        "Campus": (rec["campus"], rec["campuses"]),
+        "Grade":  (rec["grade"], rec["grades"]),
+        "Cohort": (rec["cohort"] - first_year, list(range(first_year, first_year + span))),
+    }
+    columns = [year - first_year] + [codes[d][0] for d in by]
+    shape = [span] + [len(codes[d][1]) for d in by]
+    base &= np.all([c >= 0 for c in columns], axis=0)     # e.g. enrollments without a grade
+    group = np.ravel_multi_index([c[base] for c in columns], shape)
+
+    # 3. Count enrolled / retained per group and keep the non-empty ones
+    size = int(np.prod(shape))
+    enrolled = np.bincount(group, minlength=size)
+    retained = np.bincount(group, weights=rec["retained"][base], minlength=size).astype(np.int64)
+    groups = np.flatnonzero(enrolled)
+    index = np.unravel_index(groups, shape)
+
+    table = {"Year": index[0] + first_year}
+    for d, code in zip(by, index[1:]):
+        labels = codes[d][1]
+        table[d] = code + first_year if d == "Cohort" else np.asarray(labels, dtype=object)[code]
+    table["Enrolled"] = enrolled[groups]
+    table["Retained"] = retained[groups]
+    table["Retention Rate"] = np.round(100 * retained[groups] / enrolled[groups], 1)
+    return pd.DataFrame(table)
+
+
+def main(paths, by=("Campus",), school_year=None, out=None):
+    start = time.perf_counter()
+    events = read_events(paths, school_year=school_year)
+    loaded = time.perf_counter()
+    years = None if school_year is None else [school_year - 1]
+    table = retention_table(events, by, years)
+    done = time.perf_counter()
+
+    print(f"Read {len(events):,} events in {loaded - start:.2f}s, "
+          f"retention by {', '.join(['Year', *by])} in {done - loaded:.2f}s")
+    if out:
+        table.to_csv(out, index=False)
+        print(f"Wrote {len(table):,} rows to {out}")
+    else:
+        print(table.to_string(index=False))
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("events", nargs="+", type=Path, help="student event files (CSV, Parquet or Arrow)")
+    parser.add_argument("--by", nargs="*", choices=DIMENSIONS, default=["Campus"],
+                        help="dimensions to break retention down by, besides the school year")
+    parser.add_argument("--school-year", type=int,
+                        help="only retention from the year before this one into it")
+    parser.add_argument("--out", type=Path, help="write the table as CSV instead of printing it")
+    args = parser.parse_args()
+    main(args.events, args.by, args.school_year, args.out)
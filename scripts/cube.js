@@ -0,0 +1,188 @@
+// Switch the dashboard between slices of the embedded aggregate cube (see cube.py).
+//
+// viz.py fills in CUBE (the sparse cube), FIGURES (the all-campus figure of each
+// school year, drawn in Python) and SETTINGS (the initial selection plus the
+// panel constants the redraw mirrors). Picking a year shows that year's figure;
+// picking a campus, grade or reason recomputes the panels' numbers from the
+// cube cells of the slice, the same way cube.cube_slice does in Python.
+(function () {
+  const gd = document.getElementById("{plot_id}");
+  const CUBE = /*CUBE*/null;
+  const FIGURES = /*FIGURES*/null;
+  const SETTINGS = /*SETTINGS*/null;
+  const ALL = -1;
+  const dims = CUBE.dims;
+  const TYPED = {
+    i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+    i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array,
+  };
+
+  // Columns of a compact cube are base64 typed arrays ({dtype, bdata}, little-endian)
+  for (const table of ["enrollments", "withdrawals", "retention"]) {
+    for (const [name, column] of Object.entries(CUBE[table])) {
+      if (Array.isArray(column)) continue;
+      const bytes = Uint8Array.from(atob(column.bdata), (c) => c.charCodeAt(0));
+      CUBE[table][name] = new TYPED[column.dtype](bytes.buffer);
+    }
+  }
+  const selected = Object.assign({}, SETTINGS.selected);
+
+  // Cells of the selected year and grade for one campus code (ALL: every campus rolled up)
+  function cells(table, campus) {
+    const t = CUBE[table], out = [];
+    for (let i = 0; i < t.year.length; i++) {
+      if (t.year[i] === selected.year && t.grade[i] === selected.grade && t.campus[i] === campus) out.push(i);
+    }
+    return out;
+  }
+
+  function sum(table, rows, column) {
+    let total = 0;
+    for (const i of rows) total += CUBE[table][column][i];
+    return total;
+  }
+
+  // Per-campus sums of a column over the selected year and grade
+  function perCampus(table, column) {
+    const t = CUBE[table], out = new Array(dims.campus.length).fill(0);
+    for (let i = 0; i < t.year.length; i++) {
+      if (t.year[i] === selected.year && t.grade[i] === selected.grade && t.campus[i] >= 0) {
+        out[t.campus[i]] += t[column][i];
+      }
+    }
+    return out;
+  }
+
+  // Whole percent of integer counts, halves up: the same rule as events.percent in Python
+  function percent(part, whole) {
+    return Math.floor((200 * part + whole) / (2 * whole));
+  }
+
+  function niceStep(span, ticks = 2) {
+    const raw = Math.max(span / ticks, 1);
+    const scale = Math.pow(10, Math.floor(Math.log10(raw)));
+    return Math.max(...SETTINGS.y_tick_steps.map((s) => s * scale).filter((v) => v <= raw));
+  }
+
+  function patch(fig) {
+    const campus = selected.campus;
+    const enrolled = cells("enrollments", campus);
+    const withdrawn = cells("withdrawals", campus);
+    const back = cells("retention", campus);
+
+    // 1. KPI: year-over-year retention if the previous year is known, else non-withdrawal
+    const base = sum("retention", back, "enrolled");
+    let rate;
+    if (base) {
+      rate = percent(sum("retention", back, "retained"), base);
+    } else {
+      const total = sum("enrollments", enrolled, "count");
+      rate = percent(total - sum("withdrawals", withdrawn, "count"), Math.max(total, 1));
+    }
+    for (const note of fig.layout.annotations) {
+      if (note.name === "kpi") note.text = note.text.replace(/\d+%/, `${rate}%`);
+    }
+
+    // 2. Returning vs New composition
+    const comp = new Array(dims.category.length).fill(0);
+    for (const i of enrolled) {
+      const k = CUBE.enrollments.category[i];
+      if (k < comp.length) comp[k] += CUBE.enrollments.count[i];
+    }
+    const compBar = fig.data.find((t) => t.meta === "kpi");
+    compBar.x = compBar.y.map((label) => comp[dims.category.indexOf(label)]);
+    compBar.text = compBar.x.map((v) => `${(v / 1000).toFixed(1)}K`);
+
+    // 3. Retention of each campus bar in the selected grade (histogram / ranked points stay as drawn)
+    const school = fig.data.find((t) => t.meta === "school" && t.type === "bar");
+    if (school && school.x.every((x) => dims.campus.includes(x))) {
+      const start = perCampus("retention", "enrolled");
+      const yoy = start.some((v) => v > 0);
+      const denom = yoy ? start : perCampus("enrollments", "count");
+      const kept = yoy ? perCampus("retention", "retained") : perCampus("withdrawals", "count").map((w, c) => denom[c] - w);
+      school.y = school.x.map((x) => {
+        const c = dims.campus.indexOf(x);
+        return denom[c] > 0 ? percent(kept[c], denom[c]) : null;
+      });
+      school.text = school.y.map((r) => (r === null ? "" : `${r}%`));
+    }
+
+    // 4. Withdrawals by month and reason (the reason filter only narrows the stacked bars)
+    const nReasons = dims.reason.length;
+    const byMonth = Array.from({ length: 12 }, () => new Array(nReasons).fill(0));
+    const perReason = new Array(nReasons).fill(0);
+    for (const i of withdrawn) {
+      const r = CUBE.withdrawals.reason[i];
+      if (r < nReasons) {
+        byMonth[CUBE.withdrawals.month[i]][r] += CUBE.withdrawals.count[i];
+        perReason[r] += CUBE.withdrawals.count[i];
+      }
+    }
+
+    // 5. Pie: the top reasons by count, the rest folded into "Other"
+    const pie = fig.data.find((t) => t.meta === "pie");
+    const ranked = perReason.map((v, r) => r).filter((r) => perReason[r] > 0).sort((a, b) => perReason[b] - perReason[a]);
+    const top = ranked.slice(0, SETTINGS.pie_top_n);
+    const rest = ranked.slice(SETTINGS.pie_top_n).reduce((s, r) => s + perReason[r], 0);
+    pie.labels = top.map((r) => SETTINGS.pie_labels[r]);
+    pie.values = top.map((r) => perReason[r]);
+    pie.hovertext = top.map((r) => dims.reason[r]);
+    pie.marker = Object.assign({}, pie.marker, { colors: top.map((r) => SETTINGS.reason_colors[r]) });
+    if (rest) {
+      pie.labels.push(SETTINGS.other.label);
+      pie.values.push(rest);
+      pie.hovertext.push(SETTINGS.other.reason);
+      pie.marker.colors.push(SETTINGS.other.color);
+    }
+
+    // 6. District stack, totals, y axis and the guide lines that follow its ticks
+    const bars = fig.data.filter((t) => t.meta === "district");
+    if (!bars.length) return;
+    const months = bars[0].x;
+    const totals = months.map(() => 0);
+    for (const bar of bars) {
+      const r = dims.reason.indexOf(bar.name);
+      const shown = selected.reason === ALL || selected.reason === r;
+      bar.y = months.map((_, m) => (shown && m < 12 ? byMonth[m][r] : 0));
+      bar.y.forEach((v, m) => (totals[m] += v));
+    }
+    const yTop = Math.max(Math.max(...totals), 1) * 1.1;
+    const step = niceStep(yTop);
+    const ticks = [];
+    for (let i = 0; i <= Math.floor(yTop / step); i++) ticks.push(i * step);
+    const yaxis = fig.layout.yaxis3;
+    yaxis.range = [0, yTop];
+    yaxis.tickvals = ticks;
+
+    fig.layout.annotations = fig.layout.annotations.filter((note) => note.name !== "total");
+    months.forEach((m, i) => fig.layout.annotations.push(
+      Object.assign({}, SETTINGS.total_note, { x: m, y: totals[i] + 2, text: String(totals[i]) })
+    ));
+
+    const bottom = ((SETTINGS.guide_bottom - yaxis.domain[0]) / (yaxis.domain[1] - yaxis.domain[0])) * yTop;
+    const tickGuide = fig.layout.shapes.find((s) => s.name === "tick_guide");
+    fig.layout.shapes = fig.layout.shapes.filter((s) => s.name !== "tick_guide");
+    for (const shape of fig.layout.shapes) {
+      if (shape.name === "end_guide") Object.assign(shape, { y0: bottom, y1: ticks[ticks.length - 1] });
+    }
+    if (tickGuide) {
+      for (const v of ticks.slice(1)) fig.layout.shapes.push(Object.assign({}, tickGuide, { y0: v, y1: v }));
+    }
+  }
+
+  function draw() {
+    const fig = JSON.parse(JSON.stringify(FIGURES[dims.year[selected.year]]));
+    if (selected.campus !== ALL || selected.grade !== ALL || selected.reason !== ALL) patch(fig);
+    for (const menu of fig.layout.updatemenus) {
+      menu.active = menu.buttons.findIndex((b) => b.args[0] === selected[menu.name]);
+    }
+    Plotly.react(gd, fig.data, fig.layout);
+  }
+
+  gd.on("plotly_buttonclicked", (event) => {
+    const name = event.menu.name;
+    if (!(name in selected)) return;
+    selected[name] = event.button.args[0];
+    draw();
+  });
+})();
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Sparse aggregate cube of student events, for drilling into the dashboard in the browser.
+
+The cube holds every count the panels are drawn from, by school year x campus
+(x grade): enrollments by Returning/New category, withdrawals by month and
+reason, and year-over-year retention (see cohort.py). Only non-empty cells
+are stored, as parallel arrays of small integer codes into the dimension
+labels plus their counts, and every cell is also rolled up to all campuses
+and/or all grades (code ``ALL``). Selecting a slice is then an equality
+filter on the code arrays, in Python (``cube_slice``) or in the page
+(cube.js), with no summing over campuses.
+"""
+
+import itertools, json
+
+import numpy as np
+import pandas as pd
+
+from cohort import base_mask, grade_codes, student_years
+from events import ENROLL, SCHOOL_YEAR_START, WITHDRAW, _codes, _month_index, district_table, percent, school_year_of
+
+ALL = -1            # code of a dimension rolled up over all its values
+MONTHS = 12         # withdrawal months per school year, from SCHOOL_YEAR_START
+
+
+def _cells(columns, sizes, values):
+    """
+    Sum ``values`` (name -> array) per distinct combination of the code
+    ``columns`` (name -> array, ``ALL`` allowed), keeping only non-empty cells.
+    """
+    names = list(columns)
+    shape = [sizes[n] + 1 for n in names]       # +1 leaves room for ALL
+    key = np.ravel_multi_index([np.asarray(columns[n]) + 1 for n in names], shape)
+    size = int(np.prod(shape))
+    if size <= 4 * len(key):
+        # dense enough to count straight into the full grid, without sorting
+        used = np.bincount(key, minlength=size) > 0
+        cells = np.flatnonzero(used)
+        inverse = (np.cumsum(used) - 1)[key]
+    else:
+        cells, inverse = np.unique(key, return_inverse=True)
+    out = {n: (c - 1).astype(np.int32) for n, c in zip(names, np.unravel_index(cells, shape))}
+    for name, v in values.items():
+        out[name] = np.bincount(inverse, weights=v, minlength=len(cells)).astype(np.int64)
+    return out
+
+
+def _rolled_up(columns, sizes, values, rollup):
+    """Cells at full grain plus each combination of the ``rollup`` columns summed to ``ALL``."""
+    grain = _cells(columns, sizes, values)
+    parts = [grain]
+    for rolled in itertools.product([False, True], repeat=len(rollup)):
+        if any(rolled):
+            part = dict(grain)
+            for name in itertools.compress(rollup, rolled):
+                part[name] = np.full(len(grain[name]), ALL, dtype=np.int32)
+            parts.append(part)
+    merged = {n: np.concatenate([p[n] for p in parts]) for n in grain}
+    return _cells({n: merged[n] for n in columns}, sizes, {n: merged[n] for n in values})
+
+
+def build_cube(events, grades=True):
+    """
+    Aggregate student events into a sparse cube (dict of dimension labels and cell tables).
+
+    ``grades=False`` (or events without a Grade column) leaves grade out, which
+    keeps the cube about an order of magnitude smaller for large districts.
+    Missing categories, reasons and grades are counted in an extra trailing
+    code, so totals match ``events.aggregate_events``.
+    """
+    # 1. Per-row school year, campus and grade codes
+    month = _month_index(events)
+    year = school_year_of(month)
+    first = int(year.min()) if len(year) else 0
+    present = np.bincount(year - first) > 0
+    years = np.flatnonzero(present) + first
+    year_code = (np.cumsum(present) - 1)[year - first]
+    campuses = list(events["Campus"].cat.categories)
+    campus = _codes(events["Campus"])
+    grade_labels, grade = grade_codes(events) if grades else ([], np.full(len(events), -1))
+    grade = np.where(grade < 0, len(grade_labels), grade)
+    sizes = {"year": len(years), "campus": len(campuses), "grade": len(grade_labels) + 1}
+
+    # 2. Enrollments by category
+    categories = list(events["Category"].cat.categories)
+    enroll = (events["Event"] == ENROLL).to_numpy()
+    category = _codes(events["Category"])[enroll]
+    enrollments = _rolled_up(
+        {"year": year_code[enroll], "campus": campus[enroll], "grade": grade[enroll],
+         "category": np.where(category < 0, len(categories), category)},
+        dict(sizes, category=len(categories) + 1),
+        {"count": None},
+        ["campus", "grade"],
+    )
+
+    # 3. Withdrawals by month of the school year and reason
+    reasons = list(events["Reason"].cat.categories)
+    withdraw = (events["Event"] == WITHDRAW).to_numpy()
+    reason = _codes(events["Reason"])[withdraw]
+    withdrawals = _rolled_up(
+        {"year": year_code[withdraw], "campus": campus[withdraw], "grade": grade[withdraw],
+         "month": month[withdraw] - (year[withdraw] * 12 + SCHOOL_YEAR_START - 1),
+         "reason": np.where(reason < 0, len(reasons), reason)},
+        dict(sizes, month=MONTHS, reason=len(reasons) + 1),
+        {"count": None},
+        ["campus", "grade"],
+    )
+
+    # 4. Retention into each year, by the campus and grade students had the year before
+    rec = student_years(events)
+    base = base_mask(rec)
+    rec_grade = rec["grade"] if grades else np.full(len(base), -1)
+    retention = _rolled_up(
+        {"year": np.searchsorted(years, rec["year"][base] + 1), "campus": rec["campus"][base],
+         "grade": np.where(rec_grade < 0, len(grade_labels), rec_grade)[base]},
+        sizes,
+        {"enrolled": None, "retained": rec["retained"][base].astype(np.int64)},
+        ["campus", "grade"],
+    )
+
+    return {
+        "dims": {
+            "year": years.tolist(), "campus": campuses, "grade": grade_labels,
+            "category": categories, "reason": reasons,
+        },
+        "enrollments": enrollments,
+        "withdrawals": withdrawals,
+        "retention": retention,
+    }
+
+
+def cube_cells(cube):
+    """Number of stored cells over every table of the cube."""
+    return sum(len(cube[t]["year"]) for t in ("enrollments", "withdrawals", "retention"))
+
+
+def cube_json(cube, binary=False):
+    """
+    The cube as compact JSON: code arrays as plain int lists, or with
+    ``binary`` as base64 typed arrays in the smallest dtype that holds them
+    (``assets.typed_array``; cube.js decodes either).
+    """
+    if binary:
+        from assets import typed_array
+        column = lambda v: typed_array(v.tolist(), min_length=0) or v.tolist()
+    else:
+        column = lambda v: v.tolist()
+    tables = {t: {k: column(v) for k, v in cube[t].items()} for t in ("enrollments", "withdrawals", "retention")}
+    return json.dumps({"dims": cube["dims"], **tables}, separators=(",", ":"))
+
+
+def _select(table, year, campus, grade):
+    rows = (table["year"] == year) & (table["campus"] == campus) & (table["grade"] == grade)
+    return {k: v[rows] for k, v in table.items()}
+
+
+def cube_slice(cube, school_year=None, campus=None, grade=None):
+    """
+    Dashboard inputs for one slice of the cube, like ``events.aggregate_events``.
+
+    ``school_year`` defaults to the latest year; ``campus`` and ``grade`` are
+    labels (None for all). The school panel lists every campus in the grade
+    slice, or only ``campus`` when one is selected.
+    """
+    dims = cube["dims"]
+    school_year = max(dims["year"]) if school_year is None else school_year
+    y = dims["year"].index(school_year)
+    c = ALL if campus is None else dims["campus"].index(campus)
+    g = ALL if grade is None else dims["grade"].index(grade)
+    enrolled = _select(cube["enrollments"], y, c, g)
+    withdrawn = _select(cube["withdrawals"], y, c, g)
+    retained = _select(cube["retention"], y, c, g)
+
+    # 1. KPI: year-over-year retention when the previous year is in the cube,
+    #    else the share of enrolled students that did not withdraw
+    if retained["enrolled"].sum():
+        rate = percent(retained["retained"].sum(), retained["enrolled"].sum())
+    else:
+        total = int(enrolled["count"].sum())
+        rate = percent(total - int(withdrawn["count"].sum()), max(total, 1))
+    kpi = pd.Series({"retention_rate": int(rate)})
+
+    # 2. Returning vs New composition
+    n_categories = len(dims["category"])
+    valid = enrolled["category"] < n_categories
+    comp = (
+        pd.DataFrame({
+            "Category": pd.Categorical(dims["category"]),
+            "Count": np.bincount(enrolled["category"][valid], weights=enrolled["count"][valid],
+                                 minlength=n_categories).astype(np.int64),
+        })
+        .sort_values("Count", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+
+    # 3. Retention by campus, from the per-campus cells of the same slice
+    n_campuses = len(dims["campus"])
+    campus_cells = {}
+    for name in ("enrollments", "withdrawals", "retention"):
+        table = cube[name]
+        rows = (table["year"] == y) & (table["grade"] == g) & (table["campus"] >= 0)
+        if c != ALL:
+            rows &= table["campus"] == c
+        campus_cells[name] = {k: v[rows] for k, v in table.items()}
+
+    def per_campus(name, value):
+        cells = campus_cells[name]
+        return np.bincount(cells["campus"], weights=cells[value], minlength=n_campuses)
+
+    if retained["enrolled"].sum():
+        base, back = per_campus("retention", "enrolled"), per_campus("retention", "retained")
+        has_students = base > 0
+        rates = percent(back[has_students], base[has_students])
+    else:
+        students, gone = per_campus("enrollments", "count"), per_campus("withdrawals", "count")
+        has_students = students > 0
+        rates = percent((students - gone)[has_students], students[has_students])
+    school = pd.DataFrame({
+        "Campus":         pd.Categorical.from_codes(np.flatnonzero(has_students), dims["campus"]),
+        "Retention Rate": rates,
+    })
+
+    # 4. Month x reason withdrawals from the start of the school year to the
+    #    last month with a withdrawal
+    reasons = dims["reason"]
+    valid = withdrawn["reason"] < len(reasons)
+    month, reason, count = withdrawn["month"][valid], withdrawn["reason"][valid], withdrawn["count"][valid]
+    n_months = int(month.max()) + 1 if len(month) else 1
+    counts = np.bincount(month * len(reasons) + reason, weights=count,
+                         minlength=n_months * len(reasons)).astype(np.int64)
+
+    grid_year, grid_month = np.divmod(np.arange(n_months) + school_year * 12 + SCHOOL_YEAR_START - 1, 12)
+    district = district_table(grid_year, grid_month, reasons, counts.reshape(n_months, len(reasons)))
+
+    return {"kpi": kpi, "comp": comp, "school": school, "district": district}
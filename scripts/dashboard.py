@@ -0,0 +1,1094 @@
+#!/usr/bin/env python3
+"""
+Draw the Student Retention dashboard: load its inputs (or aggregate student
+events), fill each panel of a frozen plotly template and write the page.
+
+viz.py is the command line; it imports this module only once a build is
+needed, so an up-to-date dashboard never loads pandas or plotly.
+"""
+import calendar, copy, json, math, os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+from plotly.subplots import make_subplots
+
+from assets import compact_figure, write_html
+from cache import BuildCache
+from cube import build_cube, cube_cells, cube_json, cube_slice
+from events import aggregate_events, read_events
+from loader import LOAD_WORKERS, read_districts, read_inputs
+from reasons import OTHER_REASON, REASONS
+from stream import CHUNK_ROWS
+from timing import span
+from trend import Z_THRESHOLD, anomalies, district_trend, withdrawal_history
+from viz import (SCHOOL_BARS_MAX, SCHOOL_BIN_WIDTH, SCHOOL_GL_MIN, SCHOOL_LOW_COLOR, SCHOOL_MODES, SCHOOL_TOP_K,
+                 build_signature, code_fingerprint)
+
+LEGEND_DOT = "\u25CF"
+
+
+def text_labels(*parts):
+    """
+    Labels joined elementwise from arrays and constant strings, as a list:
+    ``text_labels(rates, "%")``. Numbers are formatted as by ``str``, and
+    each part is formatted and appended as a whole array.
+    """
+    labels = np.asarray("")
+    for part in parts:
+        labels = np.char.add(labels, part if isinstance(part, str) else np.asarray(part).astype(str))
+    return np.atleast_1d(labels).tolist()
+
+
+# Input name -> file stem in data/ (the KPI is JSON when stored as CSV)
+INPUT_FILES = {
+    "kpi":      "retention_kpi",
+    "comp":     "student_composition",
+    "school":   "retention_by_school",
+    "district": "district_withdrawals",
+}
+
+
+def input_path(data_dir, name, fmt="csv"):
+    """Path of input ``name`` in ``data_dir`` for a storage format."""
+    if fmt == "csv":
+        return data_dir / (INPUT_FILES[name] + (".json" if name == "kpi" else ".csv"))
+    from store import EXTENSIONS
+    return data_dir / (INPUT_FILES[name] + EXTENSIONS[fmt])
+
+
+def load_inputs(data_dir, fmt="csv", names=INPUT_FILES, chunk_rows=CHUNK_ROWS, workers=LOAD_WORKERS):
+    """Read pre-aggregated dashboard inputs (all, or just ``names``) as CSV/JSON, Parquet or Arrow.
+
+    The files are read concurrently on up to ``workers`` threads and checked
+    against ``loader.SCHEMAS``. The district withdrawals can be arbitrarily
+    long histories, so they are streamed in chunks of ``chunk_rows`` rows and
+    summed per month and reason.
+    """
+    return read_inputs({name: input_path(data_dir, name, fmt) for name in names}, chunk_rows, workers)
+
+
+def load_districts(data_dirs, fmt="csv", names=INPUT_FILES, chunk_rows=CHUNK_ROWS, workers=LOAD_WORKERS):
+    """
+    ``load_inputs`` for many district directories at once, every file on one
+    thread pool. Returns ``(loaded, failed)``, keyed by directory (see
+    ``loader.read_districts``).
+    """
+    districts = {d: {name: input_path(Path(d), name, fmt) for name in names} for d in data_dirs}
+    return read_districts(districts, chunk_rows, workers)
+
+
+def summarize_events(events, school_year=None, campuses=None):
+    """Aggregate loaded student events into the same inputs as ``load_inputs``."""
+    return aggregate_events(events, school_year=school_year, campuses=campuses)
+
+
+def load_events(paths, school_year=None, campuses=None):
+    """Read raw student event files and aggregate them like ``summarize_events``."""
+    with span("read_events"):
+        events = read_events(paths, school_year=school_year)
+    with span("aggregate"):
+        return summarize_events(events, school_year, campuses)
+
+
+def base_figure():
+    """The static 2x2 layout that every panel is drawn into."""
+    # Create a 2x2 subplot figure
+    fig = make_subplots(
+        rows=2, cols=2,
+        specs=[[{"type":"xy"},{"type":"xy"}],
+               [{"type":"domain"},{"type":"xy"}]],
+        column_widths=[0.4,0.6],        # first column 40%, second 60%
+        row_heights=[0.33, 0.67],       # first row 33%, second 67%
+        subplot_titles=(
+            "<b>STUDENT RETENTION KPI</b>",
+            "<b>RETENTION BY SCHOOL</b>",
+            "<b>TOP WITHDRAWAL REASONS</b>",
+            "<b>DISTRICT WITHDRAWALS</b>",
+
+
+        )
+    )
+# Repositioning Annotations
+    # Annotation 0 → “STUDENT RETENTION KPI” (row 1, col 1)
+    fig.layout.annotations[0].update(
+        x=0.02,  # 2% from left paper edge
+        y=0.98,  # 98% up the paper
+        xanchor="left",
+        yanchor="top",
+        font=dict(size=16)
+    )
+
+    # Annotation 1 → “RETENTION BY SCHOOL” (row 1, col 2)
+    fig.layout.annotations[1].update(
+        x=0.42 + 0.02,  # start of col 2 + small inset
+        y=0.98,
+        xanchor="left",
+        yanchor="top",
+        font=dict(size=16)
+    )
+
+    # Annotation 2 → “DISTRICT WITHDRAWALS” (row 2, col 1)
+    fig.layout.annotations[2].update(
+        x=0.02,
+        y=0.55,  # mid‐cell for the second row
+        xanchor="left",
+        yanchor="top",
+        font=dict(size=16)
+    )
+
+    # Annotation 3 → “TOP WITHDRAWAL REASONS” (row 2, col 2)
+    fig.layout.annotations[3].update(
+        x=0.42 + 0.02,
+        y=0.55,
+        xanchor="left",
+        yanchor="top",
+        font=dict(size=16)
+    )
+
+    fig.update_layout(
+        width=1500, # These lines make the entire figure a landscape style view
+        height=800,
+        margin=dict(l=20, r=20, t=100, b=20),
+        plot_bgcolor="white",
+    )
+
+
+    # ───────────────────────────────────────────────────────────────────────────
+    # DRAW BOXES AROUND EACH SUBPLOT USING RECTANGLE SHAPES
+    # ───────────────────────────────────────────────────────────────────────────
+    '''
+    cw, ch = 0.4, 0.33  # column width of col1, row height of row1
+    boxes = [
+        # (x0, x1, y0, y1)
+        (0.0, cw, 1 - ch, 1.0),  # row1, col1
+        (cw, 1.0, 1 - ch, 1.0),  # row1, col2
+        (0.0, cw, 0.0, 1 - ch),  # row2, col1
+        (cw, 1.0, 0.0, 1 - ch),  # row2, col2
+    ]
+
+    for x0, x1, y0, y1 in boxes:
+        fig.add_shape(
+            type="rect",
+            xref="paper", yref="paper",
+            x0=x0, x1=x1, y0=y0, y1=y1,
+            line=dict(color="black", width=1),
+            fillcolor="rgba(0,0,0,0)"  # transparent
+        )
+    '''
+
+    return fig
+
+
+###
+# SUBPLOT (1,1) = STUDENT RETENTION KPI
+###
+
+def style_kpi_panel(fig):
+    """Static styling of the top-left panel: axes and the 0K/2K guide lines."""
+    fig.update_xaxes(
+        row=1, col=1,
+        domain=[0.18,0.40], # This adjusts the top-left bar graph to only go from 30% to 98% of the top-left subplot.
+        tickvals=[0, 2000],
+        ticktext=["0K", "2K"],
+        showgrid=False,
+        gridcolor="gray",
+        gridwidth=1,
+        griddash="dash",
+        ticklabelstandoff=50, # This moves the ticklabels below the graph
+    )
+
+    fig.update_yaxes(
+        row=1, col=1,
+        domain=[0.8,0.88],
+        tickfont=dict(color="rgba(128, 128, 128, 0.6)"), # The last number here is the opacity
+        ticklabelstandoff=10,
+    )
+
+    fig.add_shape( # This code adds the gray dashed line at the 2K mark on the x-axis.
+        type="line",  # Note that yref had to be y domain instead of y1 to fix this.
+        xref="x1", yref="y domain",
+        x0=2000, x1=2000,
+        y0=-.9, y1=1.5,
+        line=dict(color="rgba(128, 128, 128, 0.15)", dash="dash"),
+        layer="above",
+    )
+
+    fig.add_shape(  # This code adds the gray dashed line at the 2K mark on the x-axis.
+        type="line",  # Note that yref had to be y domain instead of y1 to fix this.
+        xref="x1", yref="y domain",
+        x0=0, x1=0,
+        y0=-.9, y1=1.5,
+        line=dict(color="rgba(128, 128, 128, 0.15)", dash="dash"),
+        layer="above",
+    )
+
+    # - Bar chart of Returning vs New
+    kpi_bar = go.Bar(
+        orientation="h",
+        marker_color="#9DE2F3",
+        textposition="inside",
+        showlegend=False,
+        xaxis="x", yaxis="y",
+        meta="kpi",
+    )
+
+    # - Big KPI % annotation at top-left
+    kpi_note = go.layout.Annotation(
+        xref="x domain", yref="y domain",
+        x=-0.7, y=0.5,       # position above the bar chart
+        showarrow=False,
+        font=dict(size=36),
+        align="right",
+        name="kpi",
+    )
+    return {"traces": {"kpi": kpi_bar}, "annotations": {"kpi": kpi_note}}
+
+
+def kpi_panel(t, data):
+    """Top-left: KPI annotation + Returning/New composition bar."""
+    comp_df = data["comp"].iloc[::-1]   # This reverses the order of the rows so that the graphic matches the image.
+    bar = dict(
+        t["traces"]["kpi"],
+        x=comp_df["Count"].tolist(),
+        y=comp_df["Category"].tolist(),
+        text=np.char.mod("%.1fK", comp_df["Count"].to_numpy() / 1000).tolist(),
+    )
+    note = dict(
+        t["annotations"]["kpi"],
+        text=(
+            f"<b><span style='color:#9DE2F3'>{int(data['kpi']['retention_rate'])}%</span>"
+            f"<br><span style='font-size:18px; color:rgba(128, 128, 128, 0.6)'>Retention</span></b>"
+        ),
+    )
+    return {"data": [bar], "annotations": [note]}
+
+
+###
+# SUBPLOT (1,2) = RETENTION BY SCHOOL
+###
+
+def style_school_panel(fig):
+    """Static styling of the top-right panel."""
+    fig.update_xaxes(
+        row=1, col=2,
+        domain=[0.45,0.98],
+        tickfont=dict(size=10),
+        showgrid=False,
+        zeroline=False,
+    )
+    fig.update_yaxes(
+        row=1, col=2,
+        domain=[0.70, 0.9],
+        range=[0,100],
+        showgrid=False,
+        zeroline=False,
+        showticklabels=False,
+    )
+
+    school_bar = go.Bar(
+        marker_color="#3BD2E5",
+        textposition="inside",
+        insidetextfont=dict(color="white", size=12, family="Arial, sans-serif"),
+        showlegend=False,
+        xaxis="x2", yaxis="y2",
+        meta="school",
+    )
+    # Every campus as a WebGL point, ranked by retention, for state-scale data
+    school_points = go.Scattergl(
+        mode="markers",
+        marker=dict(color="#3BD2E5", size=4),
+        hoverinfo="text",
+        showlegend=False,
+        xaxis="x2", yaxis="y2",
+        meta="school",
+    )
+    # Caption saying what a scaled-down panel shows
+    school_note = go.layout.Annotation(
+        xref="x2 domain", yref="y2 domain",
+        x=0.5, y=1.12,
+        showarrow=False,
+        font=dict(size=11, color="rgba(128, 128, 128, 0.8)"),
+    )
+    return {
+        "traces": {"school": school_bar, "school_points": school_points},
+        "annotations": {"school": school_note},
+    }
+
+
+def school_mode(n_campuses, mode="auto"):
+    """The drawing mode for ``n_campuses``: "auto" keeps one bar per campus while they fit."""
+    if mode not in SCHOOL_MODES:
+        raise ValueError(f"unknown school mode {mode!r}, expected one of {SCHOOL_MODES}")
+    if mode == "auto":
+        return "bars" if n_campuses <= SCHOOL_BARS_MAX else "extremes"
+    return mode
+
+
+def school_panel(t, data, mode="auto", k=SCHOOL_TOP_K):
+    """Top-right: retention rate by campus.
+
+    Small districts get one bar per campus. At state scale the panel shows
+    the ``k`` highest and lowest campuses ("extremes"), a histogram of the
+    campus rates ("histogram"), or every campus ranked, drawn with WebGL
+    above ``SCHOOL_GL_MIN`` campuses ("all"), so the output stays bounded.
+    """
+    school_df = data["school"]
+    campuses = school_df["Campus"].astype(str).to_numpy()
+    rates = school_df["Retention Rate"].to_numpy()
+    n = len(rates)
+    mode = school_mode(n, mode)
+    bar, note = t["traces"]["school"], t["annotations"]["school"]
+
+    if mode == "bars":
+        return {"data": [dict(
+            bar,
+            x=campuses.tolist(),
+            y=rates.tolist(),
+            text=text_labels(rates, "%"),
+        )]}
+
+    if mode == "histogram":
+        edges = np.arange(0, 100 + SCHOOL_BIN_WIDTH, SCHOOL_BIN_WIDTH)
+        counts, _ = np.histogram(rates, bins=edges)
+        used = np.flatnonzero(counts)
+        keep = slice(used[0], used[-1] + 1) if len(used) else slice(0, 0)
+        labels = text_labels(edges[:-1], "-", edges[1:], "%")[keep]
+        return {
+            "data": [dict(bar, x=labels, y=counts[keep].tolist(), text=counts[keep].tolist())],
+            "annotations": [dict(note, text=f"Campuses by retention rate ({n:,} campuses)")],
+            "layout": {"yaxis2": dict(t["layout"]["yaxis2"], range=[0, int(counts.max(initial=0) * 1.15) + 1])},
+        }
+
+    # ranked, highest retention first (stable, so ties keep the input order)
+    order = np.argsort(-rates, kind="stable")
+    if mode == "extremes" and n > 2 * k:
+        order = np.concatenate([order[:k], order[-k:]])
+        colors = [bar["marker"]["color"]] * k + [SCHOOL_LOW_COLOR] * k
+        return {
+            "data": [dict(
+                bar,
+                x=campuses[order].tolist(),
+                y=rates[order].tolist(),
+                text=text_labels(rates[order], "%"),
+                marker=dict(bar["marker"], color=colors),
+            )],
+            "annotations": [dict(note, text=f"Highest and lowest {k} of {n:,} campuses")],
+        }
+    if mode == "all" and n > SCHOOL_GL_MIN:
+        return {
+            "data": [dict(
+                t["traces"]["school_points"],
+                x=np.arange(1, n + 1).tolist(),
+                y=rates[order].tolist(),
+                hovertext=text_labels(campuses[order], ": ", rates[order], "%"),
+            )],
+            "annotations": [dict(note, text=f"All {n:,} campuses, ranked by retention")],
+            "layout": {"xaxis2": dict(t["layout"]["xaxis2"], showticklabels=False)},
+        }
+    return {"data": [dict(
+        bar,
+        x=campuses[order].tolist(),
+        y=rates[order].tolist(),
+        text=text_labels(rates[order], "%"),
+    )]}
+
+
+###
+# SUBPLOT (2,1) TOP WITHDRAWAL REASONS (PIE CHART)
+###
+
+PIE_TOP_N = 5           # slices shown before the rest is folded into "Other"
+
+def style_pie_panel(fig):
+    """Static styling of the bottom-left panel: the pie itself and the horizontal legend."""
+    pie = go.Pie(
+        textinfo="percent",
+        sort=False,
+        direction="clockwise",
+        insidetextorientation="radial",
+        showlegend=True,
+        domain=dict(x=[0.02, 0.35], y=[0.15, 0.45]),
+        pull=[0,0,0,0,0],
+        textposition="outside",
+        textfont=dict(size=14),
+        hoverinfo="text+value+percent",
+        meta="pie",
+    )
+
+    fig.update_layout(
+        legend=dict(
+            orientation="h",
+
+            # paper coords:
+            xref="paper",
+            yref="paper",
+
+            # line up left edge with pie (0.02) and bottom edge at y=0.05
+            x=0.001,
+            y=0.05,
+            xanchor="left",
+            yanchor="bottom",
+
+            # let each entry size itself to its text
+            itemsizing="constant",
+            # if you still want a hard max width, itemwidth can help,
+            # but often you can omit it now:
+             itemwidth=30,
+
+            # small gap between each item
+            tracegroupgap=0,
+
+            font=dict(size=9.8),
+            itemclick=False,
+            itemdoubleclick=False,
+        )
+    )
+    return {"traces": {"pie": pie}}
+
+
+def pie_table(district_df, top_n=PIE_TOP_N):
+    """
+    Withdrawals per reason for the pie: the ``top_n`` reasons by count, largest
+    first, with every other reason folded into one "Other" slice.
+
+    One grouped sum over the withdrawal counts, so thousands of distinct
+    reason codes cost no more than a handful. Each slice's Label (short) and
+    Color come from the shared reason registry.
+    """
+    totals = district_df["Count"].groupby(district_df["Reason"], observed=True).sum()
+    # ties keep alphabetical order, whatever the order of a categorical's categories
+    totals.index = totals.index.astype(str)
+    totals = totals[totals > 0].sort_index().sort_values(ascending=False, kind="stable")
+    top = totals.iloc[:top_n]
+    codes, counts = REASONS.codes(top.index), top.tolist()
+    rest = int(totals.iloc[top_n:].sum())
+    if rest:
+        codes = np.append(codes, REASONS.code(OTHER_REASON))
+        counts.append(rest)
+    counts = np.asarray(counts, dtype="int64")
+    return pd.DataFrame({
+        "Reason":     REASONS.labels[codes],
+        "Label":      REASONS.short[codes],
+        "Color":      REASONS.colors[codes],
+        "Count":      counts,
+        "Percentage": np.round(100 * counts / max(counts.sum(), 1), 1),
+    })
+
+
+def pie_panel(t, data):
+    """Bottom-left: share of withdrawals by reason, computed from the withdrawal counts."""
+    pie_df = pie_table(data["district"])
+    pie = dict(
+        t["traces"]["pie"],
+        labels=pie_df["Label"].tolist(),
+        values=pie_df["Count"].tolist(),
+        hovertext=pie_df["Reason"].tolist(),
+        marker={"colors": pie_df["Color"].tolist()},
+    )
+    return {"data": [pie]}
+
+
+###
+# SUBPLOT (2,2) DISTRICT WITHDRAWALS
+###
+
+# Month name -> calendar month number, for building the month axis
+MONTH_NUMBERS = {name: i for i, name in enumerate(calendar.month_name) if name}
+
+DISTRICT_LEGEND_MAX = 7     # reasons listed in the custom legend; the rest are summarized
+GUIDE_LINE = dict(color="rgba(128,128,128,0.3)", dash="dot", width=1)
+GUIDE_BOTTOM = 0.02         # paper y where the month/year guide lines and year labels sit
+Y_TICK_STEPS = (1, 2, 2.5, 5)
+
+
+def month_label(name, width=7):
+    """Month names longer than ``width`` are cut to fit the rotated tick labels."""
+    return name if len(name) <= width else name[:width - 3] + ".."
+
+
+def nice_step(extent, ticks=2):
+    """A round tick step (1, 2, 2.5 or 5 x 10^k) giving about ``ticks`` intervals over ``extent``."""
+    raw = max(extent / ticks, 1)
+    scale = 10 ** math.floor(math.log10(raw))
+    return max(s * scale for s in Y_TICK_STEPS if s * scale <= raw)
+
+
+def style_district_panel(fig):
+    """Static styling of the bottom-right panel; its ticks, legend and guide lines follow the data."""
+    # Configure the stack:
+    fig.update_layout(
+        barmode="stack",
+        width=1500,
+        height=800,
+        margin=dict(l=20, r=20, t=100, b=160),
+
+    )
+
+    # Tidy up the axes:
+    fig.update_xaxes(
+        row=2, col=2,
+        domain=[0.48, 0.9],  # same as your other domain settings
+        tickmode="array",
+        tickangle=-90,
+        tickfont=dict(size=10),
+        showgrid=False,
+        zeroline=False,
+    )
+    fig.update_yaxes(
+        row=2, col=2,
+        domain=[0.15, 0.5],
+        showgrid=True,
+        gridcolor="lightgray",
+        griddash="dot",
+        zeroline=False,
+        title_text="",  # or “Count” if you like
+        ticklabelstandoff = 30
+    )
+
+    # One stacked bar trace per reason, a total above each month, and the
+    # custom legend entries, year labels and guide lines around the bars
+    district_bar = go.Bar(
+        marker_line_width=0,
+        showlegend=False,
+        xaxis="x3", yaxis="y3",
+        meta="district",
+    )
+    total_note = go.layout.Annotation(
+        showarrow=False,
+        xref="x3", yref="y3",
+        font=dict(size=12),
+        name="total",
+    )
+    legend_note = go.layout.Annotation(
+        x=0.91,
+        xanchor="left",
+        xref="paper",
+        yref="paper",
+        showarrow=False,
+        font=dict(size=11, color="black"),
+        yshift = 60
+    )
+    year_note = go.layout.Annotation(
+        y=GUIDE_BOTTOM,
+        xref="x3",
+        yref="paper",
+        showarrow=False,
+        font=dict(size=11)
+    )
+    guide = go.layout.Shape(type="line", line=GUIDE_LINE, layer="above")
+    return {
+        "traces": {"district": district_bar},
+        "annotations": {"total": total_note, "legend": legend_note, "year": year_note},
+        "shapes": {"guide": guide},
+    }
+
+
+def month_reason_counts(district_df):
+    """Withdrawals as a months x reasons table, indexed by a dense monthly PeriodIndex.
+
+    Month and Reason are usually categorical (see ``loader.check_schema``), so
+    month names are mapped and reasons grouped per category, not per row.
+    Reasons come out in alphabetical order.
+    """
+    period = pd.PeriodIndex(pd.to_datetime(pd.DataFrame({
+        "year":  district_df["Year"].to_numpy(),
+        "month": district_df["Month"].map(MONTH_NUMBERS).to_numpy(),
+        "day":   1,
+    })), freq="M")
+    counts = (
+        district_df["Count"]
+        .groupby([period, district_df["Reason"]], observed=True)
+        .sum()
+        .unstack(fill_value=0)
+    )
+    counts.columns = counts.columns.astype(str)
+    months = pd.period_range(counts.index.min(), counts.index.max(), freq="M")
+    return counts.sort_index(axis=1).reindex(months, fill_value=0)
+
+
+def district_panel(t, data):
+    """Bottom-right: monthly withdrawals stacked by reason, with totals.
+
+    The month axis, year labels and reason set all come from the data, so
+    any school year(s) and reason taxonomy render without code changes.
+    """
+    # 1. Month x reason counts over a dense monthly period index
+    with span("pivot"):
+        counts = month_reason_counts(data["district"])
+    months = counts.index
+    reasons = sorted(counts.columns, key=str.lower)
+    x = months.strftime("%B %Y").tolist()
+    totals = counts.sum(axis=1).to_numpy()
+
+    # Now add one bar trace per Reason, stacking them:
+    shell = t["traces"]["district"]
+    codes = REASONS.codes(reasons)      # before reading the arrays: new reasons extend them
+    colors = REASONS.colors[codes]
+    bars = [
+        dict(
+            shell,
+            x=x,
+            y=counts[reason].tolist(),
+            name=reason,
+            marker=dict(shell["marker"], color=color),
+        )
+        for reason, color in zip(reasons, colors)
+    ]
+
+    # Annotate the total on top of each bar:
+    notes = [
+        dict(
+            t["annotations"]["total"],
+            x=m,
+            y=float(total) + 2,    # this places the annotation a little above the bar
+            text=str(int(total)),
+        )
+        for m, total in zip(x, totals)
+    ]
+
+    # 2. Y axis: round ticks at 0, one step and two steps, up to the tallest bar
+    top = max(float(totals.max()), 1) * 1.1
+    step = nice_step(top)
+    ticks = [i * step for i in range(int(top // step) + 1)]
+    layout = {
+        "xaxis3": dict(t["layout"]["xaxis3"], tickvals=x, ticktext=[month_label(n) for n in months.strftime("%B")]),
+        "yaxis3": dict(t["layout"]["yaxis3"], range=[0, top], tickvals=ticks),
+    }
+
+    # 3. Legend of the most frequent reasons, in stacking order
+    shown = sorted(counts.sum().nlargest(DISTRICT_LEGEND_MAX).index, key=str.lower)
+    labels = text_labels("<span style='font-size: 20px; color:", colors[[reasons.index(r) for r in shown]],
+                         f"'>{LEGEND_DOT}</span> ", shown)
+    if len(reasons) > len(shown):
+        labels.append(f"+ {len(reasons) - len(shown)} more")
+    for i, label in enumerate(labels):
+        notes.append(dict(t["annotations"]["legend"], y=0.3 - i * 0.055, text=label))
+
+    # 4. A label under each calendar year's months, and dotted guide lines:
+    #    verticals at either end and between years, horizontals along the y ticks
+    x_domain, y_domain = layout["xaxis3"]["domain"], layout["yaxis3"]["domain"]
+    bottom = (GUIDE_BOTTOM - y_domain[0]) / (y_domain[1] - y_domain[0]) * top   # paper y -> data y
+    starts = np.flatnonzero(np.diff(months.year, prepend=0)).tolist() + [len(months)]
+    guide = t["shapes"]["guide"]
+    # (names let the page's slice switcher find the lines that follow the y axis;
+    #  the year guides hang below the axis in paper coordinates and never move)
+    shapes = [dict(guide, xref="x3", yref="y3", x0=len(months) - 0.5, x1=len(months) - 0.5, y0=bottom, y1=ticks[-1],
+                   name="end_guide")]
+    for first, end in zip(starts, starts[1:]):
+        notes.append(dict(t["annotations"]["year"], x=(first + end - 1) / 2, text=str(months.year[first])))
+        shapes.append(dict(guide, xref="x3", yref="paper", x0=first - 0.5, x1=first - 0.5,
+                           y0=GUIDE_BOTTOM, y1=y_domain[0]))
+    shapes.append(dict(guide, xref="paper", yref="y3", x0=x_domain[0] - 0.02, x1=x_domain[1], y0=0, y1=0))
+    shapes += [dict(guide, xref="paper", yref="y3", x0=x_domain[0] - 0.02, x1=x_domain[0] - 0.001, y0=v, y1=v,
+                    name="tick_guide")
+               for v in ticks[1:]]
+
+    return {"data": bars, "annotations": notes, "shapes": shapes, "layout": layout}
+
+
+# Panel -> (inputs it is drawn from, function filling it from the template), in drawing order
+PANELS = {
+    "kpi":      (["kpi", "comp"], kpi_panel),
+    "school":   (["school"],      school_panel),
+    "pie":      (["district"],    pie_panel),
+    "district": (["district"],    district_panel),
+}
+
+# Layout lists that panels append to rather than replace
+LAYOUT_LISTS = ("annotations", "shapes")
+
+STYLES = [style_kpi_panel, style_school_panel, style_pie_panel, style_district_panel]
+
+
+def _plain(obj):
+    # numpy/pandas values -> plain JSON types, so fragments compare and cache cleanly
+    return json.loads(to_json_plotly(obj))
+
+
+def figure_json(fig):
+    """A figure as plain JSON."""
+    return _plain(fig.to_plotly_json())
+
+
+def build_template():
+    """
+    Draw everything static once with plotly and freeze it as plain JSON.
+
+    The template holds the full static layout (subplots, axes, legend, guide
+    lines, labels) plus validated trace and annotation shells; panels only
+    copy the shells and fill in their data, with no plotly validation.
+    """
+    with span("make_subplots"):
+        fig = base_figure()
+    template = {"layout": None, "traces": {}, "annotations": {}, "shapes": {}}
+    with span("style"):
+        for style in STYLES:
+            shells = style(fig)
+            for kind in ("traces", "annotations", "shapes"):
+                for name, shell in shells.get(kind, {}).items():
+                    template[kind][name] = _plain(shell.to_plotly_json())
+    with span("freeze"):
+        template["layout"] = figure_json(fig)["layout"]
+    return template
+
+
+def load_template(cache_dir=None):
+    """The frozen template, read from ``cache_dir`` if built there before (by this code)."""
+    if cache_dir is None:
+        return build_template()
+    path = Path(cache_dir) / f"template-{code_fingerprint()[:16]}.json"
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        template = build_template()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(template))
+        os.replace(tmp, path)
+        return template
+
+
+def build_panels(data, names, template, options=None):
+    """Fill the panels ``names`` from ``data``; each fragment holds its traces,
+    annotations, shapes and the top-level layout keys it overrides.
+    ``options`` maps a panel name to keyword arguments of its fill function."""
+    options = options or {}
+    fragments = {}
+    for name in names:
+        with span(name):
+            fragments[name] = _plain(PANELS[name][1](template, data, **options.get(name, {})))
+    return fragments
+
+
+def assemble_figure(template, fragments):
+    """Combine the template layout and every panel's fragment into one figure dict."""
+    layout = copy.deepcopy(template["layout"])
+    fig = {"data": [], "layout": layout}
+    for name in PANELS:
+        fragment = fragments[name]
+        fig["data"].extend(fragment["data"])
+        layout.update(fragment.get("layout", {}))
+        for key in LAYOUT_LISTS:
+            layout.setdefault(key, []).extend(fragment.get(key, []))
+    return fig
+
+
+def build_figure(data, template=None, options=None):
+    """Build the 2x2 dashboard as a ``go.Figure`` (validated, e.g. for interactive use)."""
+    template = template or build_template()
+    return go.Figure(assemble_figure(template, build_panels(data, PANELS, template, options)))
+
+
+def render(data, out_path, template=None, options=None, **html_options):
+    """Fill every panel from ``data`` and write the dashboard HTML to ``out_path``.
+
+    Callers rendering many dashboards pass one ``template`` so the static
+    layout is set up only once. ``options`` are per-panel settings (see
+    ``build_panels``) and ``html_options`` go to ``assets.write_html``
+    (plotlyjs, asset_dir, compress, compact). With ``compact``, returns the
+    figure JSON's size in bytes before and after compacting it (else None).
+    """
+    template = template or build_template()
+    fig = assemble_figure(template, build_panels(data, PANELS, template, options))
+    sizes = None
+    if html_options.get("compact"):
+        (fig,), before, after = compact_sizes([fig])
+        sizes = before, after
+        html_options = dict(html_options, compact=False)
+    write_html(fig, out_path, **html_options)
+    return sizes
+
+
+###
+# TREND PANEL (its own figure under the dashboard, from trend.py's statistics)
+###
+
+TREND_HEIGHT = 380
+TREND_HOVER_TOP = 5         # anomalies listed in a month's hover text
+TREND_COLORS = {"rate": "#C9E9F2", "rolling": "#014B86", "anomaly": "#F77E24"}
+
+# Draws the trend figure in a new div right after the dashboard's ({plot_id} is filled in by plotly)
+TREND_SCRIPT = """(function () {
+  const div = document.createElement("div");
+  document.getElementById("{plot_id}").after(div);
+  Plotly.newPlot(div, /*TREND*/null);
+})();"""
+
+
+def trend_figure(history, threshold=Z_THRESHOLD):
+    """
+    District withdrawal rate by month (bars), its rolling 12-month rate and
+    year-over-year change (line), and markers on the months with campus
+    anomalies, from a ``trend.withdrawal_history``.
+    """
+    flagged = anomalies(history, threshold)
+    table = district_trend(history, flagged)
+    x = table["Month"].dt.strftime("%b %Y").tolist()
+
+    # Hover text of each month's strongest anomalies (the table is sorted by |z|)
+    top = flagged.groupby("Month", sort=False).head(TREND_HOVER_TOP)
+    lines = (top["Campus"].astype(str) + " \u00b7 " + top["Reason"].astype(str) + ": "
+             + top["Withdrawals"].astype(str) + " (z " + top["Z"].map("{:+.1f}".format) + ")")
+    hover = lines.groupby(top["Month"], sort=False).agg("<br>".join)
+    months = table["Month"].dt.strftime("%Y-%m")
+    marked = table["Anomalies"].to_numpy() > 0
+
+    fig = go.Figure([
+        go.Bar(
+            x=x, y=table["Rate"].tolist(), name="Monthly rate",
+            marker_color=TREND_COLORS["rate"],
+            hovertemplate="%{x}: %{y:.2f} per 100 students<extra></extra>",
+        ),
+        go.Scatter(
+            x=x, y=table["Rolling Rate"].tolist(), name="Rolling 12-month rate", yaxis="y2",
+            mode="lines", line=dict(color=TREND_COLORS["rolling"], width=2),
+            customdata=table["YoY"].tolist(),
+            hovertemplate="%{x}: %{y:.2f} per 100 students over 12 months"
+                          "<br>%{customdata:+.2f} pts year over year<extra></extra>",
+        ),
+        go.Scatter(
+            x=np.asarray(x)[marked].tolist(), y=table["Rate"][marked].tolist(),
+            name=f"Campus anomalies (|z| \u2265 {threshold:g})",
+            mode="markers",
+            marker=dict(color=TREND_COLORS["anomaly"], size=(6 + 2 * np.sqrt(table["Anomalies"][marked])).tolist(),
+                        line=dict(color="white", width=1)),
+            hovertext=[f"{n:,} {'anomaly' if n == 1 else 'anomalies'}<br>{hover.get(m, '')}" for n, m in
+                       zip(table["Anomalies"][marked], months[marked])],
+            hoverinfo="text",
+        ),
+    ])
+
+    latest = table.dropna(subset=["Rolling Rate"]).tail(1)
+    recent = int(table["Anomalies"].tail(12).sum())
+    caption = f"{recent:,} campus anomalies in the last 12 months"
+    if len(latest):
+        yoy = latest["YoY"].iloc[0]
+        caption = (f"Rolling 12-month rate {latest['Rolling Rate'].iloc[0]:.1f} per 100 students"
+                   + ("" if pd.isna(yoy) else f" ({yoy:+.2f} pts year over year)") + f" \u00b7 {caption}")
+    fig.update_layout(
+        width=1500, height=TREND_HEIGHT,
+        margin=dict(l=60, r=60, t=80, b=60),
+        plot_bgcolor="white",
+        bargap=0.15,
+        xaxis=dict(tickangle=-90, tickfont=dict(size=10), showgrid=False),
+        yaxis=dict(title_text="Monthly per 100", showgrid=True, gridcolor="lightgray", griddash="dot", rangemode="tozero"),
+        yaxis2=dict(title_text="Rolling 12-month per 100", overlaying="y", side="right", showgrid=False,
+                    rangemode="tozero"),
+        legend=dict(orientation="h", x=1, xanchor="right", y=1.02, yanchor="bottom", font=dict(size=11)),
+        annotations=[
+            dict(text="<b>WITHDRAWAL TRENDS</b>", xref="paper", yref="paper", x=0, y=1.22,
+                 xanchor="left", yanchor="bottom", showarrow=False, font=dict(size=16)),
+            dict(text=caption, xref="paper", yref="paper", x=0, y=1.1, xanchor="left", yanchor="bottom",
+                 showarrow=False, font=dict(size=11, color="rgba(128, 128, 128, 0.8)")),
+        ],
+    )
+    return figure_json(fig)
+
+
+def trend_script(fig):
+    """The page script (a ``post_script`` for ``write_html``) drawing ``fig`` under the dashboard."""
+    return TREND_SCRIPT.replace("/*TREND*/null", _script_json(fig))
+
+
+###
+# DRILL-DOWN SLICES (dropdowns switching slices of an embedded cube, see cube.py and cube.js)
+###
+
+SLICE_MENU_Y = 1.14     # paper y of the dropdown row, above the panel titles
+SLICE_MENU_X = {"year": 0.0, "campus": 0.09, "grade": 0.22, "reason": 0.31}
+
+
+def _script_json(value):
+    # JSON that is safe inside an inline <script>
+    return (value if isinstance(value, str) else json.dumps(value, separators=(",", ":"))).replace("</", "<\\/")
+
+
+def compact_sizes(figures):
+    """``assets.compact_figure`` of each figure, and the total bytes of their JSON before and after."""
+    figures = list(figures)
+    with span("compact"):
+        out = [compact_figure(fig) for fig in figures]
+    before = sum(len(to_json_plotly(fig)) for fig in figures)
+    after = sum(len(to_json_plotly(fig)) for fig in out)
+    return out, before, after
+
+
+def size_change(before, after):
+    """E.g. "480.2 KB -> 120.1 KB (75% smaller)"."""
+    return f"{before / 1024:,.1f} KB -> {after / 1024:,.1f} KB ({100 * (1 - after / max(before, 1)):.0f}% smaller)"
+
+
+def compacted(figures):
+    """``assets.compact_figure`` of each figure, reporting how much smaller their JSON gets."""
+    out, before, after = compact_sizes(figures)
+    print(f"Compact figure JSON: {size_change(before, after)}")
+    return out
+
+
+def slice_menus(cube, year):
+    """One "skip" dropdown per cube dimension; the page script redraws when a button is clicked."""
+    dims = cube["dims"]
+    options = {
+        "year":   [(str(y), i) for i, y in enumerate(dims["year"])],
+        "campus": [("All campuses", -1)] + [(c, i) for i, c in enumerate(dims["campus"])],
+        "grade":  [("All grades", -1)] + [(f"Grade {g}", i) for i, g in enumerate(dims["grade"])],
+        "reason": [("All reasons", -1)] + [(r, i) for i, r in enumerate(dims["reason"])],
+    }
+    menus = []
+    for name, buttons in options.items():
+        if len(buttons) < 2:
+            continue    # e.g. no grades in the cube
+        active = dims["year"].index(year) if name == "year" else 0
+        menus.append(dict(
+            name=name, type="dropdown", active=active, showactive=True,
+            x=SLICE_MENU_X[name], y=SLICE_MENU_Y, xanchor="left", yanchor="bottom",
+            font=dict(size=11), pad=dict(r=4, t=0),
+            buttons=[dict(label=label, method="skip", args=[code]) for label, code in buttons],
+        ))
+    return menus
+
+
+def slice_page(cube, template, options=None, school_year=None, compact=False):
+    """
+    The figure of ``school_year`` with slice dropdowns, plus the page script
+    (a ``post_script`` for ``write_html``) that switches between slices.
+
+    Each year's all-campus figure is drawn here; campus, grade and reason
+    slices are recomputed in the page from the embedded cube. ``compact``
+    embeds every year's figure compacted (see ``compacted``) and the cube's
+    columns as binary typed arrays.
+    """
+    dims = cube["dims"]
+    school_year = max(dims["year"]) if school_year is None else school_year
+    figures = {}
+    for year in dims["year"]:
+        with span(str(year)):
+            fig = assemble_figure(template, build_panels(cube_slice(cube, year), PANELS, template, options))
+        fig["layout"]["updatemenus"] = slice_menus(cube, year)
+        figures[str(year)] = fig
+    if compact:
+        figures = dict(zip(figures, compacted(figures.values())))
+
+    reason_codes, other = REASONS.codes(dims["reason"]), REASONS.code(OTHER_REASON)
+    settings = {
+        "selected":     {"year": dims["year"].index(school_year), "campus": -1, "grade": -1, "reason": -1},
+        "pie_top_n":    PIE_TOP_N,
+        "pie_labels":   REASONS.short[reason_codes].tolist(),
+        "reason_colors": REASONS.colors[reason_codes].tolist(),
+        "other":        {"reason": OTHER_REASON, "label": REASONS.short[other], "color": REASONS.colors[other]},
+        "total_note":   template["annotations"]["total"],
+        "guide_bottom": GUIDE_BOTTOM,
+        "y_tick_steps": Y_TICK_STEPS,
+    }
+    script = (Path(__file__).with_name("cube.js").read_text()
+              .replace("/*CUBE*/null", _script_json(cube_json(cube, binary=compact)))
+              .replace("/*FIGURES*/null", _script_json(figures))
+              .replace("/*SETTINGS*/null", _script_json(settings)))
+    return figures[str(school_year)], script
+
+
+def build(out_path, events=None, school_year=None, fmt="csv", use_cache=True, data_dir=None,
+          chunk_rows=CHUNK_ROWS, options=None, **html_options):
+    """Build the dashboard into ``out_path``, reusing cached panels; returns the rebuilt panel names."""
+    compact = html_options.get("compact", False)
+    # 1. Hash each panel's input files and reuse every panel whose inputs are unchanged
+    #    (a drill-down page redraws every year from its cube, so it reuses nothing)
+    options = options or {}
+    cube_level = options.get("cube") if events else None
+    trend = bool(options.get("trend") and events)
+    if events:
+        panel_paths = {name: list(events) for name in PANELS}
+    else:
+        panel_paths = {name: [input_path(data_dir, i, fmt) for i in inputs] for name, (inputs, _) in PANELS.items()}
+    # (the cache lives next to the output, so each output keeps its own manifest)
+    cache = BuildCache(out_path.parent / ".cache" / out_path.stem, salt=code_fingerprint()) if use_cache else None
+    with span("template"):
+        template = load_template(out_path.parent / ".cache" if use_cache else None)
+    keys, fragments = {}, {}
+    if cache and not cube_level:
+        with span("cache_check"):
+            for name, paths in panel_paths.items():
+                extra = f"{fmt}|{school_year}|{json.dumps(options.get(name, {}), sort_keys=True)}"
+                keys[name] = cache.key(name, paths, extra=extra)
+                fragment = cache.get(name, keys[name])
+                if fragment is not None:
+                    fragments[name] = fragment
+    stale = [name for name in PANELS if name not in fragments]
+    trend_fig = None
+    if cache and trend:
+        trend_key = cache.key("trend", list(events), extra=str(Z_THRESHOLD))
+        trend_fig = cache.get("trend", trend_key)
+
+    # 2. Load only the inputs the stale panels need (or aggregate raw student events;
+    #    every year of them when the trend panel is redrawn too)
+    raw = None
+    if stale:
+        with span("load"):
+            if cube_level:
+                with span("read_events"):
+                    raw = read_events(events)
+                with span("cube"):
+                    cube = build_cube(raw, grades=cube_level == "grade")
+                data = cube_slice(cube, school_year)
+            elif trend and trend_fig is None:
+                with span("read_events"):
+                    raw = read_events(events)
+                with span("aggregate"):
+                    data = summarize_events(raw, school_year)
+            elif events:
+                data = load_events(events, school_year=school_year)
+            else:
+                names = {i for name in stale for i in PANELS[name][0]}
+                data = load_inputs(data_dir, fmt, names=names, chunk_rows=chunk_rows)
+        with span("panels"):
+            built = build_panels(data, stale, template, options)
+        fragments.update(built)
+        if keys:
+            for name in stale:
+                cache.put(name, keys[name], built[name])
+    if trend and trend_fig is None:
+        with span("trend"):
+            if raw is None:
+                with span("read_events"):
+                    raw = read_events(events)
+            trend_fig = trend_figure(withdrawal_history(raw))
+        if cache:
+            cache.put("trend", trend_key, trend_fig)
+
+    # 3. Assemble the figure and write it out (as a static image for .png/.svg/.pdf outputs,
+    #    which leave out the trend panel)
+    with span("assemble"):
+        fig = assemble_figure(template, fragments)
+    if out_path.suffix.lower().lstrip(".") in ("png", "svg", "pdf"):
+        from export import write_image
+        with span("write_image"):
+            write_image(fig, out_path)
+        written = [out_path]
+    else:
+        scripts = []
+        if cube_level:
+            with span("slices"):
+                fig, script = slice_page(cube, template, options, school_year, compact)
+            print(f"Embedded cube: {cube_cells(cube):,} cells, {len(script) / 2**20:.2f} MB with the slice figures")
+            scripts.append(script)
+        elif compact:
+            fig, = compacted([fig])
+        if trend:
+            scripts.append(trend_script(compacted([trend_fig])[0] if compact else trend_fig))
+        with span("write_html"):
+            written = write_html(fig, out_path, post_script=scripts or None, **dict(html_options, compact=False))
+
+    # 4. Record what the output was built from, so an unchanged rerun can skip the build entirely
+    if cache:
+        with span("cache_save"):
+            inputs = sorted({str(p) for paths in panel_paths.values() for p in paths})
+            signature = build_signature(events, school_year, fmt, data_dir, options, html_options)
+            cache.put("output", cache.key("output", inputs, extra=signature), {
+                "inputs": inputs,
+                "files": {str(p): cache.file_hash(p) for p in written},
+            })
+            cache.save()
+    return stale
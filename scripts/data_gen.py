@@ -1,28 +1,72 @@
 #!/usr/bin/env python3
 """
 Generate synthetic data for the Student Retention dashboard example.
+
+By default this writes the small hand-tuned demo inputs to data/. With
+--students it instead writes student-level event data (see scripts/events.py)
+at load-testing scale, generated and written in bounded-size chunks.
+
+With --partitions the events are written as a partitioned dataset instead
+(see scripts/dataset.py): blocks of campuses are simulated in parallel by a
+process pool, each from its own random stream spawned from --seed, so the
+files are the same whatever --workers is.
 """
 
-import argparse, json
+import argparse, json, os
 import numpy as np, pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def main(seed: int):
-    np.random.seed(seed)
+from dataset import DATASET_FILE, part_name, write_manifest
+from events import GRADES
+from store import EXTENSIONS, write_table
+
+# Reason names used by the demo data; extra reasons get synthetic codes
+BASE_REASONS = [
+    "Elementary With", "OTHER (UNKNOWN)", "EXP CAN'T RET", "Enroll in Other",
+    "ADMIN WITHDRAW", "Transferred to", "HOME SCHOOLING",
+]
+BASE_REASON_WEIGHTS = [309, 94, 60, 7, 2, 7, 1]   # demo totals per reason
+
+# Withdrawals per month of the school year (August .. April) in the demo data
+WITHDRAW_MONTH_WEIGHTS = [62, 72, 77, 58, 21, 98, 49, 40, 5]
+SCHOOL_MONTHS = [8, 9, 10, 11, 12, 1, 2, 3, 4]
+DAYS_PER_MONTH = 28     # sample days 1..28 so every month is valid
+LAST_SCHOOL_YEAR = 2022
+
+EVENT_CATEGORIES = ["ENROLL", "WITHDRAW"]
+ENROLL_CATEGORIES = ["Returning", "New"]
+
+def main(fmt: str = "csv"):
     out_dir = Path(__file__).resolve().parents[1] / "data"
     out_dir.mkdir(exist_ok=True)
+    saved = []
+
+    def save(df, stem):
+        # CSV, or a dictionary-encoded Parquet/Arrow table (see store.py)
+        if fmt == "csv":
+            name = f"{stem}.csv"
+            df.to_csv(out_dir / name, index=False)
+        else:
+            name = stem + EXTENSIONS[fmt]
+            write_table(df, out_dir / name)
+        saved.append(name)
 
     # 1. Retention KPI
     kpi = {"retention_rate": 91}
-    with open(out_dir / "retention_kpi.json", "w") as f:
-        json.dump(kpi, f)
+    if fmt == "csv":
+        with open(out_dir / "retention_kpi.json", "w") as f:
+            json.dump(kpi, f)
+        saved.append("retention_kpi.json")
+    else:
+        save(pd.DataFrame([kpi]), "retention_kpi")
 
     # 2. Student composition CSV
     comp_df = pd.DataFrame({
         "Category": ["Returning", "New"],
         "Count":    [3600,         1600]
     })
-    comp_df.to_csv(out_dir / "student_composition.csv", index=False)
+    save(comp_df, "student_composition")
 
     # 3. Retention by school CSV
     schools = [
@@ -34,7 +78,7 @@ def main(seed: int):
         "Campus":         schools,
         "Retention Rate": rates
     })
-    school_df.to_csv(out_dir / "retention_by_school.csv", index=False)
+    save(school_df, "retention_by_school")
 
     # 4. District withdrawals CSV
     district_withdrawals_data = [
@@ -121,7 +165,7 @@ def main(seed: int):
     ]
 
     district_df = pd.DataFrame(district_withdrawals_data)
-    district_df.to_csv(out_dir / "district_withdrawals.csv", index=False)
+    save(district_df, "district_withdrawals")
 
     # 5. Withdrawal reasons summary CSV
     # Load the detailed withdrawals into a DataFrame
@@ -139,31 +183,289 @@ def main(seed: int):
 
 
     # 5c. Write out to CSV
-    summary.to_csv(out_dir / "withdrawal_reasons.csv", index=False)
-
-    reasons_df = pd.DataFrame({
-        "Reason": [
-            "Elementar...",
-            "Enroll in Ot...",
-            "EXP CAN'...",
-            "OTHER (U...",
-            "Transferre...",
-        ],
-        "Percentage": [65.3, 1.5, 11.9, 19.9, 1.5]
-    })
-    reasons_df.to_csv(out_dir / "pie_data.csv", index=False)
+    save(summary, "withdrawal_reasons")
 
     # 6. Confirmation Printout
     print("Data generation complete. Files saved in 'data/' directory:")
-    print("- retention_kpi.json")
-    print("- student_composition.csv")
-    print("- retention_by_school.csv")
-    print("- district_withdrawals.csv")
-    print("- withdrawal_reasons.csv")
+    for name in saved:
+        print(f"- {name}")
+
+
+def reason_names(n):
+    """The demo reasons first, then synthetic codes up to ``n`` reasons."""
+    extra = [f"REASON {i:03d}" for i in range(len(BASE_REASONS) + 1, n + 1)]
+    return (BASE_REASONS + extra)[:n]
+
+
+def reason_weights(n):
+    """Demo weights for the base reasons, then a Zipf-like long tail."""
+    tail = 2.0 / np.arange(1, max(n - len(BASE_REASONS), 0) + 1)
+    weights = np.concatenate([BASE_REASON_WEIGHTS, tail])[:n]
+    return weights / weights.sum()
+
+
+def date_strings(school_years):
+    """
+    Every sampled date as an ISO string, laid out so a date's code is
+    ``(year_idx * len(SCHOOL_MONTHS) + month_idx) * DAYS_PER_MONTH + day - 1``.
+    """
+    sy = np.repeat(school_years, len(SCHOOL_MONTHS) * DAYS_PER_MONTH)
+    month = np.tile(np.repeat(SCHOOL_MONTHS, DAYS_PER_MONTH), len(school_years))
+    day = np.tile(np.arange(1, DAYS_PER_MONTH + 1), len(school_years) * len(SCHOOL_MONTHS))
+    year = sy + (month < SCHOOL_MONTHS[0])
+    return pd.Index([f"{y}-{m:02d}-{d:02d}" for y, m, d in zip(year, month, day)])
+
+
+class EventSchema:
+    """Fixed categories shared by every chunk so each one encodes identically."""
+
+    def __init__(self, campuses, years, reasons):
+        self.school_years = np.arange(LAST_SCHOOL_YEAR - years + 1, LAST_SCHOOL_YEAR + 1)
+        self.campus = pd.CategoricalDtype([f"Campus {i}" for i in range(1, campuses + 1)])
+        self.event = pd.CategoricalDtype(EVENT_CATEGORIES)
+        self.date = pd.CategoricalDtype(date_strings(self.school_years))
+        self.category = pd.CategoricalDtype(ENROLL_CATEGORIES)
+        self.reason = pd.CategoricalDtype(reason_names(reasons))
+        self.grade = pd.CategoricalDtype(GRADES)
+
+    def frame(self, student, campus, event, date, category, reason, grade):
+        """Build an events DataFrame straight from integer codes (-1 = missing)."""
+        return pd.DataFrame({
+            "StudentID": student,
+            "Campus":    pd.Categorical.from_codes(campus, dtype=self.campus),
+            "Event":     pd.Categorical.from_codes(event, dtype=self.event),
+            "Date":      pd.Categorical.from_codes(date, dtype=self.date),
+            "Category":  pd.Categorical.from_codes(category, dtype=self.category),
+            "Reason":    pd.Categorical.from_codes(reason, dtype=self.reason),
+            "Grade":     pd.Categorical.from_codes(grade, dtype=self.grade),
+        })
+
+
+def simulate_students(rng, schema, first_id, n, campus_p, campus_rate, reason_p):
+    """
+    Simulate ``n`` consecutive students across every school year.
+
+    Students join in the first year or a later one, enroll each year as
+    Returning (New in the year they join), and may withdraw at their campus's
+    rate; a withdrawn student does not come back. Each student moves up one
+    grade a year and leaves after the last one.
+    """
+    n_years = len(schema.school_years)
+    month_p = np.asarray(WITHDRAW_MONTH_WEIGHTS) / sum(WITHDRAW_MONTH_WEIGHTS)
+    per_year = len(SCHOOL_MONTHS) * DAYS_PER_MONTH
+
+    student = np.arange(first_id, first_id + n, dtype=np.int64)
+    campus = rng.choice(len(campus_p), size=n, p=campus_p)
+    joined = np.where(rng.random(n) < 0.75, 0, rng.integers(0, n_years, size=n))
+    # students present in the first year are mostly continuing from before it
+    new_first_year = rng.random(n) < 0.3
+    # grade code in the year a student joins, from K upwards
+    first_grade = rng.integers(1, len(GRADES), size=n)
+    active = np.ones(n, dtype=bool)
+
+    frames = []
+    for y in range(n_years):
+        grade = first_grade + y - joined
+        enrolled = active & (joined <= y) & (grade < len(GRADES))
+        idx = np.flatnonzero(enrolled)
+        is_new = (joined[idx] == y) & ((y > 0) | new_first_year[idx])
+        enroll_day = rng.integers(10, 25, size=len(idx))
+        frames.append(schema.frame(
+            student[idx], campus[idx], np.zeros(len(idx), dtype=np.int8),
+            y * per_year + enroll_day - 1, is_new.astype(np.int8), np.full(len(idx), -1, dtype=np.int8),
+            grade[idx],
+        ))
+
+        leaving = idx[rng.random(len(idx)) < campus_rate[campus[idx]]]
+        month = rng.choice(len(SCHOOL_MONTHS), size=len(leaving), p=month_p)
+        day = rng.integers(1, DAYS_PER_MONTH + 1, size=len(leaving))
+        frames.append(schema.frame(
+            student[leaving], campus[leaving], np.ones(len(leaving), dtype=np.int8),
+            y * per_year + month * DAYS_PER_MONTH + day - 1,
+            np.full(len(leaving), -1, dtype=np.int8),
+            rng.choice(len(reason_p), size=len(leaving), p=reason_p),
+            grade[leaving],
+        ))
+        active[leaving] = False
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def campus_profile(rng, campuses):
+    """Campus sizes (as probabilities) and withdrawal rates; both vary by campus."""
+    campus_p = rng.lognormal(0.0, 0.5, size=campuses)
+    campus_p /= campus_p.sum()
+    campus_rate = rng.uniform(0.05, 0.16, size=campuses)
+    return campus_p, campus_rate
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to a single CSV, Parquet or Arrow IPC file."""
+
+    def __init__(self, path, fmt):
+        self.path, self.fmt = Path(path), fmt
+        self._writer = None
+        self._sink = None
+        self.rows = 0
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        else:
+            # fixed categories give every chunk the same dictionaries, which
+            # the Arrow IPC file format requires
+            import pyarrow as pa, pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                if self.fmt == "parquet":
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    self._sink = pa.OSFile(str(self.path), "wb")
+                    self._writer = pa.ipc.new_file(self._sink, table.schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+def generate_events(out_path, students, campuses=8, years=1, reasons=7, seed=42,
+                    fmt="csv", chunk_size=1_000_000):
+    """
+    Write synthetic student-level events for ``students`` students to ``out_path``.
+
+    Students are simulated ``chunk_size`` at a time, so memory stays bounded
+    by the chunk rather than the total row count (~1.1 rows per student-year).
+    """
+    rng = np.random.default_rng(seed)
+    schema = EventSchema(campuses, years, reasons)
+    campus_p, campus_rate = campus_profile(rng, campuses)
+    reason_p = reason_weights(reasons)
+
+    writer = ChunkWriter(out_path, fmt)
+    try:
+        for first in range(0, students, chunk_size):
+            n = min(chunk_size, students - first)
+            writer.write(simulate_students(
+                rng, schema, 100_000 + first, n, campus_p, campus_rate, reason_p
+            ))
+    finally:
+        writer.close()
+
+    print(f"Wrote {writer.rows:,} events for {students:,} students to {out_path}")
+    return writer.rows
+
+
+def write_partition(path, seed, first_id, students, campus_p, campus_rate, shape, fmt, chunk_size):
+    """Simulate one partition's students from its own ``seed`` stream and write them to ``path``."""
+    campuses, years, reasons = shape
+    rng = np.random.default_rng(seed)
+    schema = EventSchema(campuses, years, reasons)
+    reason_p = reason_weights(reasons)
+    writer = ChunkWriter(path, fmt)
+    try:
+        # (an empty partition still gets its file, with the schema and no rows)
+        for first in range(0, max(students, 1), chunk_size):
+            n = min(chunk_size, students - first)
+            writer.write(simulate_students(
+                rng, schema, first_id + first, n, campus_p, campus_rate, reason_p
+            ))
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def generate_dataset(out_dir, students, campuses=8, years=1, reasons=7, seed=42,
+                     fmt="csv", chunk_size=1_000_000, partitions=8, workers=None):
+    """
+    Write synthetic events for ``students`` students as a partitioned dataset.
+
+    Campuses are split into ``partitions`` contiguous blocks (students never
+    change campus, so each block is self-contained) and every block is
+    simulated and written to its own part file by a pool of ``workers``
+    processes. ``SeedSequence(seed).spawn`` gives each partition an
+    independent stream, and the split of students over partitions is drawn
+    up front, so the same seed, partitions and chunk size give the same
+    files for any number of workers. Returns the number of rows written.
+    """
+    out_dir = Path(out_dir)
+    partitions = max(min(partitions, campuses), 1)
+    workers = workers or max(min(partitions, os.cpu_count() or 1), 1)
+    setup, *streams = np.random.SeedSequence(seed).spawn(partitions + 1)
+
+    # 1. Campus profile and students per partition, from the setup stream
+    rng = np.random.default_rng(setup)
+    campus_p, campus_rate = campus_profile(rng, campuses)
+    blocks = np.array_split(np.arange(campuses), partitions)
+    students_per_part = rng.multinomial(students, [campus_p[b].sum() for b in blocks])
+    first_ids = 100_000 + np.cumsum(students_per_part) - students_per_part
+
+    # 2. Every partition written by the pool; the manifest goes last, so
+    #    readers never take a half-written directory for a dataset
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / DATASET_FILE).unlink(missing_ok=True)
+    names = [part_name(k, EXTENSIONS.get(fmt, ".csv")) for k in range(partitions)]
+    for stale in out_dir.glob("part-*"):
+        if stale.name not in names:
+            stale.unlink()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for k, block in enumerate(blocks):
+            block_p = np.zeros(campuses)
+            block_p[block] = campus_p[block] / campus_p[block].sum()
+            futures.append(pool.submit(
+                write_partition, out_dir / names[k], streams[k], int(first_ids[k]), int(students_per_part[k]),
+                block_p, campus_rate, (campuses, years, reasons), fmt, chunk_size,
+            ))
+        rows = [future.result() for future in futures]
+
+    write_manifest(out_dir, {
+        "seed": seed, "students": students, "campuses": campuses, "years": years, "reasons": reasons,
+        "format": fmt, "chunk_size": chunk_size,
+        "parts": [
+            {"file": name, "campuses": [f"Campus {b[0] + 1}", f"Campus {b[-1] + 1}"],
+             "students": int(n), "rows": r}
+            for name, b, n, r in zip(names, blocks, students_per_part, rows)
+        ],
+    })
+    print(f"Wrote {sum(rows):,} events for {students:,} students to {out_dir} "
+          f"({partitions} partitions, {workers} workers)")
+    return sum(rows)
+
 
 if __name__== "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seed", type=int, default=42,
+                        help="random seed of the student events (the demo inputs are fixed)")
+    parser.add_argument("--students", type=int,
+                        help="write student-level events for this many students instead of the demo inputs")
+    parser.add_argument("--campuses", type=int, default=8)
+    parser.add_argument("--years", type=int, default=1, help=f"school years ending {LAST_SCHOOL_YEAR}")
+    parser.add_argument("--reasons", type=int, default=len(BASE_REASONS))
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv",
+                        help="output format for both the demo inputs and student events")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="students per chunk")
+    parser.add_argument("--out", type=Path, help="events file (default data/student_events.<csv|parquet|arrow>), "
+                                                 "or dataset directory with --partitions (default data/student_events)")
+    parser.add_argument("--partitions", type=int,
+                        help="write a partitioned dataset of this many campus blocks, generated in parallel")
+    parser.add_argument("--workers", type=int, help="processes generating partitions (default: one per CPU)")
     args = parser.parse_args()
-    main(args.seed) 
+    if args.partitions and not args.students:
+        parser.error("--partitions needs --students")
+
+    if args.students and args.partitions:
+        out = args.out or Path(__file__).resolve().parents[1] / "data" / "student_events"
+        generate_dataset(out, args.students, args.campuses, args.years, args.reasons,
+                         args.seed, args.format, args.chunk_size, args.partitions, args.workers)
+    elif args.students:
+        out = args.out or Path(__file__).resolve().parents[1] / "data" / ("student_events" + EXTENSIONS.get(args.format, ".csv"))
+        out.parent.mkdir(parents=True, exist_ok=True)
+        generate_events(out, args.students, args.campuses, args.years, args.reasons,
+                        args.seed, args.format, args.chunk_size)
+    else:
+        main(args.format)
 
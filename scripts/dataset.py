@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Partitioned event datasets: a directory of part files read as one table.
+
+data_gen.py --partitions writes student events as ``part-00000.<ext>``,
+``part-00001.<ext>``, ... under one directory, each part holding every event
+of a block of campuses, and then ``_dataset.json`` listing the parts. Any
+``--events`` argument may name such a directory instead of files: its parts
+are read in order and concatenated like separate event files, with no merge
+step. The manifest is written last, so a directory whose generation was
+interrupted is not mistaken for a complete dataset.
+
+Standard library only, so viz.py can expand a dataset before deciding
+whether it needs to import pandas at all.
+"""
+
+import json
+from pathlib import Path
+
+DATASET_FILE = "_dataset.json"
+
+
+def part_name(index, suffix):
+    """File name of part ``index`` of a dataset, e.g. ``part-00003.parquet``."""
+    return f"part-{index:05d}{suffix}"
+
+
+def read_manifest(directory):
+    """A dataset directory's manifest, or None if it has none."""
+    try:
+        with open(Path(directory) / DATASET_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(directory, manifest):
+    """Write ``manifest`` atomically, marking the dataset under ``directory`` complete."""
+    path = Path(directory) / DATASET_FILE
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    tmp.replace(path)
+
+
+def dataset_files(paths):
+    """
+    ``paths`` with every dataset directory replaced by its part files, in order.
+
+    A directory without a manifest raises a ValueError: its generation never
+    finished (or it is not a dataset at all).
+    """
+    files = []
+    for path in map(Path, paths):
+        if not path.is_dir():
+            files.append(path)
+            continue
+        manifest = read_manifest(path)
+        if manifest is None:
+            raise ValueError(f"{path}: no {DATASET_FILE}; not a complete event dataset")
+        files += [path / part["file"] for part in manifest["parts"]]
+    return files
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Aggregate student-level enrollment/withdrawal events into dashboard inputs.
+
+An events file has one row per student event, as exported from the SIS:
+
+    StudentID,Campus,Event,Date,Category,Reason,Grade
+    1001,Campus 1,ENROLL,2022-08-15,Returning,,4
+    1001,Campus 1,WITHDRAW,2022-10-03,,EXP CAN'T RET,4
+
+``Category`` (Returning/New) is only set on ENROLL rows and ``Reason`` only on
+WITHDRAW rows. ``Grade`` is optional; without it retention cannot be broken
+down by grade and final-grade students are not excluded as graduates.
+
+Every string column is read as a categorical, so the aggregation below works
+on small integer codes and ``np.bincount`` instead of Python objects and
+groupby.
+"""
+
+import calendar
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+ENROLL = "ENROLL"
+WITHDRAW = "WITHDRAW"
+
+SCHOOL_YEAR_START = 8   # school years run August -> July
+MONTH_NAMES = list(calendar.month_name)[1:]
+
+EVENT_DTYPES = {
+    "StudentID": "int64",
+    "Campus":    "category",
+    "Event":     "category",
+    "Date":      "category",   # few distinct dates, so parse the categories only
+    "Category":  "category",
+    "Reason":    "category",
+}
+# Read when present
+OPTIONAL_DTYPES = {
+    "Grade":     "category",
+}
+
+# Grade levels in order; students in the last one graduate rather than return
+GRADES = ["PK", "K"] + [str(g) for g in range(1, 13)]
+
+
+def read_events(paths, school_year=None, validate=True):
+    """
+    Read one or more event files into a single categorical DataFrame.
+
+    Parquet/Arrow files (see store.py) are read column-projected and, when
+    ``school_year`` is given, only that year's and the year before's rows
+    are decoded (year-over-year retention needs both). CSVs are parsed in full.
+    A partitioned dataset directory (see dataset.py) is read as its part files.
+    With ``validate``, each file's values are checked as it is read (see
+    ``validate.event_problems``) and any error raises a ValueError naming it.
+    """
+    from dataset import dataset_files
+    from store import column_names, format_of, read_table   # store imports this module
+    from validate import event_problems, raise_errors       # so does validate
+
+    frames = []
+    for path in dataset_files(paths):
+        if format_of(path):
+            columns = event_columns(column_names(path))
+            years = None if school_year is None else [school_year - 1, school_year]
+            # a file written without dictionary encoding has plain string columns
+            frames.append(read_table(path, columns=columns, years=years).astype(
+                {c: t for c, t in {**EVENT_DTYPES, **OPTIONAL_DTYPES}.items() if c in columns}))
+        else:
+            columns = event_columns(pd.read_csv(path, nrows=0).columns)
+            # low_memory=False parses the file in one block; block-wise parsing can
+            # infer float categories for a block where a column is entirely empty
+            frames.append(pd.read_csv(path, usecols=columns, dtype={**EVENT_DTYPES, **OPTIONAL_DTYPES},
+                                      low_memory=False))
+        if validate:
+            raise_errors(path, event_problems(frames[-1]))
+    return concat_events(frames)
+
+
+def event_columns(names):
+    """The required event columns plus whichever optional ones ``names`` has."""
+    return list(EVENT_DTYPES) + [c for c in OPTIONAL_DTYPES if c in names]
+
+
+def concat_events(frames):
+    """Concatenate event frames, unioning categories instead of falling back to object dtype."""
+    if len(frames) == 1:
+        return frames[0]
+    out = {}
+    dtypes = {**EVENT_DTYPES, **{c: t for c, t in OPTIONAL_DTYPES.items() if all(c in f for f in frames)}}
+    for col, dtype in dtypes.items():
+        if dtype == "category":
+            out[col] = union_categoricals([f[col] for f in frames])
+        else:
+            out[col] = np.concatenate([f[col].to_numpy() for f in frames])
+    return pd.DataFrame(out)
+
+
+def _codes(series):
+    return series.cat.codes.to_numpy()
+
+
+def _month_index(events):
+    """Absolute month number (year * 12 + month - 1) of every row, decoded once per distinct date."""
+    dates = pd.to_datetime(events["Date"].cat.categories)
+    lut = (dates.year * 12 + dates.month - 1).to_numpy()
+    return lut[_codes(events["Date"])]
+
+
+def school_year_of(month_index):
+    """School (start) year for absolute month numbers, e.g. Jan 2023 -> 2022."""
+    year, month = np.divmod(month_index, 12)
+    return year - (month + 1 < SCHOOL_YEAR_START)
+
+
+def percent(part, whole):
+    """
+    ``100 * part / whole`` of integer counts as a whole percent, halves rounded
+    up (as ``Math.round`` does in cube.js). Exact integer arithmetic, so a rate
+    is rounded once, from the counts, and the same everywhere.
+    """
+    part, whole = np.asarray(part, dtype=np.int64), np.asarray(whole, dtype=np.int64)
+    return (200 * part + whole) // (2 * whole)
+
+
+def district_table(grid_year, grid_month, reasons, counts):
+    """
+    The district input for a months x reasons ``counts`` grid: one row per
+    month (``grid_month`` 0-11 of ``grid_year``) and reason. Month and Reason
+    are categoricals over the month names and ``reasons``, so the table holds
+    small integer codes rather than a string per row.
+    """
+    n_months, n_reasons = counts.shape
+    return pd.DataFrame({
+        "Month":  pd.Categorical.from_codes(np.repeat(grid_month, n_reasons), MONTH_NAMES),
+        "Year":   np.repeat(grid_year, n_reasons),
+        "Reason": pd.Categorical.from_codes(np.tile(np.arange(n_reasons), n_months), pd.Index(reasons)),
+        "Count":  counts.ravel(),
+    })
+
+
+def aggregate_events(events, school_year=None, campuses=None):
+    """
+    Compute every dashboard input from student events in one vectorized pass.
+
+    Returns a dict with the same keys and columns as ``dashboard.load_inputs``:
+    ``kpi``, ``comp``, ``school`` and ``district``. Only events in
+    ``school_year`` are counted; it defaults to the latest year present.
+    ``campuses`` optionally restricts the counts to a subset of campuses.
+
+    When the year before ``school_year`` is present too, the KPI and school
+    rates are year-over-year retention from cohort.py: the share of that
+    year's students (by their campus then) enrolled again in ``school_year``.
+    Otherwise they fall back to the share of enrolled students who did not
+    withdraw during the year.
+    """
+    from cohort import retention_table   # cohort imports this module
+
+    # 1. Per-row month / school year, and the rows that fall in the selected year
+    month = _month_index(events)
+    years = school_year_of(month)
+    if school_year is None:
+        school_year = int(years.max())
+    in_year = years == school_year
+    selected = campuses
+    if selected is not None:
+        in_year &= events["Campus"].isin(selected).to_numpy()
+
+    enroll = in_year & (events["Event"] == ENROLL).to_numpy()
+    withdraw = in_year & (events["Event"] == WITHDRAW).to_numpy()
+
+    # 2. Per-campus enrolled / withdrawn counts
+    campuses = events["Campus"].cat.categories
+    campus = _codes(events["Campus"])
+    enrolled = np.bincount(campus[enroll], minlength=len(campuses))
+    withdrawn = np.bincount(campus[withdraw], minlength=len(campuses))
+
+    # 3. KPI: share of last year's students back this year, or of enrolled
+    #    students that did not withdraw when there is no previous year
+    cohort = None
+    if (years == school_year - 1).any():
+        cohort = retention_table(events, by=("Campus",), years=[school_year - 1])
+        if selected is not None:
+            cohort = cohort[cohort["Campus"].isin(selected)]
+    if cohort is not None and len(cohort):
+        rate = percent(cohort["Retained"].sum(), cohort["Enrolled"].sum())
+    else:
+        total_enrolled = int(enrolled.sum())
+        total_withdrawn = int(withdrawn.sum())
+        rate = percent(total_enrolled - total_withdrawn, max(total_enrolled, 1))
+    kpi = pd.Series({"retention_rate": int(rate)})
+
+    # 4. Returning vs New composition of enrollments
+    categories = events["Category"].cat.categories
+    cat_codes = _codes(events["Category"])[enroll]
+    comp_counts = np.bincount(cat_codes[cat_codes >= 0], minlength=len(categories))
+    comp = (
+        pd.DataFrame({"Category": pd.Categorical(categories), "Count": comp_counts})
+        .sort_values("Count", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+
+    # 5. Retention by campus
+    if cohort is not None and len(cohort):
+        school = pd.DataFrame({
+            "Campus":         cohort["Campus"].to_numpy(),
+            "Retention Rate": percent(cohort["Retained"], cohort["Enrolled"]),
+        })
+    else:
+        has_students = enrolled > 0     # also drops campuses filtered out above
+        school = pd.DataFrame({
+            "Campus":         pd.Categorical.from_codes(np.flatnonzero(has_students), campuses),
+            "Retention Rate": percent((enrolled - withdrawn)[has_students], enrolled[has_students]),
+        })
+
+    # 6. Month x reason withdrawal counts over a dense month grid from the
+    #    start of the school year to the last month with a withdrawal
+    reasons = events["Reason"].cat.categories
+    reason = _codes(events["Reason"])[withdraw]
+    w_month = month[withdraw]
+    valid = reason >= 0
+    reason, w_month = reason[valid], w_month[valid]
+
+    first = school_year * 12 + SCHOOL_YEAR_START - 1
+    n_months = int(w_month.max()) - first + 1 if len(w_month) else 1
+    counts = np.bincount(
+        (w_month - first) * len(reasons) + reason,
+        minlength=n_months * len(reasons),
+    ).reshape(n_months, len(reasons))
+
+    grid_year, grid_month = np.divmod(np.arange(first, first + n_months), 12)
+    district = district_table(grid_year, grid_month, reasons, counts)
+
+    return {"kpi": kpi, "comp": comp, "school": school, "district": district}
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Export dashboards as static PNG/SVG/PDF images through a pool of warm renderers.
+
+Rendering goes through kaleido, which drives a local headless Chrome: the
+browser is started once with ``--renderers`` tabs, each already holding
+plotly.js (loaded from a local file, so nothing is fetched from a CDN), and
+every image is handed to the next free tab. Figures are built lazily from a
+batch.py manifest whose outputs end in .png, .svg or .pdf, at most one per
+renderer ahead of the pool, and each image's render latency is reported.
+
+Requires kaleido (pip install kaleido) and a Chrome it can use
+(``kaleido_get_chrome`` downloads one).
+"""
+
+import argparse, asyncio, json, sys, tempfile, time, traceback
+from pathlib import Path
+
+from assets import plotlyjs_asset, write_atomic
+from batch import job_data, load_source, read_manifest, source_of
+
+IMAGE_FORMATS = ("png", "svg", "pdf")
+
+
+def _kaleido():
+    try:
+        import kaleido
+    except ImportError:
+        raise ImportError("Static image export needs kaleido: pip install kaleido "
+                          "(and a local Chrome, e.g. via kaleido_get_chrome)") from None
+    return kaleido
+
+
+def image_format(path):
+    """``"png"``, ``"svg"`` or ``"pdf"`` from an output suffix."""
+    fmt = Path(path).suffix.lower().lstrip(".")
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"{path}: not an image output, expected one of {IMAGE_FORMATS}")
+    return fmt
+
+
+def dashboard_figures(jobs, template=None):
+    """
+    Yield ``(job, figure dict)`` for manifest jobs, or ``(job, exception)``
+    for a job whose inputs fail. Jobs are grouped by source, and only the
+    latest source is kept loaded.
+    """
+    import dashboard
+
+    template = template or dashboard.build_template()
+    loaded = {}
+    for job in sorted(jobs, key=lambda job: repr(source_of(job))):
+        source = source_of(job)
+        try:
+            if source not in loaded:
+                loaded.clear()
+                loaded[source] = load_source(source)
+            fragments = dashboard.build_panels(job_data(job, loaded[source]), dashboard.PANELS, template, job.get("options"))
+            yield job, dashboard.assemble_figure(template, fragments)
+        except Exception as exc:
+            yield job, exc
+
+
+async def _render_all(figures, renderers, scale, timeout, asset_dir, on_result):
+    kaleido = _kaleido()
+    start = time.perf_counter()
+    plotlyjs = plotlyjs_asset(asset_dir)
+    async with kaleido.Kaleido(n=renderers, timeout=timeout, plotlyjs=str(plotlyjs), mathjax=False) as pool:
+        startup = time.perf_counter() - start
+        slots = asyncio.Semaphore(renderers)
+
+        async def render(job, fig):
+            result = {"output": job["output"]}
+            start = time.perf_counter()
+            try:
+                if isinstance(fig, Exception):
+                    raise fig
+                out = Path(job["output"])
+                opts = {"format": image_format(out), "scale": scale}
+                image = await pool.calc_fig(fig, opts=opts)
+                out.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(out, image)
+                result.update(ok=True, bytes=len(image))
+            except Exception as exc:
+                result.update(ok=False, error=f"{type(exc).__name__}: {exc}",
+                              traceback="".join(traceback.format_exception(exc)))
+            finally:
+                slots.release()
+            result["seconds"] = round(time.perf_counter() - start, 4)
+            on_result(result)
+            return result
+
+        tasks = []
+        for job, fig in figures:
+            await slots.acquire()      # build the next figure only once a renderer is free
+            tasks.append(asyncio.create_task(render(job, fig)))
+        results = await asyncio.gather(*tasks)
+    return startup, results
+
+
+def export_images(figures, renderers=4, scale=1, timeout=90, asset_dir=None, on_result=None):
+    """
+    Render ``(job, figure)`` pairs to the image each job's ``output`` names.
+
+    The renderers load plotly.js from ``asset_dir``, by default a temporary
+    directory removed afterwards. Returns ``(startup_seconds, results)``;
+    every result has the output, ok, the render latency in seconds and, on
+    failure, the error.
+    """
+    on_result = on_result or (lambda r: None)
+    if asset_dir is None:
+        with tempfile.TemporaryDirectory(prefix="export-") as tmp:
+            return asyncio.run(_render_all(figures, renderers, scale, timeout, Path(tmp), on_result))
+    return asyncio.run(_render_all(figures, renderers, scale, timeout, asset_dir, on_result))
+
+
+def write_image(fig, out_path, scale=1):
+    """Write one figure (object or dict) as a PNG/SVG/PDF image."""
+    _, (result,) = export_images([({"output": str(out_path)}, fig)], renderers=1, scale=scale)
+    if not result["ok"]:
+        raise RuntimeError(f"exporting {out_path} failed: {result['error']}")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of sorted ``values`` (None if empty)."""
+    return values[int(q * (len(values) - 1))] if values else None
+
+
+def main(manifest, renderers=4, scale=1, report=None):
+    jobs = read_manifest(manifest)
+
+    def progress(r):
+        status = f"{r['seconds']:7.3f}s" if r["ok"] else f"FAILED  {r['error']}"
+        print(f"{r['output']}: {status}")
+
+    start = time.perf_counter()
+    startup, results = export_images(dashboard_figures(jobs), renderers, scale, on_result=progress)
+    failed = [r for r in results if not r["ok"]]
+    latencies = sorted(r["seconds"] for r in results if r["ok"])
+    summary = {
+        "images": len(results),
+        "failed": len(failed),
+        "renderers": renderers,
+        "startup_seconds": round(startup, 4),
+        "wall_seconds": round(time.perf_counter() - start, 4),
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p95": percentile(latencies, 0.95),
+        "results": sorted(results, key=lambda r: r["output"]),
+    }
+    print(f"{len(results) - len(failed)}/{len(results)} images in {summary['wall_seconds']:.2f}s "
+          f"with {renderers} renderers (startup {startup:.2f}s, p50 {summary['latency_p50']}s, "
+          f"p95 {summary['latency_p95']}s)")
+    if report:
+        Path(report).write_text(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("manifest", type=Path, help="JSON or CSV list of jobs (see batch.py) with .png/.svg/.pdf outputs")
+    parser.add_argument("--renderers", type=int, default=4, help="warm renderer tabs working in parallel")
+    parser.add_argument("--scale", type=float, default=1, help="image scale factor (2 for high-DPI PNGs)")
+    parser.add_argument("--report", type=Path, help="write per-image latencies and failures as JSON")
+    args = parser.parse_args()
+    summary = main(args.manifest, args.renderers, args.scale, args.report)
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Concurrent, schema-checked reading of pre-aggregated dashboard inputs.
+
+A dashboard needs one small file per input (see ``dashboard.INPUT_FILES``), and on
+network-mounted storage reading one costs mostly latency, not parsing. So
+every file of every requested district goes onto one bounded thread pool
+(pandas and pyarrow release the GIL while waiting on I/O), and a dashboard's
+inputs arrive in about the time of its slowest file instead of the sum.
+
+Each table is checked against ``SCHEMAS`` as it is read: a missing column,
+a non-numeric / non-integer count or a value that fails validate.py's checks
+raises a ValueError naming the file; numeric columns come back typed (counts
+as int64) and label columns as categoricals, ready for aggregation.
+
+    python scripts/loader.py districts/*/data --format parquet --workers 16
+"""
+
+import argparse, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from stream import CHUNK_ROWS
+from timing import record
+
+LOAD_WORKERS = 16   # files read at once (bounded so a large batch doesn't flood the file server)
+
+# Columns each input must have: "str" (labels, held as categoricals), "int" (integer counts) or "number"
+SCHEMAS = {
+    "kpi":      {"retention_rate": "number"},
+    "comp":     {"Category": "str", "Count": "int"},
+    "school":   {"Campus": "str", "Retention Rate": "number"},
+    "district": {"Year": "int", "Month": "str", "Reason": "str", "Count": "int"},
+    "reasons":  {"Reason": "str", "Count": "int", "Percentage": "number"},   # checked by validate.py only
+}
+
+
+def file_columns(path):
+    """Column names of a CSV (its header line), Parquet or Arrow file."""
+    import pandas as pd
+    from store import column_names, format_of
+
+    if format_of(path):
+        return column_names(path)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _numeric(values, kind, where):
+    # int64 counts ("int") or numbers as parsed ("number"); a ValueError naming what is wrong otherwise
+    import numpy as np
+    import pandas as pd
+
+    numbers = pd.to_numeric(values, errors="coerce")
+    bad = pd.isna(numbers) & pd.notna(values)
+    if bad.any():
+        raise ValueError(f"{where}: non-numeric values, e.g. {list(pd.Series(values)[bad][:3])}")
+    if kind == "number":
+        return numbers
+    if pd.isna(numbers).any():
+        raise ValueError(f"{where}: missing counts")
+    if not np.array_equal(numbers, np.round(numbers)):
+        raise ValueError(f"{where}: non-integer counts")
+    return numbers.astype("int64")
+
+
+def check_schema(table, name, path):
+    """
+    ``table`` (a DataFrame, or the KPI Series) with input ``name``'s numeric
+    columns typed and its label columns categorical.
+    """
+    schema = SCHEMAS[name]
+    fields = table.index if name == "kpi" else table.columns
+    missing = [c for c in schema if c not in fields]
+    if missing:
+        raise ValueError(f"{path}: missing column(s) {missing} for the {name} input "
+                         f"(expected {list(schema)})")
+    if name == "kpi":
+        table = table.copy()
+        for key, kind in schema.items():
+            table[key] = _numeric([table[key]], kind, f"{path} [{key}]")[0]
+        return table
+    typed = {c: table[c].astype("category") if kind == "str" else _numeric(table[c], kind, f"{path} [{c}]")
+             for c, kind in schema.items()}
+    return table.assign(**typed)
+
+
+def read_input(name, path, chunk_rows=CHUNK_ROWS, validate=True):
+    """
+    Read and check one input file. The district withdrawals can be
+    arbitrarily long histories, so they are streamed in chunks of
+    ``chunk_rows`` rows and summed per month and reason.
+
+    With ``validate``, the values are checked too (``validate.table_problems``:
+    month names, negative counts, rates outside 0-100, ...) and any error
+    raises a ValueError naming the file.
+    """
+    import pandas as pd
+    from store import format_of
+    from stream import stream_counts
+    from validate import raise_errors, table_problems
+
+    if name == "district":
+        # the header is checked first: the chunked reader would fail on a missing column mid-stream
+        check_schema(pd.DataFrame(columns=file_columns(path)), name, path)
+        try:
+            table = stream_counts(path, chunk_rows=chunk_rows)
+        except (ValueError, TypeError) as exc:
+            raise ValueError(f"{path}: {exc}") from exc
+    elif format_of(path):
+        from store import read_table
+        table = read_table(path)
+        if name == "kpi":
+            table = table.iloc[0]      # stored as a one-row table
+    elif name == "kpi":
+        table = pd.read_json(path, typ="series")
+    else:
+        table = pd.read_csv(path)
+    table = check_schema(table, name, path)
+    if validate:
+        raise_errors(path, table_problems(name, table))
+    return table
+
+
+def read_districts(districts, chunk_rows=CHUNK_ROWS, workers=LOAD_WORKERS):
+    """
+    Read ``districts`` (key -> {input name: path}) on one pool of ``workers`` threads.
+
+    Returns ``(loaded, failed)``: key -> {input name: table} for the districts
+    whose every file read and checked cleanly, and key -> error message for
+    the rest.
+    """
+    files = [(key, name, path) for key, paths in districts.items() for name, path in paths.items()]
+    with ThreadPoolExecutor(max_workers=max(min(workers, len(files)), 1)) as pool:
+        futures = [(key, name, pool.submit(read_input, name, path, chunk_rows)) for key, name, path in files]
+        loaded, failed = {key: {} for key in districts}, {}
+        for key, name, future in futures:
+            try:
+                loaded[key][name] = future.result()
+            except Exception as exc:
+                failed.setdefault(key, f"{type(exc).__name__}: {exc}")
+    return {key: data for key, data in loaded.items() if key not in failed}, failed
+
+
+def timed_read(name, path, chunk_rows=CHUNK_ROWS):
+    """``read_input``, also returning the seconds it took (for the caller's thread to record)."""
+    start = time.perf_counter()
+    table = read_input(name, path, chunk_rows)
+    return table, time.perf_counter() - start
+
+
+def read_inputs(paths, chunk_rows=CHUNK_ROWS, workers=LOAD_WORKERS):
+    """
+    Read one district's inputs (input name -> path) concurrently; raises on the
+    first bad file. Each file's read time is recorded as a timing stage named
+    after its input (overlapping, so they add up to more than the wall time).
+    """
+    with ThreadPoolExecutor(max_workers=max(min(workers, len(paths)), 1)) as pool:
+        futures = {name: pool.submit(timed_read, name, path, chunk_rows) for name, path in paths.items()}
+        tables = {}
+        for name, future in futures.items():
+            tables[name], seconds = future.result()
+            record(name, seconds)
+        return tables
+
+
+def main(data_dirs, fmt="csv", workers=LOAD_WORKERS, chunk_rows=CHUNK_ROWS):
+    import dashboard
+
+    start = time.perf_counter()
+    loaded, failed = dashboard.load_districts(data_dirs, fmt, chunk_rows=chunk_rows, workers=workers)
+    seconds = time.perf_counter() - start
+    for key, error in sorted(failed.items()):
+        print(f"{key}: FAILED  {error}")
+    files = len(data_dirs) * len(dashboard.INPUT_FILES)
+    print(f"Loaded {len(loaded)}/{len(data_dirs)} districts ({files} files) in {seconds:.3f}s "
+          f"with {workers} threads")
+    return loaded, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("data_dirs", nargs="+", type=Path, help="district directories of pre-aggregated inputs")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv",
+                        help="storage format of the inputs")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS,
+                        help="files read at once (1 reads them one after another)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="rows of district withdrawals aggregated at a time")
+    args = parser.parse_args()
+    loaded, failed = main(args.data_dirs, args.format, args.workers, args.chunk_rows)
+    sys.exit(1 if failed else 0)
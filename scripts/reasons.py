@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+The shared registry of withdrawal reasons.
+
+Every reason a panel draws gets one small integer code, and the registry
+holds, per code, the full label, the short pie-legend label and the color,
+as arrays indexed by code. Panels turn a column of reasons into codes once
+(``REASONS.codes``: one factorize, then a lookup per distinct reason) and
+take labels and colors for all of them with one fancy index, instead of a
+dict lookup and string slicing per element for every panel of every build.
+
+Codes are stable for the life of the process, so a long-running server or
+a batch worker shares one registry across every dashboard it draws.
+"""
+
+import threading, zlib
+
+import numpy as np
+import pandas as pd
+import plotly
+
+# COLOR MAP FOR WITHDRAWAL REASONS, PLOTS (2,1) AND (2,2)
+REASON_COLORS = {
+    "ADMIN WITHDRAW":    "#ADD8E6",  # light blue
+    "EXP CAN'T RET":     "#F77E24",  # orange
+    "Elementary With":   "#014B86",  # dark blue
+    "Enroll in Other":   "#62C0DD",  # sky blue
+    "HOME SCHOOLING":    "#f7ec24",  # yellow-green
+    "OTHER (UNKNOWN)":   "#8DC63F",  # light green
+    "Transferred to":    "#522D80",  # purple
+}
+
+# Colors for reasons outside REASON_COLORS, picked by a stable hash of the reason
+REASON_PALETTE = plotly.colors.qualitative.Alphabet
+
+OTHER_REASON = "Other"
+OTHER_COLOR = "#BFBFBF"     # gray
+
+PIE_LABEL_WIDTH = 12    # longest reason label shown in full in the pie legend
+
+
+def reason_color(reason):
+    """Color of a withdrawal reason: its fixed color if it has one, else a stable pick from a palette."""
+    if reason == OTHER_REASON:
+        return OTHER_COLOR
+    if reason in REASON_COLORS:
+        return REASON_COLORS[reason]
+    return REASON_PALETTE[zlib.crc32(str(reason).encode()) % len(REASON_PALETTE)]
+
+
+def short_label(reason, width=PIE_LABEL_WIDTH):
+    """Reason names longer than ``width`` are cut (with "...") to fit the pie legend."""
+    return reason if len(reason) <= width else reason[:width - 3].rstrip() + "..."
+
+
+class ReasonRegistry:
+    """
+    Reason -> code, and code -> ``labels`` / ``short`` / ``colors`` (object arrays).
+
+    Safe to share between threads: new reasons are added under a lock, and the
+    arrays only ever grow (each is replaced whole), so codes handed out earlier
+    keep indexing the same entries. Take the codes before reading an array:
+    ``REASONS.colors[REASONS.codes(r)]`` would index the array as it was
+    before ``r`` was registered.
+    """
+
+    def __init__(self, width=PIE_LABEL_WIDTH):
+        self.width = width
+        self.index = {}
+        self.labels = self.short = self.colors = np.empty(0, dtype=object)
+        self.lock = threading.Lock()
+        self.codes([OTHER_REASON])
+
+    def _register(self, reasons):
+        # codes of distinct ``reasons``, appending the ones not seen before
+        with self.lock:
+            new = [str(r) for r in dict.fromkeys(reasons) if str(r) not in self.index]
+            if new:
+                start = len(self.labels)
+                self.index.update(zip(new, range(start, start + len(new))))
+                self.short = np.concatenate([self.short, np.array([short_label(r, self.width) for r in new], dtype=object)])
+                self.colors = np.concatenate([self.colors, np.array([reason_color(r) for r in new], dtype=object)])
+                self.labels = np.concatenate([self.labels, np.array(new, dtype=object)])
+            return np.fromiter((self.index[str(r)] for r in reasons), dtype=np.int64, count=len(reasons))
+
+    def codes(self, reasons):
+        """Registry codes of ``reasons`` (a list, array, Series or Categorical), registering new ones."""
+        if isinstance(getattr(reasons, "dtype", None), pd.CategoricalDtype):
+            values = pd.Categorical(reasons)
+            codes, uniques = values.codes, values.categories
+        else:
+            codes, uniques = pd.factorize(np.asarray(reasons, dtype=object))
+        return self._register(list(uniques))[codes]
+
+    def code(self, reason):
+        return int(self.codes([reason])[0])
+
+
+# The process-wide registry every panel draws from
+REASONS = ReasonRegistry()
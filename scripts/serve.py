@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Serve the dashboard over HTTP from a long-running process.
+
+Inputs are loaded once and kept in memory, with the frozen figure template;
+panel fragments, assembled figures and HTML pages go through an in-memory LRU
+cache bounded by total size and per-entry TTL. Every request checks the
+input files' size/mtime (a few ``stat`` calls), and any change reloads the
+inputs and clears the cache, so responses never lag behind ``data/``. Cache
+keys carry the load generation, so a response still being computed from the
+old inputs during a reload is never served after it.
+
+Routes (standard library only, no external services):
+
+    /                         dashboard HTML (plotly.js served from /assets/)
+    /figure.json              the assembled figure
+    /panels/<name>.json       one panel's fragment (kpi, school, pie, district)
+    /assets/plotly-*.min.js   the bundled plotly.js, cacheable forever
+    /stats.json               cache entries, bytes, hits and misses
+
+With --events, ``?school_year=2022&campus=Campus 1&campus=Campus 2`` picks the
+slice of the student events that is aggregated.
+"""
+
+import argparse, gzip, json, os, threading, time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import plotly.io as pio
+
+import dashboard
+from assets import plotlyjs_bundle
+from dataset import dataset_files
+from events import read_events
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by the total ``size`` of its values and by
+    their age (``ttl`` seconds). Byte values are sized by their length; other
+    values pass their size to ``put``.
+    """
+
+    def __init__(self, max_bytes=64 << 20, ttl=300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()    # key -> (value, size, expires)
+        self.size = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        size = len(value) if size is None else size
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (value, size, time.monotonic() + self.ttl)
+            self.size += size
+            # expired entries go first, then the least recently used until it fits
+            now = time.monotonic()
+            for k in [k for k, (_, _, expires) in self.entries.items() if expires < now]:
+                self._drop(k)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+    def _drop(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.size -= size
+
+
+def snapshot(paths):
+    """(path, size, mtime) of every input file; any change means the inputs changed."""
+    out = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            out.append((str(path), stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            out.append((str(path), None, None))
+    return tuple(out)
+
+
+def _nbytes(frame):
+    usage = frame.memory_usage(deep=True)
+    return int(usage.sum() if hasattr(usage, "sum") else usage)    # a Series reports a plain int
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class Dashboard:
+    """Inputs, template and response cache for one data source, kept in memory."""
+
+    def __init__(self, data_dir=None, fmt="csv", events=None, cache=None):
+        self.data_dir, self.fmt, self.events = data_dir, fmt, events
+        self.cache = cache or LRUCache()
+        self.template = dashboard.build_template()
+        self.asset_name, self.asset = plotlyjs_bundle()
+        self.asset_gz = gzip.compress(self.asset, mtime=0)
+        self.lock = threading.Lock()
+        self.state = None
+        self.loaded = (0, None)     # (load generation, inputs), swapped as one
+
+    def paths(self):
+        if self.events:
+            return dataset_files(self.events)
+        return sorted(p for p in self.data_dir.iterdir() if p.is_file())
+
+    def current(self):
+        """
+        ``(generation, inputs)``: the loaded inputs, reloaded (and the cache
+        cleared) whenever an input file changed. Each reload bumps the
+        generation, which every cache key includes.
+        """
+        state = snapshot(self.paths())
+        if state != self.state:
+            with self.lock:
+                if state != self.state:
+                    if self.events:
+                        inputs = read_events(self.events)
+                    else:
+                        inputs = dashboard.load_inputs(self.data_dir, self.fmt)
+                    self.loaded = (self.loaded[0] + 1, inputs)
+                    self.cache.clear()
+                    self.state = state
+        return self.loaded
+
+    def data(self, params):
+        """Dashboard inputs for ``params`` = (school_year, campuses); events are aggregated per slice."""
+        generation, loaded = self.current()
+        if not self.events:
+            return loaded
+        data = self.cache.get(("data", generation, params))
+        if data is None:
+            school_year, campuses = params
+            data = dashboard.summarize_events(loaded, school_year, list(campuses) if campuses else None)
+            size = sum(_nbytes(v) for v in data.values())
+            self.cache.put(("data", generation, params), data, size)
+        return data
+
+    def panel(self, name, params):
+        """One panel's fragment as JSON bytes."""
+        generation, _ = self.current()
+        body = self.cache.get(("panel", generation, name, params))
+        if body is None:
+            body = _dumps(dashboard.build_panels(self.data(params), [name], self.template)[name])
+            self.cache.put(("panel", generation, name, params), body)
+        return body
+
+    def figure(self, params):
+        """The assembled figure as JSON bytes."""
+        generation, _ = self.current()
+        body = self.cache.get(("figure", generation, params))
+        if body is None:
+            fragments = {name: json.loads(self.panel(name, params)) for name in dashboard.PANELS}
+            body = _dumps(dashboard.assemble_figure(self.template, fragments))
+            self.cache.put(("figure", generation, params), body)
+        return body
+
+    def html(self, params):
+        """The dashboard page, loading plotly.js from ``/assets/``."""
+        generation, _ = self.current()
+        body = self.cache.get(("html", generation, params))
+        if body is None:
+            fig = json.loads(self.figure(params))
+            body = pio.to_html(fig, include_plotlyjs=f"/assets/{self.asset_name}", validate=False).encode()
+            self.cache.put(("html", generation, params), body)
+        return body
+
+
+def request_params(query):
+    """(school_year, campuses) from a query string, hashable for cache keys."""
+    query = parse_qs(query)
+    school_year = query.get("school_year", [None])[0]
+    campuses = tuple(sorted(query.get("campus", [])))
+    return (int(school_year) if school_year else None, campuses or None)
+
+
+class Handler(BaseHTTPRequestHandler):
+    dashboard = None    # set by ``serve``
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            params = request_params(url.query)
+            if url.path in ("/", "/index.html"):
+                self.send(self.dashboard.html(params), "text/html; charset=utf-8")
+            elif url.path == "/figure.json":
+                self.send(self.dashboard.figure(params), "application/json")
+            elif url.path.startswith("/panels/") and url.path.endswith(".json"):
+                name = url.path[len("/panels/"):-len(".json")]
+                if name not in dashboard.PANELS:
+                    return self.send_error(HTTPStatus.NOT_FOUND, f"unknown panel {name!r}")
+                self.send(self.dashboard.panel(name, params), "application/json")
+            elif url.path == "/stats.json":
+                self.send(_dumps(self.dashboard.cache.stats()), "application/json")
+            elif url.path == f"/assets/{self.dashboard.asset_name}":
+                self.send_asset()
+            else:
+                self.send_error(HTTPStatus.NOT_FOUND)
+        except ValueError as exc:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(exc))
+        except Exception as exc:
+            self.log_error("%s: %s", type(exc).__name__, exc)
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, type(exc).__name__)
+
+    def send(self, body, content_type, encoding=None, immutable=False):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        # the content-hashed plotly.js never changes; everything else follows data/
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable" if immutable else "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_asset(self):
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            self.send(self.dashboard.asset_gz, "text/javascript", encoding="gzip", immutable=True)
+        else:
+            self.send(self.dashboard.asset, "text/javascript", immutable=True)
+
+
+def serve(dashboard, host="127.0.0.1", port=8050):
+    """Serve ``dashboard`` until interrupted, loading its inputs up front."""
+    dashboard.html(request_params(""))     # warm the cache before the first request
+    Handler.dashboard = dashboard
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving the dashboard on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--data-dir", type=Path, default=Path(__file__).resolve().parents[1] / "data",
+                        help="directory of pre-aggregated inputs (default data/)")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv",
+                        help="storage format of the inputs in --data-dir")
+    parser.add_argument("--events", nargs="+", type=Path,
+                        help="serve student-level event files instead, aggregated per ?school_year=&campus=")
+    parser.add_argument("--cache-mb", type=float, default=64, help="memory budget of the response cache")
+    parser.add_argument("--ttl", type=float, default=300, help="seconds a cached response stays valid")
+    args = parser.parse_args()
+    cache = LRUCache(int(args.cache_mb * (1 << 20)), args.ttl)
+    serve(Dashboard(args.data_dir, args.format, args.events, cache), args.host, args.port)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Columnar storage for dashboard inputs and student events.
+
+Tables are stored as Parquet (``.parquet``) or Arrow IPC (``.arrow``) files
+with their string columns dictionary-encoded, so they load straight back as
+pandas categoricals without any text parsing. Reads can project columns and
+push year/campus predicates down to the file; Parquet skips row groups whose
+statistics rule them out and Arrow IPC files are memory-mapped.
+
+Requires pyarrow (pip install pyarrow).
+"""
+
+import calendar, operator
+from functools import reduce
+from pathlib import Path
+
+from events import SCHOOL_YEAR_START
+
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# String columns stored dictionary-encoded wherever they appear
+DICTIONARY_COLUMNS = ["Campus", "Reason", "Month", "Event", "Date", "Category", "Grade"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow, pyarrow.dataset, pyarrow.ipc, pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet/Arrow storage needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def format_of(path):
+    """``"parquet"`` or ``"arrow"`` from a file suffix, else None."""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".parquet":
+        return "parquet"
+    if suffix in (".arrow", ".feather", ".ipc"):
+        return "arrow"
+    return None
+
+
+def column_names(path):
+    """Column names of a Parquet or Arrow IPC file, read from its schema only."""
+    pa = _pyarrow()
+    if format_of(path) == "parquet":
+        return pa.parquet.read_schema(path).names
+    return pa.ipc.open_file(pa.memory_map(str(path))).schema.names
+
+
+def write_table(df, path):
+    """Write ``df`` to a Parquet or Arrow IPC file, dictionary-encoding string columns."""
+    pa = _pyarrow()
+    df = df.astype({c: "category" for c in DICTIONARY_COLUMNS if c in df and df[c].dtype != "category"})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if format_of(path) == "parquet":
+        pa.parquet.write_table(table, path)
+    else:
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def row_filter(names, years=None, campuses=None):
+    """
+    Arrow filter expression selecting school ``years`` and ``campuses``.
+
+    Tables with calendar ``Year``/``Month`` columns are matched on those,
+    event tables on their ISO ``Date`` strings, which sort chronologically.
+    """
+    ds = _pyarrow().dataset
+    terms = []
+    if years is not None:
+        if "Year" in names and "Month" in names:
+            autumn = list(calendar.month_name[SCHOOL_YEAR_START:])
+            spring = list(calendar.month_name[1:SCHOOL_YEAR_START])
+            year, month = ds.field("Year"), ds.field("Month")
+            terms.append(
+                (year.isin(list(years)) & month.isin(autumn))
+                | (year.isin([y + 1 for y in years]) & month.isin(spring))
+            )
+        elif "Year" in names:
+            terms.append(ds.field("Year").isin(list(years)))
+        elif "Date" in names:
+            date = ds.field("Date")
+            terms.append(reduce(operator.or_, [
+                (date >= f"{y}-{SCHOOL_YEAR_START:02d}-01") & (date < f"{y + 1}-{SCHOOL_YEAR_START:02d}-01")
+                for y in years
+            ]))
+    if campuses is not None and "Campus" in names:
+        terms.append(ds.field("Campus").isin(list(campuses)))
+    return reduce(operator.and_, terms) if terms else None
+
+
+def read_table(path, columns=None, years=None, campuses=None):
+    """
+    Read a Parquet or Arrow IPC file into a DataFrame.
+
+    Only ``columns`` are decoded (all by default), and rows are limited to
+    school ``years`` / ``campuses`` before conversion to pandas.
+    """
+    pa = _pyarrow()
+    if format_of(path) == "parquet":
+        names = pa.parquet.read_schema(path).names
+        table = pa.parquet.read_table(
+            path, columns=columns, filters=row_filter(names, years, campuses), memory_map=True
+        )
+    else:
+        # zero-copy view over the memory-mapped file; filtering only touches what it needs
+        table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        expr = row_filter(table.schema.names, years, campuses)
+        if expr is not None:
+            table = table.filter(expr)
+        if columns is not None:
+            table = table.select(columns)
+    return table.to_pandas()
+
+
+def iter_tables(path, columns=None, years=None, campuses=None, batch_rows=1_000_000):
+    """
+    Read a Parquet or Arrow IPC file as DataFrames of at most ``batch_rows`` rows.
+
+    Filters and projection are applied like ``read_table``, but only one batch
+    is decoded at a time, so memory stays bounded however large the file is.
+    """
+    pa = _pyarrow()
+    fmt = "parquet" if format_of(path) == "parquet" else "ipc"
+    dataset = pa.dataset.dataset(str(path), format=fmt)
+    expr = row_filter(dataset.schema.names, years, campuses)
+    for batch in dataset.to_batches(columns=columns, filter=expr, batch_size=batch_rows):
+        if batch.num_rows:
+            yield batch.to_pandas()
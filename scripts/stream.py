@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory aggregation of long count tables, e.g. district withdrawals.
+
+A table such as ``Month,Year,Reason,Count`` is read in chunks of at most
+``CHUNK_ROWS`` rows (CSV via the pandas chunked reader, Parquet/Arrow via
+store.py record batches). Each chunk is reduced to its per-key totals and
+merged into a running accumulator whose size only depends on the number of
+distinct keys (months x reasons), so peak memory stays roughly constant
+however many rows the file holds.
+"""
+
+CHUNK_ROWS = 1_000_000
+
+# Key columns are read as categoricals so a chunk's groupby works on codes
+KEY_DTYPES = {"Month": "category", "Year": "int64", "Reason": "category", "Campus": "category"}
+
+
+def iter_chunks(path, columns, chunk_rows=CHUNK_ROWS, years=None):
+    """DataFrames of at most ``chunk_rows`` rows of ``columns`` from a CSV, Parquet or Arrow file."""
+    import pandas as pd
+    from store import format_of
+
+    if format_of(path):
+        from store import iter_tables
+        yield from iter_tables(path, columns=columns, years=years, batch_rows=chunk_rows)
+        return
+    dtypes = {c: KEY_DTYPES[c] for c in columns if c in KEY_DTYPES}
+    with pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_rows) as reader:
+        yield from reader
+
+
+def sum_counts(chunks, keys, value="Count"):
+    """
+    Total ``value`` per distinct ``keys`` over an iterable of DataFrames.
+
+    Only one chunk plus the accumulator is held at a time. Returns a long
+    DataFrame with ``keys`` and ``value`` columns, sorted by ``keys``.
+    """
+    import pandas as pd
+
+    total = None
+    for chunk in chunks:
+        part = chunk.groupby(keys, observed=True, sort=False)[value].sum()
+        # chunks can have different categories, so merge on the decoded key values
+        part.index = pd.MultiIndex.from_arrays(
+            [part.index.get_level_values(k).astype(object) for k in keys], names=keys
+        )
+        total = part if total is None else total.add(part, fill_value=0)
+    if total is None:
+        return pd.DataFrame({k: [] for k in keys + [value]})
+    return total.astype("int64").sort_index().reset_index()
+
+
+def stream_counts(path, keys=("Year", "Month", "Reason"), value="Count", chunk_rows=CHUNK_ROWS, years=None):
+    """``sum_counts`` over a file read in chunks of ``chunk_rows`` rows."""
+    keys = list(keys)
+    return sum_counts(iter_chunks(path, keys + [value], chunk_rows, years), keys, value)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Named timing spans for the build pipeline, with optional cProfile/tracemalloc.
+
+Code marks its stages with ``span(name)``; spans nest, so a stage inside
+another is reported as ``outer/inner``. Outside a ``Timer`` a span does
+nothing, so library callers pay nothing for the instrumentation:
+
+    with Timer(memory=True) as timer:
+        with span("load"):
+            ...
+    timer.write(out_path.with_suffix(".timing.json"))
+"""
+
+import json, time, tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+_active = None      # the Timer spans report to, if any
+PROFILE_TOP = 30    # functions listed in the report when profiling
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as stage ``name`` of the active Timer (if one is running)."""
+    if _active is None:
+        yield
+        return
+    with _active.span(name):
+        yield
+
+
+def record(name, seconds):
+    """
+    Add ``seconds`` to stage ``name`` of the active Timer, under the span open
+    in this thread: for time measured in a worker thread, which must not open
+    spans itself (a Timer's span stack belongs to the thread that started it).
+    """
+    if _active is not None:
+        _active.record(name, seconds)
+
+
+class Timer:
+    """Collects span timings (and optionally memory peaks and a cProfile) for one run."""
+
+    def __init__(self, memory=False, profile=False):
+        self.memory = memory
+        self.profiler = None
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        self.spans = {}     # full name -> {"seconds", "calls"[, "peak_mb"]}
+        self.open = []      # [name, peak bytes] of the spans currently running
+        self.seconds = None
+
+    def __enter__(self):
+        global _active
+        _active = self
+        if self.memory:
+            tracemalloc.start()
+        if self.profiler:
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        self.seconds = time.perf_counter() - self.start
+        if self.profiler:
+            self.profiler.disable()
+        if self.memory:
+            self._note_peak()
+            tracemalloc.stop()
+        _active = None
+
+    def _note_peak(self):
+        # the traced peak since the last reset counts towards every open span
+        _, peak = tracemalloc.get_traced_memory()
+        for entry in self.open:
+            entry[1] = max(entry[1], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def span(self, name):
+        full = "/".join([entry[0] for entry in self.open[-1:]] + [name])
+        if self.memory:
+            self._note_peak()
+        entry = [full, 0]
+        self.open.append(entry)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if self.memory:
+                self._note_peak()
+            self.open.pop()
+            record = self.record(name, seconds)
+            if self.memory:
+                record["peak_mb"] = max(record.get("peak_mb", 0), round(entry[1] / 2**20, 2))
+
+    def record(self, name, seconds):
+        """Add one call of ``seconds`` to stage ``name`` under the innermost open span; returns its record."""
+        full = "/".join([entry[0] for entry in self.open[-1:]] + [name])
+        record = self.spans.setdefault(full, {"seconds": 0.0, "calls": 0})
+        record["seconds"] += seconds
+        record["calls"] += 1
+        return record
+
+    def profile_top(self, n=PROFILE_TOP):
+        """The ``n`` functions with the most cumulative time, from the cProfile capture."""
+        import io, pstats
+
+        stats = pstats.Stats(self.profiler, stream=io.StringIO()).sort_stats("cumulative")
+        top = []
+        for (file, line, func), (_, calls, tottime, cumtime, _) in list(stats.stats.items()):
+            top.append({"function": f"{Path(file).name}:{line}({func})", "calls": calls,
+                        "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+        return sorted(top, key=lambda f: f["cumtime"], reverse=True)[:n]
+
+    def report(self, **meta):
+        total = self.seconds or 0
+        report = dict(meta, total_seconds=round(total, 4), spans=[
+            dict(name=name, seconds=round(r["seconds"], 4), share=round(r["seconds"] / total, 3) if total else None,
+                 **{k: v for k, v in r.items() if k != "seconds"})
+            for name, r in self.spans.items()
+        ])
+        if self.profiler:
+            report["profile"] = self.profile_top()
+        return report
+
+    def write(self, path, **meta):
+        """Write the JSON report to ``path`` (and the raw cProfile data next to it, as ``.prof``)."""
+        path = Path(path)
+        path.write_text(json.dumps(self.report(**meta), indent=2))
+        if self.profiler:
+            self.profiler.dump_stats(path.with_suffix(".prof"))
+        return path
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Withdrawal trends and anomalies over a multi-year history of student events.
+
+Withdrawals are counted into one campus x month matrix per reason (plus one
+for all reasons) over every month of the events, and every statistic is a
+whole-matrix operation along the month axis: cumulative sums give the
+trailing ``WINDOW``-month totals, the year-over-year change is a shift by
+12 columns, and each month's z-score compares its withdrawal rate with the
+mean and spread of the ``BASELINE`` months before it. Rates are per 100
+students enrolled at the campus that school year. Nothing is grouped or
+applied per campus, so thousands of campuses over ten years of months cost
+a few matrix passes per reason.
+
+    python scripts/trend.py data/student_events.parquet --out outputs/anomalies.csv
+"""
+
+import argparse, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cohort import student_years
+from events import WITHDRAW, _codes, _month_index, read_events, school_year_of
+
+WINDOW = 12         # months in the rolling withdrawal rate
+BASELINE = 12       # months before each month that its z-score is measured against
+Z_THRESHOLD = 3.0   # |z| at or above which a month is flagged
+MIN_COUNT = 3       # withdrawals a flagged month needs, so tiny campuses don't flag on noise
+ALL_REASONS = "All reasons"
+
+
+def withdrawal_history(events):
+    """
+    Monthly withdrawals by campus and reason over every month of ``events``.
+
+    Returns a dict with the ``campuses``, ``reasons`` and ``months`` (a
+    monthly PeriodIndex) labels, ``counts`` (campuses x reasons x months
+    withdrawals) and ``enrolled`` (campuses x months: students enrolled at the
+    campus in the month's school year).
+    """
+    month = _month_index(events)
+    first = int(month.min()) if len(month) else 0
+    n_months = int(month.max()) - first + 1 if len(month) else 0
+    campuses = list(events["Campus"].cat.categories)
+    reasons = list(events["Reason"].cat.categories)
+    campus = _codes(events["Campus"]).astype(np.int64)     # codes are int8/int16, too small for cell numbers
+
+    # 1. Withdrawals with a campus and reason, counted straight into the 3-d grid
+    withdraw = (events["Event"] == WITHDRAW).to_numpy()
+    reason = _codes(events["Reason"]).astype(np.int64)
+    withdraw = withdraw & (campus >= 0) & (reason >= 0)
+    cell = (campus[withdraw] * len(reasons) + reason[withdraw]) * n_months + (month[withdraw] - first)
+    counts = np.bincount(cell, minlength=len(campuses) * len(reasons) * n_months)
+    counts = counts.reshape(len(campuses), len(reasons), n_months)
+
+    # 2. Students enrolled per campus and school year, spread over that year's months
+    grid_year = school_year_of(np.arange(first, first + n_months))
+    rec = student_years(events)
+    known = rec["campus"] >= 0
+    y0 = int(grid_year.min()) if n_months else 0
+    n_years = int(grid_year.max()) - y0 + 1 if n_months else 0
+    in_grid = known & (rec["year"] >= y0) & (rec["year"] < y0 + n_years)
+    per_year = np.bincount(rec["campus"][in_grid].astype(np.int64) * n_years + (rec["year"][in_grid] - y0),
+                           minlength=len(campuses) * n_years)
+    enrolled = per_year.reshape(len(campuses), n_years)[:, grid_year - y0]
+
+    months = pd.period_range(pd.Period(year=first // 12, month=first % 12 + 1, freq="M"), periods=n_months, freq="M")
+    return {"campuses": campuses, "reasons": reasons, "months": months, "counts": counts, "enrolled": enrolled}
+
+
+def rolling_sum(x, window):
+    """Trailing ``window``-column sums along the last axis (NaN until a full window)."""
+    total = np.cumsum(x, axis=-1, dtype=np.float64)
+    out = np.full(total.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1] = total[..., window - 1]
+        out[..., window:] = total[..., window:] - total[..., :-window]
+    return out
+
+
+def shifted(x, periods):
+    """``x`` moved ``periods`` columns later along the last axis, NaN-filled."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] > periods:
+        out[..., periods:] = x[..., :-periods]
+    return out
+
+
+def trend_stats(counts, enrolled, window=WINDOW, baseline=BASELINE):
+    """
+    Rates and anomaly scores for a (..., months) array of withdrawal counts.
+
+    ``enrolled`` broadcasts against ``counts``. Returns arrays shaped like
+    ``counts``: the monthly ``rate`` and trailing-``window`` ``rolling`` rate
+    (per 100 enrolled), its year-over-year change ``yoy`` (points), and ``z``,
+    the monthly rate's z-score against the mean rate of the ``baseline``
+    months before it (itself returned as ``baseline``).
+    The spread is floored at the Poisson noise of the baseline's count, so a
+    quiet history does not turn a few withdrawals into an anomaly.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_student = np.where(enrolled > 0, 100 / enrolled, np.nan)
+        rate = counts * per_student
+        rolling = rolling_sum(counts, window) * per_student
+        yoy = rolling - shifted(rolling, 12)
+
+        # mean and variance of the `baseline` months before each month, from running sums
+        known = np.nan_to_num(rate)
+        mean = shifted(rolling_sum(known, baseline), 1) / baseline
+        var = np.maximum(shifted(rolling_sum(known * known, baseline), 1) / baseline - mean * mean, 0)
+        # counts are roughly Poisson, so the spread is at least that of a Poisson
+        # count with the baseline's mean (and never below one withdrawal's worth)
+        noise = np.maximum(mean, per_student) * per_student
+        z = (rate - mean) / np.sqrt(np.maximum(var, noise))
+    return {"rate": rate, "rolling": rolling, "yoy": yoy, "baseline": mean, "z": z}
+
+
+def anomalies(history, threshold=Z_THRESHOLD, min_count=MIN_COUNT, window=WINDOW, baseline=BASELINE):
+    """
+    Campus-months whose withdrawal rate, for one reason or all of them, is
+    ``threshold`` or more standard deviations off its trailing baseline.
+
+    One campus x month pass per reason. Returns one row per flagged cell,
+    largest |z| first: Campus, Reason, Month, Withdrawals, Enrolled, Rate,
+    Baseline (the trailing mean rate), Rolling Rate, YoY and Z.
+    """
+    counts, enrolled = history["counts"], history["enrolled"]
+    slices = [(ALL_REASONS, counts.sum(axis=1))] + [(r, counts[:, i]) for i, r in enumerate(history["reasons"])]
+    parts = []
+    for reason, matrix in slices:
+        stats = trend_stats(matrix, enrolled, window, baseline)
+        z = stats["z"]
+        flagged = np.abs(np.nan_to_num(z)) >= threshold
+        flagged &= matrix >= min_count
+        c, m = np.nonzero(flagged)
+        if not len(c):
+            continue
+        rate = stats["rate"][c, m]
+        parts.append(pd.DataFrame({
+            "Campus":       np.asarray(history["campuses"], dtype=object)[c],
+            "Reason":       reason,
+            "Month":        history["months"][m].strftime("%Y-%m"),
+            "Withdrawals":  matrix[c, m],
+            "Enrolled":     enrolled[c, m],
+            "Rate":         np.round(rate, 2),
+            "Baseline":     np.round(stats["baseline"][c, m], 2),
+            "Rolling Rate": np.round(stats["rolling"][c, m], 2),
+            "YoY":          np.round(stats["yoy"][c, m], 2),
+            "Z":            np.round(z[c, m], 2),
+        }))
+    columns = ["Campus", "Reason", "Month", "Withdrawals", "Enrolled", "Rate", "Baseline", "Rolling Rate", "YoY", "Z"]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    table = pd.concat(parts, ignore_index=True)
+    return table.iloc[np.argsort(-table["Z"].abs().to_numpy(), kind="stable")].reset_index(drop=True)
+
+
+def district_trend(history, flagged=None, window=WINDOW):
+    """
+    The district-wide monthly series: Month (period), Withdrawals, Enrolled,
+    Rate, Rolling Rate and YoY as in ``trend_stats``, plus Anomalies (rows of
+    the ``flagged`` table in that month, if given).
+    """
+    counts = history["counts"].sum(axis=(0, 1))
+    # a campus's students count once per month of its school year, so sum campuses per month
+    enrolled = history["enrolled"].sum(axis=0)
+    stats = trend_stats(counts, enrolled, window)
+    months = history["months"]
+    table = pd.DataFrame({
+        "Month":        months,
+        "Withdrawals":  counts,
+        "Enrolled":     enrolled,
+        "Rate":         np.round(stats["rate"], 3),
+        "Rolling Rate": np.round(stats["rolling"], 2),
+        "YoY":          np.round(stats["yoy"], 2),
+    })
+    if flagged is not None:
+        per_month = flagged["Month"].value_counts()
+        table["Anomalies"] = per_month.reindex(months.strftime("%Y-%m"), fill_value=0).to_numpy()
+    return table
+
+
+def main(paths, threshold=Z_THRESHOLD, out=None):
+    start = time.perf_counter()
+    events = read_events(paths)
+    loaded = time.perf_counter()
+    history = withdrawal_history(events)
+    flagged = anomalies(history, threshold)
+    done = time.perf_counter()
+
+    counts = history["counts"]
+    print(f"Read {len(events):,} events in {loaded - start:.2f}s; {counts.shape[0]:,} campuses x "
+          f"{counts.shape[1]} reasons x {counts.shape[2]} months scored in {done - loaded:.2f}s")
+    print(district_trend(history, flagged).to_string(index=False))
+    if out:
+        flagged.to_csv(out, index=False)
+        print(f"Wrote {len(flagged):,} anomalies (|z| >= {threshold}) to {out}")
+    else:
+        print(flagged.head(20).to_string(index=False))
+    return flagged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("events", nargs="+", type=Path, help="student event files (CSV, Parquet or Arrow)")
+    parser.add_argument("--z", type=float, default=Z_THRESHOLD, help="|z| at or above which a month is flagged")
+    parser.add_argument("--out", type=Path, help="write every anomaly as CSV (default: print the top 20)")
+    args = parser.parse_args()
+    main(args.events, args.z, args.out)
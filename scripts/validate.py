@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Upfront schema and consistency checks for every dashboard input.
+
+Each check is one vectorized pass: over a column (negative counts, rates
+outside 0-100), or over a categorical's categories followed by a lookup on
+its codes (month names, event types, dates, grades), so checking 10M+ event
+rows costs milliseconds next to reading them. A failed check is reported
+as one line: the file, what is wrong, how many rows and a few examples.
+
+Errors stop a build before any panel is drawn (loader.py and
+``events.read_events`` run the per-file checks as each table is read);
+warnings, such as reasons without a fixed color, are only reported. Run on
+its own, e.g. as an ingest step, it also cross-checks the inputs against
+each other and exits non-zero on any error:
+
+    python scripts/validate.py data --format parquet
+    python scripts/validate.py --events data/student_events --keep-going
+"""
+
+import argparse, calendar, sys, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from events import ENROLL, EVENT_DTYPES, GRADES, OPTIONAL_DTYPES, WITHDRAW
+from reasons import REASON_COLORS
+from stream import CHUNK_ROWS
+
+MONTHS = list(calendar.month_name)[1:]
+EXAMPLES = 3                # example values shown per failed check
+PERCENT_ROUNDING = 0.05     # most a percentage rounded to 0.1 can be off by
+
+# The per-reason withdrawal summary: not drawn, but checked against the district withdrawals
+REASONS_FILE = "withdrawal_reasons"
+
+
+def problem(severity, check, mask, values=None):
+    """
+    A failed ``check`` (``mask`` flags the offending rows of ``values``, or is
+    one bool for the whole table) as a dict, or None if nothing is flagged.
+    Examples are the first few distinct flagged values.
+    """
+    if np.ndim(mask) == 0:      # a check on the table as a whole
+        return {"severity": severity, "check": check, "rows": None, "examples": []} if mask else None
+    mask = np.asarray(mask, dtype=bool)
+    rows = int(np.count_nonzero(mask))
+    if not rows:
+        return None
+    examples = []
+    if values is not None:
+        # only the first flagged rows are decoded, never the whole column
+        flagged = pd.Series(values).iloc[np.flatnonzero(mask)[:100 * EXAMPLES]]
+        examples = [v.item() if hasattr(v, "item") else v for v in pd.unique(flagged.to_numpy(dtype=object))]
+    return {"severity": severity, "check": check, "rows": rows, "examples": examples[:EXAMPLES]}
+
+
+def describe(p):
+    """One report line (without the file) for a problem."""
+    if p["rows"] is None:
+        return f"{p['severity'].upper()} {p['check']}"
+    examples = f", e.g. {', '.join(map(repr, p['examples']))}" if p["examples"] else ""
+    return f"{p['severity'].upper()} {p['check']} ({p['rows']:,} row{'s' if p['rows'] != 1 else ''}{examples})"
+
+
+def raise_errors(where, problems):
+    """Raise a ValueError naming ``where`` and every error among ``problems``; warnings pass."""
+    errors = [p for p in problems if p["severity"] == "error"]
+    if errors:
+        raise ValueError(f"{where}: " + "; ".join(describe(p) for p in errors))
+
+
+def per_category(series, test):
+    """
+    ``test`` (categories -> bool array) applied once per distinct value of
+    ``series`` and spread to its rows through the codes; missing rows are False.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    codes = series.cat.codes.to_numpy()
+    bad = np.flatnonzero(np.asarray(test(series.cat.categories), dtype=bool))
+    if len(bad) > 8:
+        return np.append(np.isin(np.arange(len(series.cat.categories)), bad), False)[codes]  # code -1 -> False
+    # a few comparisons of the small integer codes beat a gather, and clean data needs none
+    mask = np.zeros(len(codes), dtype=bool)
+    for code in bad:
+        mask |= codes == code
+    return mask
+
+
+def table_problems(name, table):
+    """Value checks on one schema-checked pre-aggregated input (see ``loader.SCHEMAS``)."""
+    checks = []
+    if name == "kpi":
+        rate = np.asarray([table["retention_rate"]], dtype=float)
+        checks.append(problem("error", "retention_rate outside 0-100", ~((rate >= 0) & (rate <= 100)), rate))
+    elif name == "comp":
+        checks += [
+            problem("error", "missing Category", table["Category"].isna()),
+            problem("error", "duplicate Category", table["Category"].duplicated(keep=False), table["Category"]),
+            problem("error", "negative Count", table["Count"].to_numpy() < 0, table["Count"]),
+        ]
+    elif name == "school":
+        rate = table["Retention Rate"].to_numpy(dtype=float, na_value=np.nan)
+        checks += [
+            problem("error", "missing Campus", table["Campus"].isna()),
+            problem("error", "duplicate Campus", table["Campus"].duplicated(keep=False), table["Campus"]),
+            problem("error", "Retention Rate outside 0-100", ~((rate >= 0) & (rate <= 100)), table["Retention Rate"]),
+        ]
+    elif name == "district":
+        checks += [
+            problem("error", "Month not a month name",
+                    per_category(table["Month"], lambda c: ~c.isin(MONTHS)) | table["Month"].isna(), table["Month"]),
+            problem("error", "missing Reason", table["Reason"].isna()),
+            problem("error", "negative Count", table["Count"].to_numpy() < 0, table["Count"]),
+            problem("warning", "Reason without a fixed color (drawn from the palette)",
+                    per_category(table["Reason"], lambda c: ~c.isin(list(REASON_COLORS))), table["Reason"]),
+        ]
+    elif name == "reasons":
+        percent = table["Percentage"].to_numpy(dtype=float, na_value=np.nan)
+        total = np.nansum(percent)
+        checks += [
+            problem("error", "negative Count", table["Count"].to_numpy() < 0, table["Count"]),
+            problem("error", "Percentage outside 0-100", ~((percent >= 0) & (percent <= 100)), table["Percentage"]),
+            problem("error", f"Percentages sum to {total:.1f}, not 100",
+                    abs(total - 100) > PERCENT_ROUNDING * len(table) + 1e-9),
+        ]
+    return [p for p in checks if p]
+
+
+def summary_problems(reasons, district):
+    """The per-reason summary against the district withdrawals it summarizes."""
+    totals = district["Count"].groupby(district["Reason"].astype(str).to_numpy()).sum()
+    summary = reasons["Count"].groupby(reasons["Reason"].astype(str).to_numpy()).sum()
+    keys = summary.index.union(totals.index)
+    summary, totals = summary.reindex(keys, fill_value=0), totals.reindex(keys, fill_value=0)
+    return [p for p in [
+        problem("error", "Count differs from the reason's total in the district withdrawals",
+                summary.to_numpy() != totals.to_numpy(), keys),
+    ] if p]
+
+
+def event_problems(events):
+    """Value checks on student events (see ``events.read_events``); a few passes over integer codes."""
+    missing = [c for c in EVENT_DTYPES if c not in events]
+    if missing:
+        return [problem("error", f"missing column(s) {', '.join(missing)}", True)]
+    # read_events hands over categoricals; a column of any other dtype is
+    # reported, and cast so its values can still be checked
+    labels = [c for c, t in {**EVENT_DTYPES, **OPTIONAL_DTYPES}.items() if t == "category" and c in events]
+    cast = [c for c in labels if not isinstance(events[c].dtype, pd.CategoricalDtype)]
+    checks = [problem("error", f"{c} is {events[c].dtype}, not categorical", True) for c in cast]
+    checks.append(problem("error", f"StudentID is {events['StudentID'].dtype}, not integer",
+                          not pd.api.types.is_integer_dtype(events["StudentID"])))
+    events = events.astype(dict.fromkeys(cast, "category"))
+    event = events["Event"]
+    enroll = per_category(event, lambda c: c == ENROLL)
+    withdraw = per_category(event, lambda c: c == WITHDRAW)
+    checks += [
+        problem("error", "missing Campus", events["Campus"].cat.codes.to_numpy() < 0),
+        problem("error", f"Event not {ENROLL} or {WITHDRAW}", ~(enroll | withdraw), event),
+        problem("error", "Date not a date",
+                per_category(events["Date"], lambda c: pd.to_datetime(c, errors="coerce").isna())
+                | (events["Date"].cat.codes.to_numpy() < 0), events["Date"]),
+        problem("warning", f"{WITHDRAW} without a Reason (left out of the reason counts)",
+                withdraw & (events["Reason"].cat.codes.to_numpy() < 0)),
+        problem("warning", f"{ENROLL} without a Category (left out of the composition)",
+                enroll & (events["Category"].cat.codes.to_numpy() < 0)),
+        problem("warning", "Reason without a fixed color (drawn from the palette)",
+                per_category(events["Reason"], lambda c: ~c.isin(list(REASON_COLORS))), events["Reason"]),
+    ]
+    if "Grade" in events:
+        checks.append(problem("error", "Grade not one of PK, K, 1-12",
+                              per_category(events["Grade"], lambda c: ~c.astype(str).isin(GRADES)), events["Grade"]))
+    return [p for p in checks if p]
+
+
+def validate(data_dir=None, fmt="csv", events=None, keep_going=False, chunk_rows=CHUNK_ROWS):
+    """
+    Check every input of a data directory, or every event file (dataset
+    directories expanded). Returns path -> problems for the files checked;
+    unless ``keep_going``, stops after the first file with an error.
+    """
+    from loader import read_input
+
+    if events:
+        from dataset import dataset_files
+        from events import read_events
+        files = [("events", path) for path in dataset_files(events)]
+    else:
+        import dashboard
+        from store import EXTENSIONS
+        files = [(name, dashboard.input_path(Path(data_dir), name, fmt)) for name in dashboard.INPUT_FILES]
+        summary = Path(data_dir) / (REASONS_FILE + (".csv" if fmt == "csv" else EXTENSIONS[fmt]))
+        if summary.exists():
+            files.append(("reasons", summary))
+
+    report, tables = {}, {}
+    for name, path in files:
+        try:
+            if name == "events":
+                found = event_problems(read_events([path], validate=False))
+            else:
+                tables[name] = read_input(name, path, chunk_rows, validate=False)
+                found = table_problems(name, tables[name])
+                if name == "reasons" and "district" in tables:
+                    found += summary_problems(tables["reasons"], tables["district"])
+        except Exception as exc:    # unreadable, or missing columns: nothing else can be checked (rows=None)
+            message = str(exc).removeprefix(str(path)).lstrip(": ")
+            found = [{"severity": "error", "check": f"{type(exc).__name__}: {message}", "rows": None, "examples": []}]
+        report[str(path)] = found
+        if not keep_going and any(p["severity"] == "error" for p in found):
+            break
+    return report
+
+
+def main(data_dir=None, fmt="csv", events=None, keep_going=False):
+    start = time.perf_counter()
+    report = validate(data_dir, fmt, events, keep_going)
+    seconds = time.perf_counter() - start
+    errors = sum(p["severity"] == "error" for found in report.values() for p in found)
+    warnings = sum(p["severity"] == "warning" for found in report.values() for p in found)
+    for where, found in report.items():
+        for p in found:
+            print(f"{where}: {describe(p)}")
+    print(f"Checked {len(report)} file(s) in {seconds:.2f}s: {errors} error(s), {warnings} warning(s)")
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("data_dir", nargs="?", type=Path, help="directory of pre-aggregated inputs (default data/)")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv",
+                        help="storage format of the pre-aggregated inputs")
+    parser.add_argument("--events", nargs="+", type=Path,
+                        help="student event files or dataset directories to check instead")
+    parser.add_argument("--keep-going", action="store_true",
+                        help="check every file instead of stopping at the first one with an error")
+    args = parser.parse_args()
+    data_dir = args.data_dir or Path(__file__).resolve().parents[1] / "data"
+    sys.exit(1 if main(data_dir, args.format, args.events, args.keep_going) else 0)
@@ -1,529 +1,171 @@
 #!/usr/bin/env python3
 """
 Build the Student Retention dashboard as an interactive HTML.
-"""
-from ctypes.wintypes import SHORT
 
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+The command line and the up-to-date check use only the standard library, so
+an unchanged dashboard is reported without importing pandas or plotly; the
+drawing code (dashboard.py) is imported once a build is needed.
+"""
+import argparse, hashlib, json
+from importlib.metadata import version
 from pathlib import Path
 
-# COLOR MAP FOR PLOT (2,1)
-REASON_COLORS = {
-    "Admin Withdraw":    "#ADD8E6",  # light blue
-    "EXP CAN'...":     "#F77E24",  # orange
-    "Elementar...":   "#014B86",  # dark blue
-    "Enroll in Ot...":   "#62C0DD",  # sky blue
-    "HOME SCHOOLING":    "#BACB1F",  # yellow-green
-    "OTHER (U...":   "#8DC63F",  # light green
-    "Transferre...":    "#522D80",  # purple
-}
-
-# COLOR MAP FOR PLOT (2,2)
-REASON_COLORS2 = {
-    "ADMIN WITHDRAW":    "#ADD8E6",  # light blue
-    "EXP CAN'T RET":     "#F77E24",  # orange
-    "Elementary With":   "#014B86",  # dark blue
-    "Enroll in Other":   "#62C0DD",  # sky blue
-    "HOME SCHOOLING":    "#f7ec24",  # yellow-green
-    "OTHER (UNKNOWN)":   "#8DC63F",  # light green
-    "Transferred to":    "#522D80",  # purple
-}
-
-
-def main():
-    # 1. Locate project root and data folder
-    project_root = Path(__file__).resolve().parents[1]
-    data_dir = project_root / "data"
-    output_dir = project_root / "outputs"
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # 2. Load data files
-    kpi = pd.read_json(data_dir / "retention_kpi.json", typ="series")
-    comp_df = pd.read_csv(data_dir / "student_composition.csv")
-    school_df = pd.read_csv(data_dir / "retention_by_school.csv")
-    district_df = pd.read_csv(data_dir / "district_withdrawals.csv")
-    pie_df = pd.read_csv(data_dir / "pie_data.csv")
-
-    # 3. Create a 2x2 subplot figure
-    fig = make_subplots(
-        rows=2, cols=2,
-        specs=[[{"type":"xy"},{"type":"xy"}],
-               [{"type":"domain"},{"type":"xy"}]],
-        column_widths=[0.4,0.6],        # first column 40%, second 60%
-        row_heights=[0.33, 0.67],       # first row 33%, second 67%
-        subplot_titles=(
-            "<b>STUDENT RETENTION KPI</b>",
-            "<b>RETENTION BY SCHOOL</b>",
-            "<b>TOP WITHDRAWAL REASONS</b>",
-            "<b>DISTRICT WITHDRAWALS</b>",
-
-
-        )
-    )
-# Repositioning Annotations
-    # Annotation 0 → “STUDENT RETENTION KPI” (row 1, col 1)
-    fig.layout.annotations[0].update(
-        x=0.02,  # 2% from left paper edge
-        y=0.98,  # 98% up the paper
-        xanchor="left",
-        yanchor="top",
-        font=dict(size=16)
-    )
-
-    # Annotation 1 → “RETENTION BY SCHOOL” (row 1, col 2)
-    fig.layout.annotations[1].update(
-        x=0.42 + 0.02,  # start of col 2 + small inset
-        y=0.98,
-        xanchor="left",
-        yanchor="top",
-        font=dict(size=16)
-    )
-
-    # Annotation 2 → “DISTRICT WITHDRAWALS” (row 2, col 1)
-    fig.layout.annotations[2].update(
-        x=0.02,
-        y=0.55,  # mid‐cell for the second row
-        xanchor="left",
-        yanchor="top",
-        font=dict(size=16)
-    )
-
-    # Annotation 3 → “TOP WITHDRAWAL REASONS” (row 2, col 2)
-    fig.layout.annotations[3].update(
-        x=0.42 + 0.02,
-        y=0.55,
-        xanchor="left",
-        yanchor="top",
-        font=dict(size=16)
-    )
-
-    fig.update_layout(
-        width=1500, # These lines make the entire figure a landscape style view
-        height=800,
-        margin=dict(l=20, r=20, t=100, b=20),
-        plot_bgcolor="white",
-    )
-
+from assets import COMPRESSIONS, PLOTLYJS_MODES
+from cache import BuildCache
+from dataset import dataset_files
+from stream import CHUNK_ROWS
+from timing import Timer
 
-    # ───────────────────────────────────────────────────────────────────────────
-    # DRAW BOXES AROUND EACH SUBPLOT USING RECTANGLE SHAPES
-    # ───────────────────────────────────────────────────────────────────────────
-    '''
-    cw, ch = 0.4, 0.33  # column width of col1, row height of row1
-    boxes = [
-        # (x0, x1, y0, y1)
-        (0.0, cw, 1 - ch, 1.0),  # row1, col1
-        (cw, 1.0, 1 - ch, 1.0),  # row1, col2
-        (0.0, cw, 0.0, 1 - ch),  # row2, col1
-        (cw, 1.0, 0.0, 1 - ch),  # row2, col2
-    ]
+# Settings of the retention-by-school panel (the command line needs them before plotting code loads)
+SCHOOL_MODES = ("auto", "bars", "extremes", "histogram", "all")
+SCHOOL_BARS_MAX = 40        # "auto" draws one bar per campus up to this many campuses
+SCHOOL_TOP_K = 10           # campuses shown at each end in "extremes" mode
+SCHOOL_GL_MIN = 500         # "all" switches from bars to WebGL points above this many campuses
+SCHOOL_BIN_WIDTH = 5        # retention-rate points per bin in "histogram" mode
+SCHOOL_LOW_COLOR = "#F77E24"
 
-    for x0, x1, y0, y1 in boxes:
-        fig.add_shape(
-            type="rect",
-            xref="paper", yref="paper",
-            x0=x0, x1=x1, y0=y0, y1=y1,
-            line=dict(color="black", width=1),
-            fillcolor="rgba(0,0,0,0)"  # transparent
-        )
-    '''
+# Slices of the embedded drill-down cube: by campus, or by campus and grade
+CUBE_LEVELS = ("campus", "grade")
 
-    #4a. Top-left: KPI annotation + horizontal bar
-    # - Bar chart of Returning vs New
-
-    comp_df = comp_df.iloc[::-1]        # This reverses the order of the rows so that the graphic matches the image.
-    fig.add_trace(                      # Note that [::-1] is start (not specified), stop (not specified), and step = -1 (step backwards)
-        go.Bar(
-            x=comp_df["Count"],
-            y=comp_df["Category"],
-            orientation="h",
-            marker_color="#9DE2F3",
-            text=[f"{c/1000:.1f}K" for c in comp_df["Count"]],
-            textposition="inside",
-            showlegend=False,
-        ),
-        row=1, col=1
-    )
-
-    # - Big KPI % annotation at top-left
-    fig.add_annotation(
-        text=(
-            f"<b><span style='color:#9DE2F3'>{int(kpi['retention_rate'])}%</span>"
-            f"<br><span style='font-size:18px; color:rgba(128, 128, 128, 0.6)'>Retention</span></b>"
-        ),
-        xref="x domain", yref="y domain",
-        x=-0.7, y=0.5,       # position above the bar chart
-        showarrow=False,
-        font=dict(size=36),
-        align="right"
-    )
-
-    fig.update_xaxes(
-        row=1, col=1,
-        domain=[0.18,0.40], # This adjusts the top-left bar graph to only go from 30% to 98% of the top-left subplot.
-        tickvals=[0, 2000],
-        ticktext=["0K", "2K"],
-        showgrid=False,
-        gridcolor="gray",
-        gridwidth=1,
-        griddash="dash",
-        ticklabelstandoff=50, # This moves the ticklabels below the graph
-    )
-
-    fig.update_yaxes(
-        row=1, col=1,
-        domain=[0.8,0.88],
-        tickfont=dict(color="rgba(128, 128, 128, 0.6)"), # The last number here is the opacity
-        ticklabelstandoff=10,
-    )
-
-    fig.add_shape( # This code adds the gray dashed line at the 2K mark on the x-axis.
-        type="line",  # Note that yref had to be y domain instead of y1 to fix this.
-        xref="x1", yref="y domain",
-        x0=2000, x1=2000,
-        y0=-.9, y1=1.5,
-        line=dict(color="rgba(128, 128, 128, 0.15)", dash="dash"),
-        layer="above",
-    )
-
-    fig.add_shape(  # This code adds the gray dashed line at the 2K mark on the x-axis.
-        type="line",  # Note that yref had to be y domain instead of y1 to fix this.
-        xref="x1", yref="y domain",
-        x0=0, x1=0,
-        y0=-.9, y1=1.5,
-        line=dict(color="rgba(128, 128, 128, 0.15)", dash="dash"),
-        layer="above",
-    )
 
 ###
-# SUBPLOT (1,2) = RETENTION BY SCHOOL
+# COMMAND LINE AND FAST PATH (standard library only)
 ###
 
-    fig.add_trace(
-        go.Bar(
-            x=school_df["Campus"],
-            y=school_df["Retention Rate"],
-            marker_color="#3BD2E5",
-            text=[f"{r}%" for r in school_df["Retention Rate"]],
-            textposition="inside",
-            insidetextfont=dict(color="white", size=12, family="Arial, sans-serif"),
-            showlegend=False,
-        ),
-        row=1,col=2
-    )
-
-
-    fig.update_xaxes(
-        row=1, col=2,
-        domain=[0.45,0.98],
-        tickfont=dict(size=10),
-        showgrid=False,
-        zeroline=False,
-    )
-    fig.update_yaxes(
-        row=1, col=2,
-        domain=[0.70, 0.9],
-        range=[0,100],
-        showgrid=False,
-        zeroline=False,
-        showticklabels=False,
-    )
-
-###
-# SUBPLOT (2,1) TOP WITHDRAWAL REASONS (PIE CHART)
-###
-
-    fig.add_trace(
-        go.Pie(
-            labels=pie_df["Reason"],
-            values=pie_df["Percentage"],
-            marker_colors=[REASON_COLORS[r] for r in pie_df["Reason"]],
-            textinfo="percent",
-            textposition="outside",
-            sort=False,
-            direction="clockwise",
-            insidetextorientation="radial",
-            showlegend=True,
-        ),
-    row=2, col=1
-)
-
-    fig.update_traces(
-        selector=dict(type="pie"),
-        domain=dict(x=[0.02, 0.35], y=[0.15, 0.45]),
-        pull=[0,0,0,0,0],
-        textposition="outside",
-        textfont=dict(size=14),
-    )
-
-    fig.update_layout(
-        legend=dict(
-            orientation="h",
-
-            # paper coords:
-            xref="paper",
-            yref="paper",
-
-            # line up left edge with pie (0.02) and bottom edge at y=0.05
-            x=0.001,
-            y=0.05,
-            xanchor="left",
-            yanchor="bottom",
-
-            # let each entry size itself to its text
-            itemsizing="constant",
-            # if you still want a hard max width, itemwidth can help,
-            # but often you can omit it now:
-             itemwidth=30,
-
-            # small gap between each item
-            tracegroupgap=0,
-
-            font=dict(size=9.8),
-            itemclick=False,
-            itemdoubleclick=False,
-        )
-    )
-
-###
-# SUBPLOT (2,2) DISTRICT WITHDRAWALS
-###
-
-    # First, define the calendar order of months so bars appear left-to-right
-    MONTH_ORDER = [
-        "August", "September", "October", "November", "December",
-        "January", "February", "March", "April",
-    ]
-
-    # Pivot district_df so each Reason is its own column:
-    pivot = (
-        district_df
-        .groupby(["Year", "Month", "Reason"], as_index=False)["Count"]
-        .sum()
-        .pivot(index=["Year", "Month"], columns="Reason", values="Count")
-        .fillna(0)
-        .reset_index()
-    )
-
-    # Create a single string index for plotting and sort it by our MONTH_ORDER
-    pivot["MonthYear"] = pivot["Month"] + " " + pivot["Year"].astype(str)
-    pivot = pivot.set_index("MonthYear").loc[
-        [m + " 2022" for m in MONTH_ORDER[:5]] + # August-December 2022
-        [m + " 2023" for m in MONTH_ORDER[5:]]   # Jan-Apr 2023
-    ].reset_index()
-
-    # Now add one go.Bar trace per Reason, stacking them:
-    for Reason in [
-        "ADMIN WITHDRAW",
-        "Elementary With",
-        "Enroll in Other",
-        "EXP CAN'T RET",
-        "HOME SCHOOLING",
-        "OTHER (UNKNOWN)",
-        "Transferred to",
-    ]:
-        fig.add_trace(
-            go.Bar(
-                x=pivot["MonthYear"],
-                y=pivot[Reason],
-                name=Reason,
-                marker_color=REASON_COLORS2[Reason],
-                marker_line_width=0,
-                showlegend=False,
-            ),
-            row=2, col=2
-        )
-
-    # Configure the stack:
-    fig.update_layout(
-        barmode="stack",
-        width=1500,
-        height=800,
-        margin=dict(l=20, r=20, t=100, b=160),
-
-    )
-
-    # Annotate the total on top of each bar:
-    totals = pivot.drop(columns=["Year", "Month"]).set_index("MonthYear").sum(axis=1)
-    for i, m in enumerate(pivot["MonthYear"]):
-        fig.add_annotation(
-            x=m,
-            y=totals.loc[m] + 2,    # this places the annotation a little above the bar
-            text=str(int(totals.loc[m])),
-            showarrow=False,
-            row=2, col=2,
-            font=dict(size=12),
-        )
-
-    # Tidy up the axes:
-    fig.update_xaxes(
-        row=2, col=2,
-        domain=[0.48, 0.9],  # same as your other domain settings
-        tickmode="array",
-        tickvals=pivot["MonthYear"],
-        ticktext=["August", "Septem..", "October", "Novem..", "Decem..", "January", "February", "March", "April"],
-        tickangle=-90,
-        tickfont=dict(size=10),
-        showgrid=False,
-        zeroline=False,
-    )
-    fig.update_yaxes(
-        row=2, col=2,
-        domain=[0.15, 0.5],
-        range=[0, totals.max() * 1.1],
-        showgrid=True,
-        gridcolor="lightgray",
-        griddash="dot",
-        zeroline=False,
-        title_text="",  # or “Count” if you like
-        tickvals = [0, 50, 100],
-        ticklabelstandoff = 30
-    )
-
-    legend_y = 0.3
-    legend_x_start = 0.91
-    legend_gap = 0.055
-
-    reasons = list(REASON_COLORS2.items())
-
-    for i, (label, color) in enumerate(reasons):
-        fig.add_annotation(
-            x=legend_x_start,
-            y=legend_y - i * legend_gap, # invisible data point
-            xanchor="left",
-            xref="paper",
-            yref="paper",
-            showarrow=False,
-            font=dict(size=11, color="black"),
-            text=f"<span style='font-size: 20px; color:{color}'>{u'\u25CF'}</span> {label}",
-            yshift = 60
-            )
-
-    # floating "2022" under Aug-Dec
-    fig.add_annotation(
-        text="2022",
-        x=0.597, y=0.02,  # pick the midpoint category
-        xref="paper",
-        yref="paper",
-        showarrow=False,
-        font=dict(size=11)
-    )
-
-    # floating "2023" under Jan-Apr
-    fig.add_annotation(
-        text="2023",
-        x=0.818, y=0.02,
-        xref="paper",
-        yref="paper",
-        showarrow=False,
-        font=dict(size=11)
-    )
-
-    # Draw a vertical dashed line after April at the bottom of the bar plot
-    fig.add_shape(
-        type="line",
-        xref="paper",
-        yref="paper",
-        x0=0.9,
-        x1=0.9,
-        y0=0.02,
-        y1=.4748,
-        line=dict(
-            color="rgba(128,128,128,0.3)",
-            dash="dot",
-            width=1
-        ),
-        layer="above"
-    )
-
-    # draw a vertical dashed line at the split point (e.g. just before "January 2023"):
-    fig.add_shape(
-        type="line",
-        xref="paper",
-        yref="paper",
-        x0=0.713,
-        x1=0.713,
-        y0=0.02,
-        y1=.15,
-        line=dict(
-            color="rgba(128,128,128,0.3)",
-            dash="dot",
-            width=1
-        ),
-        layer="above"
-    )
-
-    # Draw a vertical dashed line before August at the bottom of the bar plot
-    fig.add_shape(
-        type="line",
-        xref="paper",
-        yref="paper",
-        x0=0.48,
-        x1=0.48,
-        y0=0.02,
-        y1=.15,
-        line=dict(
-            color="rgba(128,128,128,0.3)",
-            dash="dot",
-            width=1
-        ),
-        layer="above"
-    )
-
-    # Draw a horizontal dashed line next to the zero on the bar plot
-    fig.add_shape(
-        type="line",
-        xref="paper",
-        yref="paper",
-        x0=0.46,
-        x1=0.9,
-        y0=0.15,
-        y1=.15,
-        line=dict(
-            color="rgba(128,128,128,0.3)",
-            dash="dot",
-            width=1
-        ),
-        layer="above"
-    )
-
-    # Draw a horizontal dashed line next to the 50 on the y-axis
-    fig.add_shape(
-        type="line",
-        xref="paper",
-        yref="paper",
-        x0=0.46,
-        x1=0.479,
-        y0=0.3124,
-        y1=.3124,
-        line=dict(
-            color="rgba(128,128,128,0.3)",
-            dash="dot",
-            width=1
-        ),
-        layer="above"
-    )
-
-    # Draw a horizontal dashed line next to the 100 on the y-axis
-    fig.add_shape(
-        type="line",
-        xref="paper",
-        yref="paper",
-        x0=0.46,
-        x1=0.479,
-        y0=0.4748,
-        y1=.4748,
-        line=dict(
-            color="rgba(128,128,128,0.3)",
-            dash="dot",
-            width=1
-        ),
-        layer="above"
-    )
-
-    fig.write_html(output_dir / "retention_dashboard_preview.html")
-
-if __name__ =="__main__":
-    main()
\ No newline at end of file
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", nargs="+", type=Path,
+                        help="student-level event files (CSV, Parquet or Arrow), or partitioned dataset "
+                             "directories from data_gen.py --partitions, to aggregate instead of data/")
+    parser.add_argument("--school-year", type=int,
+                        help="school year to show (start year, e.g. 2022); defaults to the latest")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv",
+                        help="storage format of the pre-aggregated inputs in data/")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="rebuild every panel instead of reusing unchanged ones from the .cache next to the output")
+    parser.add_argument("--data-dir", type=Path, help="directory of pre-aggregated inputs (default data/)")
+    parser.add_argument("--out", type=Path, help="output HTML, or a .png/.svg/.pdf image "
+                                                 "(default outputs/retention_dashboard_preview.html)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="rows of district withdrawals aggregated at a time (bounds peak memory)")
+    parser.add_argument("--school-mode", choices=SCHOOL_MODES, default="auto",
+                        help="retention by school: one bar per campus, highest/lowest K, a histogram, or all "
+                             "campuses ranked (WebGL when large); auto picks bars or extremes by campus count")
+    parser.add_argument("--school-k", type=int, default=SCHOOL_TOP_K,
+                        help="campuses shown at each end in extremes mode")
+    parser.add_argument("--cube", choices=CUBE_LEVELS,
+                        help="embed an aggregate cube of the events and year/campus(/grade)/reason dropdowns "
+                             "that switch slices in the page (needs --events)")
+    parser.add_argument("--trend", action="store_true",
+                        help="add a withdrawal trend panel under the dashboard: rolling and year-over-year rates "
+                             "over every year of the events, with campus/reason anomalies (needs --events)")
+    parser.add_argument("--profile", action="store_true",
+                        help="also run under cProfile (top functions in the timing report, raw stats in .prof)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also record each stage's peak traced memory (slows the build)")
+    parser.add_argument("--plotlyjs", choices=PLOTLYJS_MODES, default="inline",
+                        help="inline plotly.js, or reference one shared content-hashed plotly.min.js")
+    parser.add_argument("--asset-dir", type=Path, help="where the shared plotly.min.js goes (default: next to the output)")
+    parser.add_argument("--compress", nargs="+", choices=COMPRESSIONS, default=(),
+                        help="also write pre-compressed .gz/.br siblings")
+    parser.add_argument("--compact", action="store_true",
+                        help="embed the figure JSON compacted: binary typed arrays, shared annotation/shape "
+                             "properties in the template, trimmed floats")
+    args = parser.parse_args(argv)
+    if args.school_k < 1:
+        parser.error(f"--school-k must be at least 1, got {args.school_k}")
+    if args.cube and not args.events:
+        parser.error("--cube needs --events")
+    if args.trend and not args.events:
+        parser.error("--trend needs --events")
+    if args.events:
+        try:
+            args.events = dataset_files(args.events)     # so the cache tracks each part file
+        except ValueError as exc:
+            parser.error(str(exc))
+    return args
+
+
+def default_paths(data_dir=None, out_path=None):
+    """``data_dir`` and ``out_path``, defaulting to the project's data/ and outputs/."""
+    project_root = Path(__file__).resolve().parents[1]
+    return (data_dir or project_root / "data",
+            out_path or project_root / "outputs" / "retention_dashboard_preview.html")
+
+
+def code_fingerprint():
+    """
+    Salt for cache keys, so editing any of the build code (every module in
+    scripts/, which viz.py imports directly or indirectly, and the page's
+    cube.js) or upgrading plotly rebuilds every panel.
+    """
+    digest = hashlib.sha256(version("plotly").encode())
+    here = Path(__file__).resolve().parent
+    for path in sorted([*here.glob("*.py"), here / "cube.js"]):
+        digest.update(f"\0{path.name}\0".encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def build_signature(events, school_year, fmt, data_dir, options, html_options):
+    """Every setting that changes the output, as a string for the output's cache key."""
+    return json.dumps(dict(events=events, school_year=school_year, fmt=fmt, data_dir=data_dir,
+                           options=options, html=html_options), sort_keys=True, default=str)
+
+
+def up_to_date(out_path, signature):
+    """
+    True if ``out_path`` was built with ``signature`` from inputs that have not
+    changed since, and every file it wrote is still there untouched.
+
+    Only stats files (plus the cache manifest), so an up-to-date build is
+    served without importing pandas or plotly.
+    """
+    cache_dir = out_path.parent / ".cache" / out_path.stem
+    if not (cache_dir / "manifest.json").exists():
+        return False
+    cache = BuildCache(cache_dir, salt=code_fingerprint())
+    entry = cache.stored("output")
+    try:
+        if entry is None or cache.get("output", cache.key("output", entry["inputs"], extra=signature)) is None:
+            return False
+        return all(cache.file_hash(path) == digest for path, digest in entry["files"].items())
+    except FileNotFoundError:
+        return False
+
+
+def main(events=None, school_year=None, fmt="csv", use_cache=True, data_dir=None, out_path=None,
+         chunk_rows=CHUNK_ROWS, options=None, profile=False, trace_memory=False, **html_options):
+    # 1. Locate project root and data folder, and stop early if nothing changed
+    #    (unless profiling or tracing memory, which needs a real build)
+    data_dir, out_path = default_paths(data_dir, out_path)
+    signature = build_signature(events, school_year, fmt, data_dir, options, html_options)
+    if use_cache and not (profile or trace_memory) and up_to_date(out_path, signature):
+        print(f"Up to date: {out_path}")
+        return None
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # 2. Plotting and data libraries are only imported once a build is needed
+    from dashboard import PANELS, build
+
+    # 3. Build under the timer, and write its report next to the output
+    with Timer(memory=trace_memory, profile=profile) as timer:
+        stale = build(out_path, events, school_year, fmt, use_cache, data_dir, chunk_rows, options, **html_options)
+    report = timer.write(out_path.with_name(out_path.stem + ".timing.json"),
+                         output=str(out_path), rebuilt=stale)
+    reused = sorted(set(PANELS) - set(stale))
+    print(f"Rebuilt panels: {', '.join(stale) or 'none'}; reused: {', '.join(reused) or 'none'}")
+    print(f"Built in {timer.seconds:.3f}s; timing report: {report}")
+    return stale
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    options = {"school": {"mode": args.school_mode, "k": args.school_k}}
+    if args.cube:
+        options["cube"] = args.cube
+    if args.trend:
+        options["trend"] = True
+    main(args.events, args.school_year, args.format, not args.no_cache, args.data_dir, args.out, args.chunk_rows,
+         options, args.profile, args.trace_memory,
+         plotlyjs=args.plotlyjs, asset_dir=args.asset_dir, compress=args.compress, compact=args.compact)
@@ -0,0 +1,35 @@
+"""The scripts are flat modules run as scripts, so tests import them from scripts/ (and upload.py from the root)."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "scripts"), str(ROOT)]
+
+
+@pytest.fixture(scope="session")
+def generated_events(tmp_path_factory):
+    """Student events of 3,000 students at 6 campuses over 3 school years (data_gen.py), read back."""
+    from data_gen import generate_events
+    from events import read_events
+
+    path = tmp_path_factory.mktemp("events") / "events.parquet"
+    generate_events(path, 3000, campuses=6, years=3, seed=7, fmt="parquet")
+    return read_events([path])
+
+
+@pytest.fixture
+def small_events():
+    """Four events of three students at two campuses, as plain (non-categorical) columns."""
+    return pd.DataFrame({
+        "StudentID": [1, 2, 3, 1],
+        "Campus":    ["Campus 1", "Campus 1", "Campus 2", "Campus 1"],
+        "Event":     ["ENROLL", "ENROLL", "ENROLL", "WITHDRAW"],
+        "Date":      ["2022-08-15", "2022-08-16", "2022-08-15", "2022-10-03"],
+        "Category":  ["Returning", "New", "New", None],
+        "Reason":    [None, None, None, "HOME SCHOOLING"],
+        "Grade":     ["4", "5", "K", "4"],
+    })
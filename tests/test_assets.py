@@ -0,0 +1,102 @@
+"""Compact figure JSON decodes back to the figure it was made from."""
+
+import base64
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import dashboard
+from assets import FLOAT_DIGITS, TYPED_ARRAY_MIN, compact_figure, typed_array
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+def expand(value):
+    """Decode typed arrays, the way plotly.js reads them."""
+    if isinstance(value, dict):
+        if set(value) == {"dtype", "bdata"}:
+            return np.frombuffer(base64.b64decode(value["bdata"]), dtype=f"<{value['dtype']}").tolist()
+        return {k: expand(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [expand(v) for v in value]
+    return value
+
+
+def resolve_items(layout):
+    """Fold template items back into the annotations/shapes that refer to them."""
+    layout = dict(layout)
+    template = dict(layout["template"], layout=dict(layout["template"]["layout"]))
+    for key in ("annotations", "shapes"):
+        named = {item["name"]: item for item in template["layout"].get(key, []) if "name" in item}
+        used = {item.get("templateitemname") for item in layout.get(key, [])}
+        layout[key] = [
+            dict({k: v for k, v in named[item["templateitemname"]].items() if k != "name"},
+                 **{k: v for k, v in item.items() if k != "templateitemname"})
+            if item.get("templateitemname") in named else item
+            for item in layout.get(key, [])
+        ]
+        shared = [item for item in template["layout"].get(key, []) if item.get("name") not in used]
+        if shared:
+            template["layout"][key] = shared
+        else:
+            template["layout"].pop(key, None)
+    layout["template"] = template
+    return layout
+
+
+def trimmed(value):
+    if isinstance(value, dict):
+        return {k: trimmed(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [trimmed(v) for v in value]
+    if isinstance(value, float):
+        return float(f"{value:.{FLOAT_DIGITS}g}")
+    return value
+
+
+@pytest.fixture(scope="module")
+def figure():
+    template = dashboard.build_template()
+    data = dashboard.load_inputs(DATA)
+    return dashboard.assemble_figure(template, dashboard.build_panels(data, dashboard.PANELS, template))
+
+
+@pytest.mark.parametrize("min_length", [TYPED_ARRAY_MIN, 2])     # the demo data's arrays are short
+def test_compact_figure_round_trips(figure, min_length):
+    compact = compact_figure(figure, min_length)
+    assert min_length == TYPED_ARRAY_MIN or any("bdata" in str(trace) for trace in compact["data"])
+    assert "templateitemname" in str(compact["layout"])
+    assert len(str(compact)) < len(str(figure))
+
+    got = expand(compact)
+    got["layout"] = resolve_items(got["layout"])
+    types = {trace.get("type", "scatter") for trace in figure["data"]}
+    template = figure["layout"]["template"]
+    expected = dict(figure, layout=dict(figure["layout"], template=dict(
+        template, data={t: v for t, v in template["data"].items() if t in types})))
+    assert trimmed(got) == trimmed(expected)
+
+
+def test_compact_figure_leaves_input_alone(figure):
+    before = str(figure)
+    compact_figure(figure)
+    assert str(figure) == before
+
+
+@pytest.mark.parametrize("values, dtype", [
+    (list(range(16)), "i1"),
+    ([300] * 16, "i2"),
+    ([0.5] * 16, "f4"),
+    ([0.1] * 16, "f8"),
+])
+def test_typed_array_picks_the_smallest_exact_dtype(values, dtype):
+    spec = typed_array(values)
+    assert spec["dtype"] == dtype
+    assert expand(spec) == values
+
+
+def test_short_or_mixed_lists_stay_plain():
+    assert typed_array([1, 2, 3]) is None
+    assert typed_array([1] * 15 + [None]) is None
+    assert typed_array([True] * 16) is None
@@ -0,0 +1,37 @@
+"""Batch manifests."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from batch import read_manifest
+
+
+def test_school_k_read_from_manifest(tmp_path):
+    manifest = tmp_path / "jobs.json"
+    manifest.write_text(json.dumps([{"output": "a.html", "school_mode": "extremes", "school_k": 5}]))
+    job, = read_manifest(manifest)
+    assert job["options"] == {"school": {"mode": "extremes", "k": 5}}
+
+
+@pytest.mark.parametrize("k", [0, -3])
+def test_school_k_below_one_rejected(tmp_path, k):
+    manifest = tmp_path / "jobs.csv"
+    manifest.write_text(f"output,school_mode,school_k\na.html,extremes,{k}\n")
+    with pytest.raises(ValueError, match="school_k must be at least 1"):
+        read_manifest(manifest)
+
+
+def test_shared_plotlyjs_written_once(tmp_path):
+    import batch
+
+    data = str(Path(__file__).resolve().parents[1] / "data")
+    manifest = tmp_path / "jobs.json"
+    manifest.write_text(json.dumps([{"output": f"district_{i}/dashboard.html", "data_dir": data} for i in (1, 2)]))
+    summary = batch.main(manifest, workers=1, plotlyjs="shared")
+    assert summary["failed"] == 0
+    bundles = list(tmp_path.rglob("plotly-*.min.js"))
+    assert [b.parent for b in bundles] == [tmp_path]
+    page = (tmp_path / "district_1" / "dashboard.html").read_text()
+    assert f'src="../{bundles[0].name}"' in page
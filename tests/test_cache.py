@@ -0,0 +1,58 @@
+"""Incremental rebuilds: editing any build module invalidates the output and panel caches."""
+
+import os, shutil, subprocess, sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def build(scripts, out):
+    result = subprocess.run(
+        [sys.executable, str(scripts / "viz.py"), "--data-dir", str(ROOT / "data"), "--out", str(out)],
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout
+
+
+@pytest.mark.parametrize("module", ["events.py", "cube.js", "stream.py"])
+def test_dependency_edit_rebuilds(tmp_path, module):
+    scripts = tmp_path / "scripts"
+    shutil.copytree(ROOT / "scripts", scripts, ignore=shutil.ignore_patterns("__pycache__"))
+    out = tmp_path / "out" / "dashboard.html"
+
+    assert "Rebuilt panels" in build(scripts, out)
+    assert "Up to date" in build(scripts, out)
+
+    with open(scripts / module, "a") as f:
+        f.write("\n// edited\n" if module.endswith(".js") else "\n# edited\n")
+    output = build(scripts, out)
+    assert "Up to date" not in output
+    assert "reused: none" in output
+
+
+def test_failed_build_then_revert_rebuilds(tmp_path, monkeypatch):
+    import dashboard
+    from cache import BuildCache
+
+    data = tmp_path / "data"
+    shutil.copytree(ROOT / "data", data)
+    out = tmp_path / "out" / "dashboard.html"
+    dashboard.build(out, data_dir=data)
+    cached = BuildCache(out.parent / ".cache" / out.stem).stored("school")
+
+    # edit an input, and fail the build after the new panel is cached but before the manifest is saved
+    school = data / "retention_by_school.csv"
+    original, stat = school.read_bytes(), school.stat()
+    school.write_bytes(original.replace(b"Campus 2,92", b"Campus 2,10"))
+    with monkeypatch.context() as m:
+        m.setattr(dashboard, "write_html", lambda *args, **kwargs: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            dashboard.build(out, data_dir=data)
+
+    # reverting the file (mtime included) must not bring back the edited panel
+    school.write_bytes(original)
+    os.utime(school, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert "school" in dashboard.build(out, data_dir=data)
+    assert BuildCache(out.parent / ".cache" / out.stem).stored("school") == cached
@@ -0,0 +1,59 @@
+"""Year-over-year retention counts, by hand and against a pandas merge of each year with the next."""
+
+import pandas as pd
+
+from cohort import retention_table
+from events import SCHOOL_YEAR_START
+
+
+def enrollments(rows):
+    events = pd.DataFrame(rows, columns=["StudentID", "Campus", "Date", "Grade"]).assign(
+        Event="ENROLL", Category="Returning", Reason=None)
+    return events.astype({c: "category" for c in events if c != "StudentID"})
+
+
+EVENTS = enrollments([
+    (1, "Campus A", "2021-08-16", "4"), (1, "Campus A", "2022-08-15", "5"), (1, "Campus A", "2023-08-14", "6"),
+    (2, "Campus A", "2021-08-16", "4"),                                         # gone after one year
+    (3, "Campus B", "2021-08-16", "12"),                                        # graduating, left out
+    (4, "Campus B", "2021-08-16", "3"), (4, "Campus A", "2021-11-01", "3"),     # transfer: first enrollment counts
+    (4, "Campus A", "2022-08-15", "4"),
+    (5, "Campus A", "2021-08-16", "7"), (5, "Campus A", "2023-08-14", "8"),     # skipped a year
+    (6, "Campus B", "2022-08-15", "1"), (6, "Campus B", "2023-08-14", "2"),
+])
+
+
+def counts(table, by):
+    return [tuple(r) for r in table[["Year", *by, "Enrolled", "Retained"]].itertuples(index=False)]
+
+
+def test_counts_by_campus():
+    assert counts(retention_table(EVENTS), ["Campus"]) == [
+        (2021, "Campus A", 3, 1), (2021, "Campus B", 1, 1),
+        (2022, "Campus A", 2, 1), (2022, "Campus B", 1, 1),
+    ]
+
+
+def test_counts_by_cohort_and_year():
+    assert counts(retention_table(EVENTS, by=("Cohort",)), ["Cohort"]) == [
+        (2021, 2021, 4, 2), (2022, 2021, 2, 1), (2022, 2022, 1, 1),
+    ]
+    assert counts(retention_table(EVENTS, years=[2022]), ["Campus"]) == [
+        (2022, "Campus A", 2, 1), (2022, "Campus B", 1, 1),
+    ]
+
+
+def test_matches_pandas_merge(generated_events):
+    events = generated_events
+    enroll = events[events["Event"] == "ENROLL"][["StudentID", "Campus", "Date", "Grade"]].astype(
+        {"Campus": str, "Grade": str})
+    date = pd.to_datetime(enroll["Date"].astype(str))
+    enroll["Year"] = (date.dt.year - (date.dt.month < SCHOOL_YEAR_START)).astype("int64")
+    first = enroll.drop_duplicates(["StudentID", "Year"])
+    following = first[["StudentID", "Year"]].assign(Year=first["Year"] - 1, Retained=1)
+    first = first.merge(following, on=["StudentID", "Year"], how="left").fillna({"Retained": 0})
+    base = first[first["Year"].add(1).isin(first["Year"].unique()) & (first["Grade"] != "12")]
+    expected = base.groupby(["Year", "Campus"]).agg(Enrolled=("Retained", "size"), Retained=("Retained", "sum"))
+
+    got = retention_table(events).set_index(["Year", "Campus"])[["Enrolled", "Retained"]]
+    pd.testing.assert_frame_equal(got, expected.astype("int64"), check_names=False)
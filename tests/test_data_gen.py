@@ -0,0 +1,28 @@
+"""Partitioned event datasets do not depend on how many processes wrote them."""
+
+import json
+
+import pytest
+
+from data_gen import generate_dataset
+from dataset import DATASET_FILE
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_same_files_for_any_worker_count(tmp_path, fmt):
+    runs = {}
+    for workers in (1, 3):
+        out = tmp_path / f"workers-{workers}"
+        rows = generate_dataset(out, 2000, campuses=6, years=2, seed=5, fmt=fmt,
+                                chunk_size=300, partitions=3, workers=workers)
+        runs[workers] = rows, {p.name: p.read_bytes() for p in sorted(out.iterdir())}
+
+    (rows, files), (rows_3, files_3) = runs[1], runs[3]
+    assert rows == rows_3
+    assert sorted(files) == sorted(files_3) and len(files) == 4
+    for name in files:
+        assert files[name] == files_3[name], name
+
+    manifest = json.loads(files[DATASET_FILE])
+    assert sum(part["students"] for part in manifest["parts"]) == 2000
+    assert sum(part["rows"] for part in manifest["parts"]) == rows
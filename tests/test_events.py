@@ -0,0 +1,36 @@
+"""Reading student events from columnar files."""
+
+import pandas as pd
+import pyarrow as pa, pyarrow.parquet as pq
+
+from events import aggregate_events, read_events
+
+def test_parquet_with_plain_string_columns(tmp_path, small_events):
+    path = tmp_path / "events.parquet"
+    pq.write_table(pa.Table.from_pandas(small_events.astype({"StudentID": "int64"}), preserve_index=False), path)
+    assert not pa.types.is_dictionary(pq.read_schema(path).field("Campus").type)
+
+    events = read_events([path])
+    for column in ["Campus", "Event", "Date", "Category", "Reason", "Grade"]:
+        assert isinstance(events[column].dtype, pd.CategoricalDtype), column
+
+    data = aggregate_events(events)
+    assert data["comp"].set_index("Category")["Count"].to_dict() == {"New": 2, "Returning": 1}
+    assert data["district"]["Count"].sum() == 1
+
+
+def test_school_rate_rounded_once_from_counts():
+    # 94 of 110 students back: 85.45%, which rounding the 0.1-rounded cohort rate (85.5) would make 86
+    ids = list(range(1, 111)) + list(range(1, 95))
+    events = pd.DataFrame({
+        "StudentID": ids,
+        "Campus":    "Campus 1",
+        "Event":     "ENROLL",
+        "Date":      ["2021-08-16"] * 110 + ["2022-08-15"] * 94,
+        "Category":  "Returning",
+        "Reason":    None,
+        "Grade":     ["4"] * 110 + ["5"] * 94,
+    })
+    data = aggregate_events(events.astype({c: "category" for c in events if c != "StudentID"}), school_year=2022)
+    assert data["school"]["Retention Rate"].tolist() == [85]
+    assert data["kpi"]["retention_rate"] == 85
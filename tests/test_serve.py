@@ -0,0 +1,61 @@
+"""The response cache's size and age bounds."""
+
+import pytest
+
+import serve
+from serve import LRUCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(serve.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_evicts_least_recently_used_by_size(clock):
+    cache = LRUCache(max_bytes=10, ttl=60)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"        # b is now the least recently used
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.stats() == {"entries": 2, "bytes": 8, "hits": 3, "misses": 1}
+
+
+def test_sizes_given_to_put_and_oversized_values(clock):
+    cache = LRUCache(max_bytes=10, ttl=60)
+    cache.put("frame", object(), size=6)
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None and cache.get("frame") is not None
+
+    cache.put("frame", b"abc")              # replacing a key releases its old size
+    assert cache.stats()["bytes"] == 3
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(max_bytes=100, ttl=5)
+    cache.put("a", b"a")
+    clock[0] += 3
+    cache.put("b", b"b")
+    assert cache.get("a") == b"a"           # reading does not extend an entry's life
+
+    clock[0] += 3
+    assert cache.get("a") is None
+    assert cache.get("b") == b"b"
+    assert cache.stats()["bytes"] == 1
+
+
+def test_put_drops_expired_entries_first(clock):
+    cache = LRUCache(max_bytes=3, ttl=5)
+    cache.put("old", b"o")
+    clock[0] += 2
+    cache.put("new", b"n")
+    assert cache.get("old") == b"o"         # old is now the most recently used, but expires first
+    clock[0] += 4
+    cache.put("next", b"xx")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("new") == b"n" and cache.get("next") == b"xx"
@@ -0,0 +1,56 @@
+"""Chunked totals against a pandas groupby of the whole table."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stream import stream_counts, sum_counts
+
+KEYS = ["Year", "Month", "Reason"]
+
+
+@pytest.fixture
+def withdrawals():
+    rng = np.random.default_rng(3)
+    n = 500
+    return pd.DataFrame({
+        "Month":  rng.choice(["Aug", "Sep", "Oct", "Nov"], n),
+        "Year":   rng.choice([2021, 2022], n),
+        "Reason": rng.choice(["MOVED", "HOME SCHOOLING", "TRANSFER"], n),
+        "Count":  rng.integers(0, 50, n),
+    })
+
+
+def expected(df):
+    return df.groupby(KEYS)["Count"].sum().reset_index()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_stream_counts_match_groupby(tmp_path, withdrawals, suffix):
+    path = tmp_path / f"district{suffix}"
+    if suffix == ".csv":
+        withdrawals.to_csv(path, index=False)
+    else:
+        withdrawals.to_parquet(path, index=False)
+
+    got = stream_counts(path, chunk_rows=37)
+    pd.testing.assert_frame_equal(got.astype({"Month": str, "Reason": str}), expected(withdrawals), check_dtype=False)
+    assert got["Count"].dtype == "int64"
+
+
+def test_chunks_with_different_categories():
+    # the first chunk has no TRANSFER and the second no MOVED, so their categories differ
+    a = pd.DataFrame({"Year": [2022, 2022], "Month": ["Aug", "Sep"], "Reason": ["MOVED", "MOVED"], "Count": [1, 2]})
+    b = pd.DataFrame({"Year": [2022, 2022], "Month": ["Sep", "Sep"], "Reason": ["TRANSFER", "TRANSFER"], "Count": [4, 8]})
+    chunks = [c.astype({"Month": "category", "Reason": "category"}) for c in (a, b)]
+
+    got = sum_counts(chunks, KEYS)
+    assert got.to_dict("records") == [
+        {"Year": 2022, "Month": "Aug", "Reason": "MOVED", "Count": 1},
+        {"Year": 2022, "Month": "Sep", "Reason": "MOVED", "Count": 2},
+        {"Year": 2022, "Month": "Sep", "Reason": "TRANSFER", "Count": 12},
+    ]
+
+
+def test_no_chunks():
+    assert list(sum_counts([], KEYS).columns) == KEYS + ["Count"]
@@ -0,0 +1,55 @@
+"""Whole-matrix rolling statistics against pandas rolling windows, one campus at a time."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trend import ALL_REASONS, BASELINE, anomalies, rolling_sum, trend_stats
+
+MONTHS = pd.period_range("2019-08", periods=48, freq="M")
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(11)
+    counts = rng.poisson(4, size=(3, 2, len(MONTHS)))
+    counts[1, 0, 40] = 30                   # one campus-month spike, for the first reason
+    enrolled = np.repeat(rng.integers(300, 600, size=(3, 4)), 12, axis=1)
+    return {"campuses": ["Campus 1", "Campus 2", "Campus 3"], "reasons": ["MOVED", "TRANSFER"],
+            "months": MONTHS, "counts": counts, "enrolled": enrolled}
+
+
+@pytest.mark.parametrize("window", [1, 5, 12, 49])
+def test_rolling_sum_matches_pandas(history, window):
+    x = history["counts"]
+    expected = [[pd.Series(row).rolling(window).sum().to_numpy() for row in rows] for rows in x]
+    np.testing.assert_allclose(rolling_sum(x, window), expected)
+
+
+def test_trend_stats_match_pandas(history):
+    counts, enrolled = history["counts"].sum(axis=1), history["enrolled"]
+    stats = trend_stats(counts, enrolled)
+    for c in range(len(counts)):
+        n, rate = pd.Series(counts[c], dtype=float), pd.Series(100 * counts[c] / enrolled[c])
+        rolling = n.rolling(12).sum() * 100 / enrolled[c]
+        mean = rate.rolling(BASELINE).mean().shift(1)
+        var = rate.rolling(BASELINE).var(ddof=0).shift(1)
+        noise = np.maximum(mean, 100 / enrolled[c]) * 100 / enrolled[c]
+        np.testing.assert_allclose(stats["rolling"][c], rolling)
+        np.testing.assert_allclose(stats["yoy"][c], rolling - rolling.shift(12))
+        np.testing.assert_allclose(stats["baseline"][c], mean)
+        np.testing.assert_allclose(stats["z"][c], (rate - mean) / np.sqrt(np.maximum(var, noise)), atol=1e-9)
+
+
+def test_anomalies_flag_the_spike(history):
+    flagged = anomalies(history)
+    cells = set(zip(flagged["Campus"], flagged["Reason"], flagged["Month"]))
+    assert {("Campus 2", "MOVED", "2022-12"), ("Campus 2", ALL_REASONS, "2022-12")} <= cells
+    assert all(flagged["Withdrawals"] >= 3)
+    assert flagged["Z"].abs().is_monotonic_decreasing
+    assert flagged.iloc[0][["Campus", "Reason", "Month"]].tolist() == ["Campus 2", "MOVED", "2022-12"]
+
+
+def test_no_anomalies_in_a_flat_history(history):
+    flat = dict(history, counts=np.full_like(history["counts"], 4))
+    assert anomalies(flat).empty
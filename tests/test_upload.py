@@ -0,0 +1,101 @@
+"""Resuming a publish from its journal."""
+
+import json, os
+
+import pytest
+
+import upload
+from upload import DirectoryTarget, Journal, UploadError, check_sources, publish
+
+
+@pytest.fixture
+def sources(tmp_path):
+    (tmp_path / "outputs").mkdir()
+    for name in ["a.html", "b.html", "c.html"]:
+        (tmp_path / "outputs" / name).write_text(name)
+    (tmp_path / "data" / ".cache").mkdir(parents=True)
+    (tmp_path / "data" / "kpi.json").write_text("{}")
+    (tmp_path / "data" / ".cache" / "kpi.json").write_text("{}")     # hidden: never published
+    return [tmp_path / "outputs", tmp_path / "data"]
+
+
+class Puts(list):
+    fail = {}
+
+
+@pytest.fixture
+def puts(monkeypatch):
+    """Names passed to DirectoryTarget.put, which fails for names in ``puts.fail``."""
+    calls = Puts()
+    put = DirectoryTarget.put
+
+    def recording_put(self, name, path, digest):
+        calls.append(name)
+        if name in calls.fail:
+            raise calls.fail[name]
+        put(self, name, path, digest)
+
+    monkeypatch.setattr(DirectoryTarget, "put", recording_put)
+    return calls
+
+
+def run(sources, drop, **kwargs):
+    return publish(sources, str(drop), workers=1, batch_size=2, retries=0, **kwargs)
+
+
+def test_rerun_skips_published_files(tmp_path, sources, puts, monkeypatch):
+    drop = tmp_path / "drop"
+    first = run(sources, drop)
+    assert (first["uploaded"], first["skipped"]) == (4, 0)
+    assert sorted(puts) == ["data/kpi.json", "outputs/a.html", "outputs/b.html", "outputs/c.html"]
+    assert (drop / "outputs" / "b.html").read_text() == "b.html"
+
+    del puts[:]
+    os.utime(sources[0] / "a.html", ns=(1, 1))             # touched, same content
+    (sources[0] / "b.html").write_text("changed")
+    second = run(sources, drop)
+    assert (second["uploaded"], second["skipped"]) == (1, 3)
+    assert puts == ["outputs/b.html"]
+    assert (drop / "outputs" / "b.html").read_text() == "changed"
+
+    # the touched file's new mtime was recorded, so a third run does not even hash it
+    hashed = []
+    sha256_file = upload.sha256_file
+    monkeypatch.setattr(upload, "sha256_file", lambda path: hashed.append(path) or sha256_file(path))
+    assert run(sources, drop)["skipped"] == 4
+    assert hashed == []
+
+
+def test_failed_file_is_retried_on_the_next_run(tmp_path, sources, puts):
+    drop = tmp_path / "drop"
+    puts.fail = {"outputs/b.html": UploadError("refused")}
+    first = run(sources, drop)
+    assert list(first["failed"]) == ["outputs/b.html"] and first["uploaded"] == 3
+
+    del puts[:]
+    puts.fail = {}
+    second = run(sources, drop)
+    assert puts == ["outputs/b.html"] and second["skipped"] == 3
+
+
+def test_interrupted_run_resumes_at_its_batch(tmp_path, sources, puts):
+    drop, journal = tmp_path / "drop", tmp_path / "journal.jsonl"
+    puts.fail = {"outputs/c.html": KeyboardInterrupt()}    # second batch: outputs/c.html, data/kpi.json
+    with pytest.raises(KeyboardInterrupt):
+        run(sources, drop, journal_path=journal)
+    assert [json.loads(line)["name"] for line in journal.read_text().splitlines()] == [
+        "outputs/a.html", "outputs/b.html"]
+
+    del puts[:]
+    puts.fail = {}
+    with open(journal, "a") as f:
+        f.write('{"target": "cut sho')                      # a line cut short by the interruption
+    summary = run(sources, drop, journal_path=journal)
+    assert sorted(puts) == ["data/kpi.json", "outputs/c.html"] and summary["skipped"] == 2
+    assert len(Journal(journal).entries) == 4 == len(journal.read_text().splitlines())
+
+
+def test_sources_need_distinct_names(tmp_path):
+    check_sources([tmp_path / "a" / "data", tmp_path / "outputs"])
+    with pytest.raises(ValueError, match="'data'"):
+        check_sources([tmp_path / "a" / "data", tmp_path / "b" / "data"])
@@ -0,0 +1,20 @@
+"""Value checks on student events handed over by other callers than read_events."""
+
+from validate import event_problems
+
+
+def test_wrong_dtypes_are_reported(small_events):
+    problems = event_problems(small_events.astype({"StudentID": "float64"}))
+    checks = [p["check"] for p in problems if p["severity"] == "error"]
+    assert "Campus is str, not categorical" in checks
+    assert "StudentID is float64, not integer" in checks
+
+
+def test_missing_column_is_reported(small_events):
+    problems = event_problems(small_events.drop(columns="Reason"))
+    assert [p["check"] for p in problems] == ["missing column(s) Reason"]
+
+
+def test_categorical_events_pass(small_events):
+    events = small_events.astype({c: "category" for c in small_events if c != "StudentID"})
+    assert not [p for p in event_problems(events) if p["severity"] == "error"]
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Publish generated dashboards and their aggregates to the file drop, in bulk.
+
+Every file under the source directories (hidden ones such as build caches
+excepted) is published as ``<source name>/<relative path>`` to a target:
+
+    python upload.py outputs data --to http://drop.internal:8080/retention
+    python upload.py outputs data --to /mnt/drop/retention
+
+An ``http://`` target gets one HTTP PUT per file over keep-alive
+connections, one per worker thread, so ``--workers`` bounds both the
+parallelism and the open connections; any other target is a directory that
+files are copied into (atomically, via a temporary name). Refused or failed
+uploads are retried with exponential backoff, and a file that still fails
+is reported without stopping the run.
+
+Files are taken in batches of ``--batch-size``. After each batch, what was
+published (path, size, mtime, SHA-256) is appended to a journal next to the
+sources, so a rerun skips every file whose content was already published to
+that target: an unchanged file is not even re-hashed while its size and
+mtime match, and an interrupted run restarts at the batch it stopped in.
+"""
+
+import argparse, hashlib, http.client, json, mimetypes, os, random, shutil, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+BATCH_SIZE = 200
+WORKERS = 8
+RETRIES = 4                     # attempts after the first one
+BACKOFF = 0.5                   # seconds before the first retry, doubled after each
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+TIMEOUT = 60
+JOURNAL = ".upload_journal.jsonl"
+READ_CHUNK = 1 << 20
+STREAM_BYTES = 8 << 20          # larger files are streamed from disk instead of read into memory
+
+
+class UploadError(RuntimeError):
+    """A file the target refused; ``retry`` says whether trying again may help."""
+
+    def __init__(self, message, retry=False):
+        super().__init__(message)
+        self.retry = retry
+
+
+def sha256_file(path):
+    """SHA-256 hex digest of a file, read in bounded-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_sources(sources):
+    """
+    Files are published under their source's name, so two sources with the
+    same name (``a/data`` and ``b/data``) raise a ValueError instead of
+    overwriting each other's files.
+    """
+    names = [Path(source).name for source in sources]
+    clashes = sorted({name for name in names if names.count(name) > 1})
+    if clashes:
+        raise ValueError(f"sources must have distinct names, got more than one {', '.join(map(repr, clashes))}")
+
+
+def source_files(sources):
+    """(published name, path) of every file under ``sources``, skipping hidden files and directories."""
+    check_sources(sources)
+    files = []
+    for source in sources:
+        source = Path(source)
+        for root, dirs, names in os.walk(source):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(names):
+                if not name.startswith("."):
+                    path = Path(root) / name
+                    files.append(((source.name / path.relative_to(source)).as_posix(), path))
+    return files
+
+
+class DirectoryTarget:
+    """Copies files under a local (or mounted) directory."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def put(self, name, path, digest):
+        dest = self.root / name
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.tmp")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, dest)
+
+    def close(self):
+        pass
+
+
+class HTTPTarget:
+    """PUTs files under a base URL, over one keep-alive connection per thread."""
+
+    def __init__(self, url, timeout=TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"unsupported upload URL {url!r}, expected http:// or https://")
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc, self.prefix, self.timeout = parts.netloc, parts.path.rstrip("/"), timeout
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self.connection_class(self.netloc, timeout=self.timeout)
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def put(self, name, path, digest):
+        conn = self._connection()
+        headers = {
+            "Content-Length": str(path.stat().st_size),
+            "Content-Type": mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+            "X-Content-SHA256": digest,
+        }
+        try:
+            with open(path, "rb") as f:
+                # a bytes body goes out in one send with the headers, which avoids a
+                # delayed-ACK stall per request on a reused connection
+                body = f if int(headers["Content-Length"]) > STREAM_BYTES else f.read()
+                conn.request("PUT", f"{self.prefix}/{quote(name)}", body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()     # drain it, so the connection can be reused
+        except (OSError, http.client.HTTPException):
+            conn.close()        # reconnect on the next attempt
+            raise
+        if response.status >= 300:
+            raise UploadError(f"HTTP {response.status} {response.reason}", retry=response.status in RETRY_STATUSES)
+
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+
+
+def target_for(spec):
+    """An HTTP target for an http(s):// URL, else a directory target."""
+    if spec.startswith(("http://", "https://")):
+        return HTTPTarget(spec)
+    return DirectoryTarget(spec)
+
+
+class Journal:
+    """
+    What has been published to each target: one JSON line per published file,
+    appended after every batch and compacted (atomically) at the end of a run.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}       # (target, name) -> {"size", "mtime_ns", "sha256"}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue        # a line cut short by an interrupted run
+                    self.entries[entry["target"], entry["name"]] = entry
+        except FileNotFoundError:
+            pass
+
+    def get(self, target, name):
+        return self.entries.get((target, name))
+
+    def append(self, entries):
+        """Record published files, durably, before the next batch starts."""
+        if not entries:
+            return
+        with open(self.path, "a") as f:
+            for entry in entries:
+                self.entries[entry["target"], entry["name"]] = entry
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self):
+        """Rewrite the journal with only the latest entry per file."""
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, self.path)
+
+
+def with_retries(put, name, path, digest, retries=RETRIES, backoff=BACKOFF):
+    """Call ``put``, retrying connection errors and retryable refusals with exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return put(name, path, digest)
+        except UploadError as exc:
+            if not exc.retry or attempt == retries:
+                raise
+        except (OSError, http.client.HTTPException):
+            if attempt == retries:
+                raise
+        time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def publish_file(target, spec, journal, name, path, retries=RETRIES):
+    """
+    Publish one file unless the journal shows this content already went to
+    ``spec``. Returns ``(status, entry)``: "skipped", or "uploaded" with the
+    journal entry to record.
+    """
+    stat = path.stat()
+    done = journal.get(spec, name)
+    if done and done["size"] == stat.st_size and done["mtime_ns"] == stat.st_mtime_ns:
+        return "skipped", None
+    digest = sha256_file(path)
+    entry = {"target": spec, "name": name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+    if done and done["sha256"] == digest:
+        return "skipped", entry         # touched but unchanged: only the mtime is new
+    with_retries(target.put, name, path, digest, retries)
+    return "uploaded", entry
+
+
+def publish(sources, spec, journal_path=None, workers=WORKERS, batch_size=BATCH_SIZE, retries=RETRIES):
+    """Publish every file under ``sources`` to target ``spec``; returns a summary dict."""
+    files = source_files(sources)
+    journal = Journal(journal_path or Path(sources[0]).resolve().parent / JOURNAL)
+    target = target_for(spec)
+    counts = {"uploaded": 0, "skipped": 0}
+    uploaded_bytes, failed = 0, {}
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i in range(0, len(files), batch_size):
+                batch = files[i:i + batch_size]
+                futures = [(name, path, pool.submit(publish_file, target, spec, journal, name, path, retries))
+                           for name, path in batch]
+                done = []
+                for name, path, future in futures:
+                    try:
+                        status, entry = future.result()
+                    except Exception as exc:
+                        failed[name] = f"{type(exc).__name__}: {exc}"
+                        continue
+                    counts[status] += 1
+                    if entry:
+                        done.append(entry)
+                        uploaded_bytes += entry["size"] if status == "uploaded" else 0
+                journal.append(done)
+                print(f"[{min(i + batch_size, len(files))}/{len(files)}] {counts['uploaded']} uploaded, "
+                      f"{counts['skipped']} unchanged, {len(failed)} failed")
+    finally:
+        target.close()
+    journal.compact()
+    return {
+        "files": len(files),
+        **counts,
+        "failed": failed,
+        "bytes": uploaded_bytes,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def main(sources, spec, journal_path=None, workers=WORKERS, batch_size=BATCH_SIZE, retries=RETRIES):
+    summary = publish(sources, spec, journal_path, workers, batch_size, retries)
+    for name, error in sorted(summary["failed"].items()):
+        print(f"{name}: FAILED  {error}")
+    print(f"Published {summary['uploaded']} of {summary['files']} files ({summary['bytes'] / 2**20:.1f} MB) "
+          f"to {spec} in {summary['seconds']:.2f}s; {summary['skipped']} unchanged, "
+          f"{len(summary['failed'])} failed")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sources", nargs="+", type=Path, help="directories to publish, e.g. outputs data")
+    parser.add_argument("--to", required=True, help="http(s):// URL to PUT files under, or a directory")
+    parser.add_argument("--journal", type=Path, help=f"journal of published files (default {JOURNAL} next to the sources)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="concurrent uploads (and connections)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="files per journal checkpoint")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="retries per file, with exponential backoff")
+    args = parser.parse_args()
+    try:
+        check_sources(args.sources)
+    except ValueError as exc:
+        parser.error(str(exc))
+    summary = main(args.sources, args.to, args.journal, args.workers, args.batch_size, args.retries)
+    sys.exit(1 if summary["failed"] else 0)